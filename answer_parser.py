@@ -0,0 +1,146 @@
+#! /usr/bin/env python3
+# I, Robert Rozanski, the copyright holder of this work, release this work into the public domain. This applies worldwide. In some countries this may not be legally possible; if so: I grant anyone the right to use this work for any purpose, without any conditions, unless such conditions are required by law.
+
+# parsing of clasp output: answers are read once into atoms,
+# atoms split into predicate name and arguments (nested terms kept as strings)
+
+
+def get_answers(output):
+	# list of answers (lists of atom strings), in the order found by clasp
+	answers = []
+	lines = output.split('\n')
+	for (number, line) in enumerate(lines):
+		if line.startswith('Answer: ') and (number + 1 < len(lines)):
+			answers.append(lines[number + 1].split())
+	return answers
+
+
+def get_answer(output, number=1):
+	# atoms of the answer with given number (None if not found)
+	answers = get_answers(output)
+	if len(answers) < number:
+		return None
+	return answers[number - 1]
+
+
+def split_atom(atom):
+	# 'p(a,f(b,c),d)' -> ('p', ['a', 'f(b,c)', 'd']); 'q' -> ('q', [])
+	start = atom.find('(')
+	if start == -1:
+		return (atom, [])
+	if not atom.endswith(')'):
+		raise ValueError('split_atom: atom not recognised: %s' % atom)
+	args = []
+	depth = 0
+	begin = start + 1
+	for position in range(start + 1, len(atom) - 1):
+		char = atom[position]
+		if char == '(':
+			depth += 1
+		elif char == ')':
+			depth -= 1
+		elif (char == ',') and (depth == 0):
+			args.append(atom[begin:position])
+			begin = position + 1
+	args.append(atom[begin:len(atom) - 1])
+	return (atom[:start], args)
+
+
+def index_atoms(atoms):
+	# predicate name: list of argument lists
+	index = {}
+	for atom in atoms:
+		(name, args) = split_atom(atom)
+		index.setdefault(name, []).append(args)
+	return index
+
+
+class AnswerCollector:
+	# reads clasp output line by line (SolverRunner streams solver's stdout
+	# into it), keeping only the answers at the best optimization so far and
+	# the other (status, summary) lines: memory doesn't grow with output.
+	# Without --opt-mode=optN clasp prints only improving answers; answers
+	# equal to the best one are printed only when clasp enumerates proven
+	# optimal answers. max_answers: enough of them, reading can stop
+	def __init__(self, max_answers=None):
+		self.max_answers = max_answers
+		self.answers = [] # atom lists
+		self.kept = set() # kept answers as sets of atoms
+		self.optimization = None # (values, line) of kept answers
+		self.enumerating = False # kept answers: proven optimal
+		self.other_lines = []
+		self.pending = None # atoms of an answer waiting for its optimization
+		self.expect_atoms = False
+		self.stopped = False
+
+
+	def add_line(self, line):
+		# True if enough optimal answers were collected
+		if self.expect_atoms:
+			self.expect_atoms = False
+			self.pending = line.split()
+			return False
+		if self.pending != None:
+			atoms = self.pending
+			self.pending = None
+			if line.startswith('Optimization: '):
+				return self.add_answer(atoms, line)
+			self.add_answer(atoms, None)
+		if line.startswith('Answer: '):
+			self.expect_atoms = True
+		elif line != '':
+			self.other_lines.append(line)
+		return False
+
+
+	def add_answer(self, atoms, optimization_line):
+		if optimization_line == None:
+			# not an optimization problem: all answers kept
+			self.answers.append(atoms)
+			return False
+		values = [int(value) for value in optimization_line.split('Optimization: ')[1].split()]
+		if (self.optimization == None) or (values < self.optimization[0]):
+			self.answers = [atoms]
+			self.kept = set([frozenset(atoms)])
+			self.optimization = (values, optimization_line)
+			self.enumerating = False
+		elif values == self.optimization[0]:
+			self.enumerating = True
+			if not (frozenset(atoms) in self.kept):
+				self.answers.append(atoms)
+				self.kept.add(frozenset(atoms))
+		if (self.max_answers != None) and self.enumerating and (len(self.answers) >= self.max_answers):
+			self.stopped = True
+		return self.stopped
+
+
+	def finish(self):
+		if self.pending != None:
+			self.add_answer(self.pending, None)
+			self.pending = None
+
+
+	def get_output(self):
+		# clasp-like output with kept answers only; if reading stopped,
+		# the optimum found by enumeration is reported as clasp would
+		self.finish()
+		lines = []
+		for (number, atoms) in enumerate(self.answers):
+			lines.extend(['Answer: %s' % (number + 1), ' '.join(atoms)])
+			if (self.optimization != None) and (self.optimization[1] != None):
+				lines.append(self.optimization[1])
+		lines.extend(self.other_lines)
+		if self.stopped:
+			lines.append('OPTIMUM FOUND')
+			lines.append('Optimization : %s' % self.optimization[1].split('Optimization: ')[1])
+		return '\n'.join(lines + [''])
+
+
+	def get_optimum(self):
+		# optimum reported in clasp's summary (list of values; None if none)
+		for line in self.other_lines:
+			if line.startswith('Optimization : '):
+				return [int(value) for value in line.split('Optimization : ')[1].split()]
+		if self.stopped:
+			return self.optimization[0]
+		return None
@@ -4,6 +4,8 @@
 from time import time
 from random import choice
 from sys import stdout
+import mnm_repr
+import bitset_repr
 
 class Archive:
 	def __init__(self):
@@ -24,6 +26,52 @@ class Archive:
 		self._results_counter = 0
 		self._models_counter = 0
 		self.model_of_ref = None
+		self.fact_base = None # FactBase; optional
+		self.journal = None # Journal; optional (Overseer.attach_journal)
+		self.create_indexes()
+
+
+	def create_indexes(self):
+		# element lists are filled directly (evaluator, tests), so element index
+		# is rebuilt when they (or IDs: mnm_repr.generation) change; results
+		# index grows with known results; origins and positions kept by record()
+		self.element_index = None
+		self.element_signature = None
+		self.result_index = {}
+		self.result_signature = (None, 0)
+		self.model_origins = {} # model: event (first one)
+		self.event_positions = {} # id(event): position in development_history
+		self.activity_index = None # bitset_repr.ActivityIndex; created when used
+		for (position, event) in enumerate(self.development_history):
+			self.index_event(event, position)
+
+
+	def __getstate__(self):
+		# journal (open file) not pickled
+		state = self.__dict__.copy()
+		state['journal'] = None
+		return state
+
+
+	def __setstate__(self, state):
+		# event positions are kept by id: built again (also for archives pickled without indexes)
+		self.__dict__.update(state)
+		self.__dict__.setdefault('journal', None)
+		self.create_indexes()
+
+
+	def index_event(self, event, position):
+		self.event_positions[id(event)] = position
+		models = []
+		if isinstance(event, InitialModels):
+			models = event.models
+		elif isinstance(event, RevisedModel):
+			models = event.revised_models
+		elif isinstance(event, AdditionalModels):
+			models = event.additional_models
+		for model in models:
+			if not (model in self.model_origins):
+				self.model_origins[model] = event
 
 
 	def record(self, event):
@@ -47,6 +95,8 @@ class Archive:
 		elif isinstance(event, AcceptedResults):
 			self.new_result = None # clearing
 			self.known_results.append(event.experiment)
+			if self.fact_base != None:
+				self.fact_base.append_results(list(event.experiment.results))
 
 		elif isinstance(event, RefutedModels):
 			self.working_models = self.working_models - set(event.refuted_models)
@@ -104,6 +154,8 @@ class Archive:
 					for res in exp.results:
 						res.ID = self.get_new_res_id()
 			self.known_results.extend(event.experiments)
+			if self.fact_base != None:
+				self.fact_base.append_results([res for exp in event.experiments for res in exp.results])
 
 		elif isinstance(event,  CheckPointFail):
 			self.error_flag = True
@@ -111,8 +163,16 @@ class Archive:
 		else:
 			raise(TypeError, "Archive: event's type unknown: %s" % type(event))
 
+		self.index_event(event, len(self.development_history) - 1)
+		if self.journal != None:
+			self.journal.append_event(event, self)
+
 
 	def get_model_origin_event(self, model): # number of new results covered
+		event = self.model_origins.get(model)
+		if event != None:
+			return event
+		# models changed after they were recorded
 		for event in self.development_history:
 			if not (isinstance(event, InitialModels) or isinstance(event, RevisedModel) or isinstance(event, AdditionalModels)):
 				continue
@@ -134,7 +194,9 @@ class Archive:
 
 
 	def get_events_after_event(self, event):
-		index = self.development_history.index(event)
+		index = self.event_positions.get(id(event))
+		if (index == None) or (index >= len(self.development_history)) or (not (self.development_history[index] is event)):
+			index = self.development_history.index(event)
 		return self.development_history[index+1:]
 
 
@@ -150,36 +212,57 @@ class Archive:
 
 
 	def get_matching_element(self, element_id, element_version=None):
-		for element in self.mnm_activities:
-			if element.ID == element_id:
-				return element
-			else:
-				pass
-		for element in self.mnm_entities:
-			if ((element.ID == element_id) and (element.version == element_version)):
-				return element
-			else:
-				pass
-		for element in self.mnm_compartments:
-			if element.ID == element_id:
-				return element
-			else:
-				pass
-		for element in self.import_activities:
-			if element.ID == element_id:
-				return element
-			else:
-				pass
+		# activities, entities (ID and version), compartments, import activities:
+		# first matching one
+		(activities, entities, compartments, imports) = self.get_element_index()
+		for (index, key) in [(activities, element_id), (entities, (element_id, element_version)), (compartments, element_id), (imports, element_id)]:
+			if key in index:
+				return index[key]
 		raise ValueError("get_matching_element: matching element not found: ID: %s" % element_id)
 
 
+	def get_element_index(self):
+		signature = (id(self.mnm_activities), len(self.mnm_activities), id(self.mnm_entities), len(self.mnm_entities),
+			id(self.mnm_compartments), len(self.mnm_compartments), id(self.import_activities), len(self.import_activities), mnm_repr.generation)
+		if signature != self.element_signature:
+			self.element_signature = signature
+			activities = {}
+			entities = {}
+			compartments = {}
+			imports = {}
+			for element in self.mnm_activities:
+				activities.setdefault(element.ID, element)
+			for element in self.mnm_entities:
+				entities.setdefault((element.ID, element.version), element)
+			for element in self.mnm_compartments:
+				compartments.setdefault(element.ID, element)
+			for element in self.import_activities:
+				imports.setdefault(element.ID, element)
+			self.element_index = (activities, entities, compartments, imports)
+		return self.element_index
+
+
+	def get_activity_index(self):
+		# activities of the network numbered first; others (in models only) when met
+		if self.activity_index == None:
+			self.activity_index = bitset_repr.ActivityIndex()
+		for activity in self.mnm_activities + self.import_activities:
+			self.activity_index.get_number(activity)
+		return self.activity_index
+
+
 	def get_matching_result(self, res_id):
-		for exp in self.known_results:
+		# known results only grow: new experiments indexed
+		(indexed_list, number) = self.result_signature
+		if (not (indexed_list is self.known_results)) or (number > len(self.known_results)):
+			self.result_index = {}
+			number = 0
+		for exp in self.known_results[number:]:
 			for res in exp.results:
-				if res.ID == res_id:
-					return res
-				else:
-					pass
+				self.result_index.setdefault(res.ID, res)
+		self.result_signature = (self.known_results, len(self.known_results))
+		if res_id in self.result_index:
+			return self.result_index[res_id]
 		raise ValueError("get_matching_result: matching element not found: ID: %s" % res_id)
 
 
@@ -200,7 +283,7 @@ class Archive:
 		return 'ent_%s' % len(self.mnm_entities)
 
 	def get_new_act_id(self):
-		return 'act_%s' % len(self.mnm_activities + self.import_activities)
+		return 'act_%s' % (len(self.mnm_activities) + len(self.import_activities))
 
 
 class Event:
@@ -222,10 +305,12 @@ class InitialResults(Event):
 		self.experiments = exps
 
 class ChosenExperiment(Event):
-	# experiment descriptions
-	def __init__(self, expDs):
+	# experiment descriptions; optimal: False if design
+	# stopped (time budget) before optimum was proven
+	def __init__(self, expDs, optimal=True):
 		Event.__init__(self)
 		self.experiment_descriptions = expDs
+		self.optimal = optimal
 
 class NewResults(Event):
 	# full experiment with results
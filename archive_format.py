@@ -0,0 +1,284 @@
+#! /usr/bin/env python3
+# I, Robert Rozanski, the copyright holder of this work, release this work into the public domain. This applies worldwide. In some countries this may not be legally possible; if so: I grant anyone the right to use this work for any purpose, without any conditions, unless such conditions are required by law.
+
+import io
+import pickle
+import struct
+import zlib
+from importlib import import_module
+import mnm_repr
+import exp_repr
+from archive import Archive
+
+# compact archive files (Overseer.stop_development). Compartments, entities,
+# conditions, activities, models, results and experiments are nodes: stored
+# once, referenced by their number everywhere else. Elements are interned by
+# value (equal conditions built separately are one node), models, results and
+# experiments by identity. Sections (zlib-compressed pickles) are read
+# separately: the event timeline can be read without the network or models.
+#
+# file: MAGIC, format version, length of the section table, section table
+# (name: (offset, length)), sections:
+# 'nodes': [class number of each node], [(module, class name)]
+# 'network', 'results', 'models': [(node number, pickled state)]; elements
+# a node depends on (hashing) come first; model sets are tuples of node numbers
+# 'events': development history
+# 'archive': other attributes of the archive
+
+MAGIC = b'HUGINN_ARCHIVE\n'
+FORMAT_VERSION = 1
+
+SECTIONS = ['nodes', 'network', 'results', 'models', 'events', 'archive']
+
+# rank: order of loading
+NODE_TYPES = [(mnm_repr.Compartment, 'network', 0), (mnm_repr.Entity, 'network', 1),
+	(mnm_repr.Condition, 'network', 2), (mnm_repr.Activity, 'network', 3),
+	(exp_repr.Result, 'results', 4), (exp_repr.Experiment, 'results', 5),
+	(mnm_repr.Model, 'models', 6)]
+
+MODEL_SETS = ['setup_conditions', 'intermediate_activities', 'termination_conditions', 'results_covered', 'ignored_results']
+
+# built again when loaded (Archive.create_indexes)
+ARCHIVE_INDEXES = ['element_index', 'element_signature', 'result_index', 'result_signature', 'model_origins', 'event_positions', 'activity_index']
+
+
+def get_node_type(obj):
+	for (node_type, section, rank) in NODE_TYPES:
+		if isinstance(obj, node_type):
+			return (section, rank)
+	return None
+
+
+def get_state(obj):
+	getstate = getattr(obj, '__getstate__', None)
+	state = None
+	if getstate != None:
+		state = getstate()
+	if state == None:
+		state = dict(obj.__dict__)
+	return dict(state)
+
+
+class NodeRef:
+	# node not read (read_timeline): section of the node and its number
+	def __init__(self, section, number):
+		self.section = section
+		self.number = number
+
+	def __hash__(self):
+		return hash((self.section, self.number))
+
+	def __eq__(self, other):
+		return ((type(self) == type(other)) and (self.section == other.section) and (self.number == other.number))
+
+	def __repr__(self):
+		return 'NodeRef(%s, %s)' % (self.section, self.number)
+
+
+class ArchiveWriter:
+	def __init__(self, archive):
+		self.archive = archive
+		self.nodes = [] # objects
+		self.node_types = [] # (section, rank)
+		self.numbers = {} # interning key: node number
+
+
+	def get_key(self, obj, rank):
+		if rank == 0:
+			return (type(obj), obj.ID)
+		elif rank == 1:
+			return (type(obj), obj.ID, obj.version)
+		elif rank == 2:
+			return (type(obj), obj)
+		elif rank == 3:
+			return (type(obj), obj.ID, obj.reversibility, obj)
+		return id(obj)
+
+
+	def get_number(self, obj, node_type):
+		key = self.get_key(obj, node_type[1])
+		number = self.numbers.get(key)
+		if number == None:
+			number = len(self.nodes)
+			self.numbers[key] = number
+			self.nodes.append(obj)
+			self.node_types.append(node_type)
+		return number
+
+
+	def persistent_id(self, obj):
+		if obj is self.archive:
+			return 'archive'
+		node_type = get_node_type(obj)
+		if node_type == None:
+			return None
+		return self.get_number(obj, node_type)
+
+
+	def dumps(self, obj):
+		stream = io.BytesIO()
+		pickler = pickle.Pickler(stream, pickle.HIGHEST_PROTOCOL)
+		pickler.persistent_id = self.persistent_id
+		pickler.dump(obj)
+		return stream.getvalue()
+
+
+	def dump_node(self, number):
+		obj = self.nodes[number]
+		state = get_state(obj)
+		if self.node_types[number][0] == 'models':
+			indexed = []
+			for name in MODEL_SETS:
+				if (name in state) and all([get_node_type(element) != None for element in state[name]]):
+					state[name] = tuple(sorted([self.get_number(element, get_node_type(element)) for element in state[name]]))
+					indexed.append(name)
+			state['_indexed'] = indexed
+		return self.dumps(state)
+
+
+	def get_sections(self):
+		# events first: nodes found while pickling, their states may refer to further nodes
+		archive_state = get_state(self.archive)
+		history = archive_state.pop('development_history')
+		for name in ARCHIVE_INDEXES:
+			archive_state.pop(name, None)
+		sections = {'events': self.dumps(history), 'archive': self.dumps(archive_state)}
+		states = []
+		while len(states) < len(self.nodes):
+			states.append(self.dump_node(len(states)))
+		for name in ['network', 'results', 'models']:
+			numbers = [number for number in range(len(self.nodes)) if self.node_types[number][0] == name]
+			numbers.sort(key=lambda number: self.node_types[number][1])
+			sections[name] = pickle.dumps([(number, states[number]) for number in numbers], pickle.HIGHEST_PROTOCOL)
+		classes = []
+		class_numbers = {}
+		node_classes = []
+		for obj in self.nodes:
+			cls = (type(obj).__module__, type(obj).__qualname__)
+			if not (cls in class_numbers):
+				class_numbers[cls] = len(classes)
+				classes.append(cls)
+			node_classes.append(class_numbers[cls])
+		sections['nodes'] = pickle.dumps((node_classes, classes), pickle.HIGHEST_PROTOCOL)
+		return sections
+
+
+def save(archive, path, level=6):
+	sections = ArchiveWriter(archive).get_sections()
+	table = {}
+	data = []
+	offset = 0
+	for name in SECTIONS:
+		compressed = zlib.compress(sections[name], level)
+		table[name] = (offset, len(compressed))
+		data.append(compressed)
+		offset += len(compressed)
+	table_data = pickle.dumps(table, pickle.HIGHEST_PROTOCOL)
+	with open(path, 'wb') as f:
+		f.write(MAGIC)
+		f.write(struct.pack('>HI', FORMAT_VERSION, len(table_data)))
+		f.write(table_data)
+		for compressed in data:
+			f.write(compressed)
+
+
+def save_pickle(archive, path):
+	# format used before compact archives
+	with open(path, 'wb') as f:
+		pickle.dump(archive, f)
+
+
+def is_compact(path):
+	with open(path, 'rb') as f:
+		return f.read(len(MAGIC)) == MAGIC
+
+
+class ArchiveReader:
+	def __init__(self, path):
+		self.path = path
+		with open(path, 'rb') as f:
+			if f.read(len(MAGIC)) != MAGIC:
+				raise ValueError('ArchiveReader: not a compact archive: %s' % path)
+			(self.version, table_length) = struct.unpack('>HI', f.read(6))
+			if self.version > FORMAT_VERSION:
+				raise ValueError('ArchiveReader: format version not supported: %s' % self.version)
+			self.table = pickle.loads(f.read(table_length))
+			self.data_start = f.tell()
+		self.nodes = None
+		self.archive = None
+
+
+	def read_section(self, name):
+		(offset, length) = self.table[name]
+		with open(self.path, 'rb') as f:
+			f.seek(self.data_start + offset)
+			return zlib.decompress(f.read(length))
+
+
+	def loads(self, data, persistent_load):
+		unpickler = pickle.Unpickler(io.BytesIO(data))
+		unpickler.persistent_load = persistent_load
+		return unpickler.load()
+
+
+	def persistent_load(self, pid):
+		if pid == 'archive':
+			return self.archive
+		return self.nodes[pid]
+
+
+	def load(self):
+		# nodes created empty, then filled in section order (elements before
+		# the sets containing them are built: hashes are computed from content)
+		(node_classes, classes) = pickle.loads(self.read_section('nodes'))
+		classes = [getattr(import_module(module), name) for (module, name) in classes]
+		self.nodes = [classes[number].__new__(classes[number]) for number in node_classes]
+		self.archive = Archive.__new__(Archive)
+		for name in ['network', 'results', 'models']:
+			for (number, data) in pickle.loads(self.read_section(name)):
+				state = self.loads(data, self.persistent_load)
+				for attribute in state.pop('_indexed', []):
+					state[attribute] = frozenset([self.nodes[element] for element in state[attribute]])
+				# not through __setattr__: mnm_repr.generation unchanged
+				if hasattr(self.nodes[number], '__setstate__'):
+					self.nodes[number].__setstate__(state)
+				else:
+					self.nodes[number].__dict__.update(state)
+		state = self.loads(self.read_section('archive'), self.persistent_load)
+		state['development_history'] = self.loads(self.read_section('events'), self.persistent_load)
+		self.archive.__setstate__(state)
+		return self.archive
+
+
+	def read_timeline(self):
+		# development history with nodes (models, results, ...) as NodeRefs:
+		# network, models and results not read
+		(node_classes, classes) = pickle.loads(self.read_section('nodes'))
+		sections = {}
+		for (node_type, section, rank) in NODE_TYPES:
+			sections[node_type] = section
+		refs = []
+		for number in node_classes:
+			(module, name) = classes[number]
+			cls = getattr(import_module(module), name)
+			refs.append([sections[node_type] for node_type in sections if issubclass(cls, node_type)][0])
+		return self.loads(self.read_section('events'), lambda pid: NodeRef(refs[pid], pid))
+
+
+def load(path):
+	# compact archive or pickled one (older runs)
+	if is_compact(path):
+		return ArchiveReader(path).load()
+	with open(path, 'rb') as f:
+		return pickle.load(f)
+
+
+def read_timeline(path):
+	if is_compact(path):
+		return ArchiveReader(path).read_timeline()
+	return load(path).development_history
+
+
+def convert(pickle_path, path):
+	# pickled archive into compact one
+	save(load(pickle_path), path)
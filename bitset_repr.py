@@ -0,0 +1,216 @@
+#! /usr/bin/env python3
+# I, Robert Rozanski, the copyright holder of this work, release this work into the public domain. This applies worldwide. In some countries this may not be legally possible; if so: I grant anyone the right to use this work for any purpose, without any conditions, unless such conditions are required by law.
+
+import mnm_repr
+
+# numpy is optional: without it vectors are lists and similarities are computed pair by pair
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+
+def popcount(bits):
+	return bin(bits).count('1')
+
+
+class ActivityIndex:
+	# number of every activity (archive.get_activity_index): bit of the activity
+	# in BitsetModels. Numbers are never reassigned, so bits of models stay valid
+	# while the index grows. Activities are matched by value, as in models' sets;
+	# after any element changes (mnm_repr.generation) the lookup is built again
+	def __init__(self, activities=[]):
+		self.activities = [] # number: activity
+		self.numbers = {}
+		self.generation = mnm_repr.generation
+		for activity in activities:
+			self.get_number(activity)
+
+
+	def __len__(self):
+		return len(self.activities)
+
+
+	def __getstate__(self):
+		return {'activities': self.activities}
+
+
+	def __setstate__(self, state):
+		self.activities = state['activities']
+		self.update_numbers()
+
+
+	def update_numbers(self):
+		self.numbers = {}
+		for (number, activity) in enumerate(self.activities):
+			self.numbers.setdefault(activity, number)
+		self.generation = mnm_repr.generation
+
+
+	def get_number(self, activity):
+		# new activities get the next number
+		if self.generation != mnm_repr.generation:
+			self.update_numbers()
+		number = self.numbers.get(activity)
+		if number == None:
+			number = len(self.activities)
+			self.activities.append(activity)
+			self.numbers[activity] = number
+		return number
+
+
+	def get_bits(self, activities):
+		bits = 0
+		for activity in activities:
+			bits |= 1 << self.get_number(activity)
+		return bits
+
+
+	def get_activities(self, bits):
+		activities = []
+		number = 0
+		while bits:
+			if bits & 1:
+				activities.append(self.activities[number])
+			bits >>= 1
+			number += 1
+		return activities
+
+
+class BitsetModel:
+	# model with intermediate activities as an int (bit n: activity number n
+	# of the index); setup and termination conditions kept as frozensets.
+	# Equal to another BitsetModel of the same index with the same content
+	def __init__(self, index, bits, setup_conditions=[], termination_conditions=[], ID=None):
+		self.index = index
+		self.bits = bits
+		self.setup_conditions = frozenset(setup_conditions)
+		self.termination_conditions = frozenset(termination_conditions)
+		self.ID = ID
+
+
+	def __hash__(self):
+		return hash((self.setup_conditions, self.bits, self.termination_conditions))
+
+	def __eq__(self, other):
+		return ((type(self) == type(other)) and (self.bits == other.bits) and (self.setup_conditions == other.setup_conditions)
+			and (self.termination_conditions == other.termination_conditions) and (self.index is other.index))
+
+	def __len__(self):
+		return popcount(self.bits)
+
+	def __contains__(self, activity):
+		return bool(self.bits & (1 << self.index.get_number(activity)))
+
+
+	def check_index(self, other):
+		if not (self.index is other.index):
+			raise ValueError('BitsetModel: models of different activity indexes')
+
+
+	def with_bits(self, bits):
+		# conditions of this model
+		return BitsetModel(self.index, bits, self.setup_conditions, self.termination_conditions)
+
+	def union(self, other):
+		self.check_index(other)
+		return self.with_bits(self.bits | other.bits)
+
+	def intersection(self, other):
+		self.check_index(other)
+		return self.with_bits(self.bits & other.bits)
+
+	def difference(self, other):
+		self.check_index(other)
+		return self.with_bits(self.bits & ~other.bits)
+
+	def symmetric_difference(self, other):
+		self.check_index(other)
+		return self.with_bits(self.bits ^ other.bits)
+
+
+	def distance(self, other):
+		# number of activities in one model only
+		self.check_index(other)
+		return popcount(self.bits ^ other.bits)
+
+
+	def similarity(self, other):
+		# shared activities / activities of both (1.0 for two empty models)
+		self.check_index(other)
+		union = popcount(self.bits | other.bits)
+		if union == 0:
+			return 1.0
+		return popcount(self.bits & other.bits) / union
+
+
+	def get_activities(self):
+		return self.index.get_activities(self.bits)
+
+
+	def apply_interventions(self, interventions):
+		for intervention in interventions:
+			self.apply_intervention(intervention)
+
+	def apply_intervention(self, intervention):
+		# as Model.apply_intervention
+		if not (type(intervention) in (mnm_repr.Add, mnm_repr.Remove)):
+			raise TypeError('type of intervention not recognised: %s' % type(intervention))
+		element = intervention.condition_or_activity
+		if isinstance(element, mnm_repr.Condition):
+			new_set = set(self.setup_conditions)
+			if type(intervention) == mnm_repr.Add:
+				new_set.add(element)
+			else:
+				new_set.remove(element)
+			self.setup_conditions = frozenset(new_set)
+		elif isinstance(element, mnm_repr.Activity):
+			bit = 1 << self.index.get_number(element)
+			if type(intervention) == mnm_repr.Add:
+				self.bits |= bit
+			elif self.bits & bit:
+				self.bits &= ~bit
+			else:
+				raise KeyError(element)
+		else:
+			raise TypeError('intervention is neither condition nor activity: %s' % type(element))
+
+
+	def to_vector(self):
+		# bool per activity of the index (numpy array if available)
+		vector = [bool(self.bits & (1 << number)) for number in range(len(self.index))]
+		if numpy != None:
+			return numpy.array(vector, dtype=bool)
+		return vector
+
+
+def from_vector(index, vector, setup_conditions=[], termination_conditions=[], ID=None):
+	bits = 0
+	for (number, value) in enumerate(vector):
+		if value:
+			bits |= 1 << number
+	return BitsetModel(index, bits, setup_conditions, termination_conditions, ID)
+
+
+def from_model(model, index):
+	return BitsetModel(index, index.get_bits(model.intermediate_activities), model.setup_conditions, model.termination_conditions, model.ID)
+
+
+def to_model(bitset_model):
+	return mnm_repr.Model(bitset_model.ID, bitset_model.setup_conditions, bitset_model.get_activities(), bitset_model.termination_conditions)
+
+
+def similarity_matrix(bitset_models):
+	# similarity of every pair of models (list of rows); numpy: one matrix product
+	if bitset_models == []:
+		return []
+	for model in bitset_models[1:]:
+		bitset_models[0].check_index(model)
+	if numpy != None:
+		matrix = numpy.array([model.to_vector() for model in bitset_models], dtype=numpy.int64)
+		shared = matrix.dot(matrix.T)
+		sizes = numpy.diag(shared)
+		union = sizes[:, None] + sizes[None, :] - shared
+		similarities = numpy.where(union == 0, 1.0, shared / numpy.maximum(union, 1))
+		return similarities.tolist()
+	return [[model.similarity(other) for other in bitset_models] for model in bitset_models]
@@ -0,0 +1,82 @@
+#! /usr/bin/env python3
+# I, Robert Rozanski, the copyright holder of this work, release this work into the public domain. This applies worldwide. In some countries this may not be legally possible; if so: I grant anyone the right to use this work for any purpose, without any conditions, unless such conditions are required by law.
+
+import os
+import exporter
+import mnm_repr
+
+
+class DesignSession:
+	# part of the experiment design program kept for the whole run
+	# (ExperimentModule.session). gringo 3 can't keep a grounded program
+	# between solver calls, so the session keeps files instead:
+	# design elements, costs and max_number_activities (and the network,
+	# unless it's in the archive's fact base) are written once and rewritten
+	# only if the network changes; bans of performed experiments are
+	# appended as results arrive. Each cycle streams only working models,
+	# their probabilities and the score constant.
+	def __init__(self, archive, cost_model, use_costs, directory='./temp', sfx=''):
+		self.archive = archive
+		self.cost_model = cost_model
+		self.use_costs = use_costs
+		self.static_file = os.path.join(directory, 'facts_design_%s' % sfx)
+		self.bans_file = os.path.join(directory, 'facts_bans_%s' % sfx)
+		self.static_signature = None
+		self.banned_experiments = [] # known experiments already in the bans file
+		self.bans_written = False
+		if not os.path.isdir(directory):
+			os.makedirs(directory)
+
+
+	def get_files(self):
+		return [self.get_static_file(), self.get_bans_file()]
+
+
+	def get_static_file(self):
+		arch = self.archive
+		signature = (len(arch.mnm_entities), len(arch.mnm_compartments), len(arch.mnm_activities),
+			len(arch.import_activities), mnm_repr.generation, arch.fact_base == None, self.use_costs, self.cost_model)
+		if signature != self.static_signature:
+			self.write_static()
+			self.static_signature = signature
+		return self.static_file
+
+
+	def write_static(self):
+		arch = self.archive
+		with open(self.static_file, 'w') as f:
+			if arch.fact_base == None:
+				exporter.write_compartments(f, arch.mnm_compartments)
+				exporter.write_entities(f, arch.mnm_entities)
+				exporter.write_activities(f, arch.mnm_activities + arch.import_activities)
+			f.write(exporter.modeh_replacement(self.cost_model))
+			if self.use_costs:
+				for string in exporter.cost_rules(self.cost_model):
+					f.write(string)
+			f.write(exporter.max_number_activities_constant(len(arch.mnm_activities + arch.import_activities)))
+
+
+	def get_bans_file(self):
+		known = self.archive.known_results
+		number = len(self.banned_experiments)
+		# known results only grow; anything else: written again
+		if (not self.bans_written) or (len(known) < number) or any([known[i] is not self.banned_experiments[i] for i in range(number)]):
+			open(self.bans_file, 'w').close()
+			self.banned_experiments = []
+			self.bans_written = True
+		new_experiments = known[len(self.banned_experiments):]
+		if new_experiments != []:
+			with open(self.bans_file, 'a') as f:
+				for exp in new_experiments:
+					for res in exp.results:
+						f.write(exporter.ban_experiment(res.exp_description))
+			self.banned_experiments.extend(new_experiments)
+		return self.bans_file
+
+
+	def get_cycle_input(self, constant_for_scores):
+		exported = []
+		exported.extend(exporter.export_models_exp_design(self.archive.working_models))
+		exported.extend(exporter.models_nr_and_probabilities(self.archive.working_models))
+		exported.append(exporter.constant_for_calculating_score(constant_for_scores))
+		return exported
@@ -3,7 +3,7 @@
 
 # basic stuff
 from archive import InitialModels, InitialResults, ChosenExperiment, NewResults, AcceptedResults, RefutedModels, RevisedModel, UpdatedModelQuality, AdditionalModels, RevisionFail, AdditModProdFail, ExpDesignFail, CheckPointFail, CheckPointSuccess, RevisedIgnoredUpdate, AllModelsEmpiricallyEquivalent, RedundantModel
-import pickle
+import archive_format
 import re
 from mnm_repr import Activity, Condition, Add, Remove, Reaction, Transport, ComplexFormation, Expression, Growth
 from mnm_repr import Gene, Metabolite
@@ -24,10 +24,8 @@ from scipy import stats
 
 
 def read_archive(path):
-	pkl_file = open(path, 'rb')
-	archive = pickle.load(pkl_file)
-	pkl_file.close()
-	return archive
+	# compact or pickled archive
+	return archive_format.load(path)
 
 def get_all_paths(folder):
 	# filters out subdirectories
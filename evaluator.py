@@ -20,6 +20,11 @@ from revision_module import RevCAddB
 from revision_module import RevCAddR
 from revision_module import RevCIAddB# template: the best
 from revision_module import RevCIAddR# template: random
+from solver_cache import SolverCache
+from solver_runner import SolverRunner
+from fact_base import FactBase
+from oracle_store import OracleStore
+from journal import Journal
 
 
 class Evaluator:
@@ -28,6 +33,22 @@ class Evaluator:
 			ERMembrane(), Medium(), GolgiApparatus(), GolgiMembrane(), LipidParticle(),
 			MitochInnerMembrane(), MitochMatrix(), Nucleus(), PeroxisomalMembrane(),
 			Peroxisome(), VacuolarMembrane(), Vacuole()]
+		# shared by all runs (and processes): identical programs are solved once.
+		# time_limit (s) and memory_limit (bytes) per solver call can be set here;
+		# workers: concurrent solver calls (consistency checks, revisions)
+		self.solver_runner = SolverRunner(SolverCache('./temp/solver_cache'), workers=4)
+		# oracle outcomes of all repetitions and configurations of a test case
+		self.oracle_store = OracleStore('./temp/oracle_store')
+		# seconds per experiment design (None: until optimum is proven)
+		self.design_time_budget = None
+		# solver portfolios (solver_runner.CLASP_PORTFOLIO; for revision: clasp
+		# executables given to XHAIL); None: one solver per call
+		self.design_portfolio = None
+		self.revision_portfolio = None
+		# journals of runs (events, overseer's state): resume continues
+		# interrupted runs (crash, reboot) instead of starting them again
+		self.journal_directory = './temp/journals'
+		self.resume = False
 
 
 	def test_all_single_process(self):
@@ -144,6 +165,7 @@ class Evaluator:
 #						for act in archive_.mnm_activities + archive_.import_activities:
 #							print(act.reversibility)
 
+						archive_.fact_base = FactBase(archive_, sfx=suffix, resume=self.resume)
 						archive_.record(InitialModels(case['initial_models']))
 
 						qual_m = qual(archive_)
@@ -158,6 +180,11 @@ class Evaluator:
 						cost_model.remove_None_valued_elements()
 
 						exp_m = BasicExpModuleWithCosts(archive_, cost_model, sfx=suffix)
+						rev_m.runner = self.solver_runner
+						exp_m.runner = self.solver_runner
+						exp_m.time_budget = self.design_time_budget
+						exp_m.portfolio = self.design_portfolio
+						rev_m.portfolio = self.revision_portfolio
 
 						# SloppyOracle
 						# error_parameter between 0.00 and 1.00
@@ -165,13 +192,17 @@ class Evaluator:
 							case['activities_ref'], case['model_of_ref'],
 							case['all_entities'], self.compartments,
 							case['all_activities'], sfx=suffix, error_parameter=0.00)
+						oracle_.runner = self.solver_runner
+						oracle_.store = self.oracle_store
 
 						max_numb_cycles = 10000
 						max_time = 24
 
-						yield OverseerWithModQuality(archive_, rev_m, exp_m,
+						overseer = OverseerWithModQuality(archive_, rev_m, exp_m,
 							oracle_, threshold_addit_mods, qual_m, max_numb_cycles,
 							max_time, suffix, stop_threshold)
+						overseer.attach_journal(Journal(self.journal_directory, suffix), self.resume)
+						yield overseer
 
 
 	def test_generator(self, tpl):
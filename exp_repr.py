@@ -1,6 +1,9 @@
 #! /usr/bin/env python3
 # I, Robert Rozanski, the copyright holder of this work, release this work into the public domain. This applies worldwide. In some countries this may not be legally possible; if so: I grant anyone the right to use this work for any purpose, without any conditions, unless such conditions are required by law.
 
+import mnm_repr
+
+
 class ExperimentType:
 	def __init__(self):
 		self.ignoring_penalty = 1
@@ -91,16 +94,39 @@ class ReconstructionTransporterRequired(ExperimentType):
 
 
 
-class ExperimentDescription:
-	def __init__(self, exp_type, interventions=[]):
-		self.experiment_type = exp_type
-		self.interventions = frozenset(interventions)
+class ExperimentDescription(mnm_repr.ValueObject):
+	# immutable; one object for the same experiment type and interventions (mnm_repr.interned)
+	__slots__ = ('experiment_type', 'interventions', '_hash', '__weakref__')
+	fields = ('experiment_type', 'interventions')
+
+	def __new__(cls, *values):
+		# exp_type, interventions=[]
+		if len(values) == 1:
+			values = (values[0], [])
+		if len(values) == 0:
+			return mnm_repr.get_value_object(cls, values)
+		(exp_type, interventions) = values
+		interventions = frozenset(interventions)
+		# experiment types: by value (built for each description)
+		key = (cls, exp_type, frozenset([id(intervention) for intervention in interventions]))
+		try:
+			return mnm_repr.interned[key]
+		except KeyError:
+			pass
+		obj = mnm_repr.get_value_object(cls, ())
+		object.__setattr__(obj, 'experiment_type', exp_type)
+		object.__setattr__(obj, 'interventions', interventions)
+		mnm_repr.interned[key] = obj
+		return obj
 
 	def __hash__(self):
-		return hash((self.experiment_type, self.interventions))
+		value = mnm_repr.cached_hash(self)
+		if value == None:
+			value = mnm_repr.set_hash(self, (self.experiment_type, self.interventions))
+		return value
 
 	def __eq__(self, other):
-		return ((hash(self) == hash(other)) and (type(self) == type(other)))
+		return (self is other) or ((hash(self) == hash(other)) and (type(self) == type(other)))
 
 class Result:
 	def __init__(self, ID, exp_description, outcome):
@@ -111,6 +137,12 @@ class Result:
 	def __hash__(self):
 		return hash((self.ID, self.exp_description, self.outcome))
 
+	def __getstate__(self):
+		# cached fact string (exporter) is not pickled
+		state = self.__dict__.copy()
+		state.pop('_facts', None)
+		return state
+
 	def __eq__(self, other):
 		return ((hash(self) == hash(other)) and (type(self) == type(other)))
 
@@ -2,8 +2,13 @@
 # I, Robert Rozanski, the copyright holder of this work, release this work into the public domain. This applies worldwide. In some countries this may not be legally possible; if so: I grant anyone the right to use this work for any purpose, without any conditions, unless such conditions are required by law.
 
 import exporter
+import answer_parser
+from rule_library import RuleLibrary
 import random
-import subprocess
+from solver_runner import SolverRunner
+from design_session import DesignSession
+from native_designer import NativeDesigner
+from model_semantics import UndecidedError
 
 from exp_repr import DetectionEntity, LocalisationEntity, DetectionActivity, AdamTwoFactorExperiment, ReconstructionActivity, ReconstructionEnzReaction, ReconstructionTransporterRequired, ExperimentDescription
 
@@ -11,7 +16,8 @@ from mnm_repr import PresentEntity, Add, Remove
 
 from archive import ExpDesignFail, ChosenExperiment, AllModelsEmpiricallyEquivalent
 
-from time import gmtime
+from time import gmtime, time
+from math import ceil
 
 class ExperimentModule:
 	# module for experiment design.
@@ -19,48 +25,170 @@ class ExperimentModule:
 	# If no model quality modules is used, then model quality = 1
 	# and is constant throught development time.
 	# In that case the algorithm just splits set of working models in half.
-	def __init__(self, archive, cost_model, use_costs, sfx=""):
+	def __init__(self, archive, cost_model, use_costs, sfx="", directory='./temp'):
 		self.archive = archive
 		self.cost_model = cost_model
 		self.use_costs = use_costs
-		self.work_file = './temp/workfile_gringo_clasp_%s' % sfx
+		# evaluator replaces it with the runner shared by all modules
+		self.runner = SolverRunner()
+		self.rule_library = RuleLibrary()
+		# per-run part of the program kept in files (None: everything exported each cycle)
+		self.session = DesignSession(archive, cost_model, use_costs, directory, sfx)
+		# 'native': NativeDesigner (solver if it can't decide); 'asp': solver only;
+		# 'verify': both, designs compared
+		self.design_mode = 'asp'
+		self.native_designer = NativeDesigner(archive, cost_model, use_costs)
+		# seconds per design (None: until optimum is proven); optimal: False
+		# if the last design stopped before proving the optimum or used the fallback
+		self.time_budget = None
+		self.optimal = True
+		# at most this many optimal designs (None: all of them). The solver then
+		# enumerates optimal answers from a random seed and stops after max_answers
+		# (no symmetric optima enumerated); native designs are sampled
+		self.max_answers = None
+		# solver seeds: own generator (fixed seed), so the sequence of
+		# the random module (experiment choice) doesn't depend on max_answers
+		self.seed_random = random.Random(0)
+		# solver portfolio: (name, clasp options) run at once, first proven wins
+		# (solver_runner.CLASP_PORTFOLIO; None: one solver)
+		self.portfolio = None
 
 
 	def design_experiments(self):
-		exp_input = self.prepare_input_for_exp_design()
-		out = self.write_and_execute_gringo_clasp(exp_input)
+		if not (self.design_mode in ['native', 'asp', 'verify']):
+			raise ValueError('design_experiments: design mode not recognised: %s' % self.design_mode)
+		self.optimal = True
+		if self.design_mode == 'native':
+			try:
+				return self.design_experiments_native()
+			except UndecidedError:
+				pass
+		experiments = self.design_experiments_asp()
+		if self.design_mode == 'verify':
+			self.verify_design(experiments)
+		return experiments
+
+
+	def design_experiments_native(self):
+		# cost usage can be switched after creation
+		self.native_designer.use_costs = self.use_costs
+		deadline = None
+		if self.time_budget != None:
+			deadline = time() + self.time_budget
+		answers = self.native_designer.design(self.calculate_constant_for_scores(), deadline)
+		self.optimal = self.native_designer.optimal
+		if answers == []:
+			return AllModelsEmpiricallyEquivalent(self.archive.working_models)
+		if (self.max_answers != None) and (len(answers) > self.max_answers):
+			answers = random.sample(answers, self.max_answers)
+		return [self.process_answer(list(components)) for components in answers]
+
+
+	def verify_design(self, experiments):
+		# the solver's optimum can't be worse than the native one; it's the same
+		# if the solver's experiment is among native candidates (number of interventions)
+		native = self.native_designer
+		native.use_costs = self.use_costs
+		constant = self.calculate_constant_for_scores()
+		try:
+			answers = native.design(constant)
+		except UndecidedError:
+			# nothing to compare with
+			return
+		if isinstance(experiments, AllModelsEmpiricallyEquivalent) or (experiments == False):
+			if answers != []:
+				raise ValueError('verify_design: no solver design, native designs: %s' % answers)
+			return
+		native_best = None
+		if answers != []:
+			native_exp = self.process_answer(list(answers[0]))
+			native_best = native.evaluate(native_exp.experiment_type, native_exp.interventions, constant)
+		for exp in experiments:
+			objective = native.evaluate(exp.experiment_type, exp.interventions, constant)
+			if (native.max_interventions != None) and (len(exp.interventions) > native.max_interventions):
+				if (native_best != None) and ((objective == None) or (objective > native_best)):
+					raise ValueError('verify_design: solver design worse than native: %s, %s' % (objective, native_best))
+			elif objective != native_best:
+				raise ValueError('verify_design: solver and native designs differ: %s, %s' % (objective, native_best))
+
+
+	def design_experiments_asp(self):
+		rule_files = self.rule_library.get_files(self.get_design_rule_names())
+		if self.archive.fact_base != None:
+			rule_files.append(self.archive.fact_base.get_network_file())
+		if self.session != None:
+			# cost usage can be switched after creation
+			self.session.use_costs = self.use_costs
+			rule_files.extend(self.session.get_files())
+			exp_input = self.session.get_cycle_input(self.calculate_constant_for_scores())
+		else:
+			exp_input = self.prepare_input_for_exp_design()
+		out = self.write_and_execute_gringo_clasp(exp_input, rule_files)
 		experiments = self.process_output(out)
+		if experiments == False:
+			return self.design_fallback()
+		# time budget: best answers found so far
+		if (not isinstance(experiments, AllModelsEmpiricallyEquivalent)) and (not ('OPTIMUM FOUND' in out)):
+			self.optimal = False
 		return experiments
 
 
-	def write_and_execute_gringo_clasp(self, exp_input):
-		with open(self.work_file, 'w') as f:
-			for string in exp_input:
-				f.write(string)
-		# could suppress there warnig messages later on
-		gringo = subprocess.Popen(['gringo', self.work_file], stdout=subprocess.PIPE)
-		clasp = subprocess.Popen(['clasp', '-n', '0'], stdin=gringo.stdout, stdout=subprocess.PIPE)
-		gringo.stdout.close()
-		output_enc = clasp.communicate()[0]
-		output_dec = output_enc.decode('utf-8')
-		return output_dec
+	def design_fallback(self):
+		# no answer from the solver (time budget, solver failure):
+		# native design, whole search space (False if it can't decide)
+		self.optimal = False
+		try:
+			self.native_designer.use_costs = self.use_costs
+			answers = self.native_designer.design(self.calculate_constant_for_scores())
+		except UndecidedError:
+			return False
+		# no experiment among native candidates: solver might've found one
+		if answers == []:
+			return False
+		if (self.max_answers != None) and (len(answers) > self.max_answers):
+			answers = random.sample(answers, self.max_answers)
+		return [self.process_answer(list(components)) for components in answers]
+
+
+	def write_and_execute_gringo_clasp(self, exp_input, rule_files=None):
+		# rule_files: static rules (RuleLibrary; None: no files); exp_input: dynamic part only
+		clasp_options = ['-n', '0']
+		if self.max_answers != None:
+			clasp_options = ['-n', str(self.max_answers), '--opt-mode=optN', '--seed=%s' % self.seed_random.randint(0, 2**31 - 1), '--rand-freq=0.05']
+		if self.time_budget != None:
+			# clasp prints the best answers found when stopped
+			clasp_options.append('--time-limit=%s' % int(ceil(self.time_budget)))
+		# output streamed: only answers at the optimum kept
+		if self.portfolio != None:
+			return self.runner.portfolio_gringo_clasp(exp_input, rule_files, clasp_options, self.portfolio,
+				collector_factory=lambda: answer_parser.AnswerCollector(self.max_answers)).output
+		collector = answer_parser.AnswerCollector(self.max_answers)
+		return self.runner.gringo_clasp(exp_input, rule_files, clasp_options, collector=collector).output
+
+
+	def get_design_rule_names(self):
+		names = ['hide_show_statements', 'design_constraints_basic', 'advanced_exp_design_rules']
+		# * cost optimisation rule
+		if self.use_costs:
+			names.append('cost_minimisation_rules')
+		names.extend(['experiment_design_rules', 'interventions_rules', 'predictions_rules', 'models_rules'])
+		return names
 
 
 	def prepare_input_for_exp_design(self):
+		# dynamic part only; static rules: get_design_rule_names
 		exported = []
-		# export hide/show stuff
-		exported.extend(exporter.hide_show_statements())
-		exported.extend(exporter.export_compartments(self.archive.mnm_compartments))
-		exported.extend(exporter.export_entities(self.archive.mnm_entities))
-		exported.extend(exporter.export_activities(self.archive.mnm_activities + self.archive.import_activities))
+		# network: exported here unless it's in the archive's facts file
+		if self.archive.fact_base == None:
+			exported.extend(exporter.export_compartments(self.archive.mnm_compartments))
+			exported.extend(exporter.export_entities(self.archive.mnm_entities))
+			exported.extend(exporter.export_activities(self.archive.mnm_activities + self.archive.import_activities))
 		# export models info
 		exported.extend(exporter.export_models_exp_design(self.archive.working_models))
 		# + probabilities and numbers
 		exported.extend(exporter.models_nr_and_probabilities(self.archive.working_models))
 		# export design elements (modeh eqiv)
 		exported.append(exporter.modeh_replacement(self.cost_model))
-		# export rules forcing and restricting exp design
-		exported.extend(exporter.design_constraints_basic())
 		for exp in self.archive.known_results:
 			exp_descriptions = [res.exp_description for res in exp.results]
 			for des in exp_descriptions:
@@ -68,19 +196,12 @@ class ExperimentModule:
 				exported.extend(exporter.ban_experiment(des))
 		# calculate constant for scores and export it
 		exported.append(exporter.constant_for_calculating_score(self.calculate_constant_for_scores()))
-		# export scoring rules/optimisation
-		exported.extend(exporter.advanced_exp_design_rules())
-		# * export cost, and optimisation rule for that
+		# * export cost
 		if self.use_costs:
 			exported.extend(exporter.cost_rules(self.cost_model))
-			exported.extend(exporter.cost_minimisation_rules())
 		else:
 			pass
-			# export design rules
-		exported.extend(exporter.experiment_design_rules())
-		exported.extend(exporter.interventions_rules())
-		exported.extend(exporter.predictions_rules())
-		exported.extend(exporter.models_rules(len(self.archive.mnm_activities + self.archive.import_activities)))
+		exported.append(exporter.max_number_activities_constant(len(self.archive.mnm_activities + self.archive.import_activities)))
 		return exported
 
 
@@ -103,57 +224,54 @@ class ExperimentModule:
 			return False
 		# process answers:
 		for ans in answers:
-			components = ans.split(' ')
-			exp_type = self.get_expType(components)
-			# decide what to do next based on the type
-			if exp_type == 'design_type(adam_two_factor_exp)':
-				expT = self.process_exp_type_adam_two_factor(components)
-			elif exp_type == 'design_type(transp_reconstruction_exp)':
-				expT = self.process_exp_type_transp_reconstruction(components)
-			elif exp_type == 'design_type(enz_reconstruction_exp)':
-				expT = self.process_exp_type_enz_reconstruction(components)
-			elif exp_type == 'design_type(basic_reconstruction_exp)':
-				expT = self.process_exp_type_basic_reconstruction(components)
-			elif exp_type == 'design_type(detection_activity_exp)':
-				expT = self.process_exp_type_detection_activity(components)
-			elif exp_type == 'design_type(localisation_entity_exp)':
-				expT = self.process_exp_type_localisation_entity(components)
-			elif exp_type == 'design_type(detection_entity_exp)':
-				expT = self.process_exp_type_detection_entity(components)
-			else:
-				raise ValueError('process_output: design_type(...) not recognised: %s' % exp_type)
-
-			interventions = self.get_interventions(components)
-			# if not all components of an answer were used:
-			# sth went wrong in design phase or processing
-			if len(components) > 0:
-				raise ValueError("process_output: not all components used: %s" % components)
-			experiments.append(ExperimentDescription(expT, interventions))
+			experiments.append(self.process_answer(ans.split(' ')))
 		return experiments
 
 
+	def process_answer(self, components):
+		exp_type = self.get_expType(components)
+		# decide what to do next based on the type
+		if exp_type == 'design_type(adam_two_factor_exp)':
+			expT = self.process_exp_type_adam_two_factor(components)
+		elif exp_type == 'design_type(transp_reconstruction_exp)':
+			expT = self.process_exp_type_transp_reconstruction(components)
+		elif exp_type == 'design_type(enz_reconstruction_exp)':
+			expT = self.process_exp_type_enz_reconstruction(components)
+		elif exp_type == 'design_type(basic_reconstruction_exp)':
+			expT = self.process_exp_type_basic_reconstruction(components)
+		elif exp_type == 'design_type(detection_activity_exp)':
+			expT = self.process_exp_type_detection_activity(components)
+		elif exp_type == 'design_type(localisation_entity_exp)':
+			expT = self.process_exp_type_localisation_entity(components)
+		elif exp_type == 'design_type(detection_entity_exp)':
+			expT = self.process_exp_type_detection_entity(components)
+		else:
+			raise ValueError('process_output: design_type(...) not recognised: %s' % exp_type)
+
+		interventions = self.get_interventions(components)
+		# if not all components of an answer were used:
+		# sth went wrong in design phase or processing
+		if len(components) > 0:
+			raise ValueError("process_output: not all components used: %s" % components)
+		return ExperimentDescription(expT, interventions)
+
+
 	def get_answers(self, strings):
-		answers = []
+		# answers at the optimum (as strings), one pass over the output
+		collector = answer_parser.AnswerCollector()
+		for st in strings:
+			collector.add_line(st)
+		collector.finish()
 		# can fail if the solver fails
 		# (not enough RAM; bad memory allocation...)
-		try:
-			optimum = [st.split('Optimization : ')[1] for st in strings if st.startswith('Optimization : ')][0]
-		except IndexError as err:
+		optimum = collector.get_optimum()
+		if optimum == None:
 			print('experiment_module: solver failed.')
 			print('output as strings: %s' % strings)
 			return False
-
-		for st in strings:
-			if not st.startswith('Answer: '):
-				continue
-			# get two after 'answer'
-			optimization = strings[strings.index(st) + 2].split('Optimization: ')[1]
-			if optimization == optimum:
-				# get one after 'answer'
-				answers.append(strings[strings.index(st) + 1])
-			else:
-				pass
-		return answers
+		if (collector.optimization == None) or (collector.optimization[0] != optimum):
+			return []
+		return [' '.join(atoms) for atoms in collector.answers]
 
 
 	def get_expType(self, components):
@@ -279,8 +397,8 @@ class ExperimentModule:
 
 
 class BasicExpModuleNoCosts(ExperimentModule):
-	def __init__(self, archive, cost_model, sfx=""):
-		ExperimentModule.__init__(self, archive, cost_model, use_costs=False, sfx=sfx)
+	def __init__(self, archive, cost_model, sfx="", directory='./temp'):
+		ExperimentModule.__init__(self, archive, cost_model, use_costs=False, sfx=sfx, directory=directory)
 
 	def get_experiment(self):
 		exps = self.design_experiments()
@@ -289,12 +407,12 @@ class BasicExpModuleNoCosts(ExperimentModule):
 		elif exps == False:
 			self.archive.record(ExpDesignFail())
 		else:
-			self.archive.record(ChosenExperiment([random.choice(exps)]))
+			self.archive.record(ChosenExperiment([random.choice(exps)], self.optimal))
 
 
 class BasicExpModuleWithCosts(ExperimentModule):
-	def __init__(self, archive, cost_model, sfx=""):
-		ExperimentModule.__init__(self, archive, cost_model, use_costs=True, sfx=sfx)
+	def __init__(self, archive, cost_model, sfx="", directory='./temp'):
+		ExperimentModule.__init__(self, archive, cost_model, use_costs=True, sfx=sfx, directory=directory)
 
 	def get_experiment(self):
 		exps = self.design_experiments()
@@ -303,4 +421,4 @@ class BasicExpModuleWithCosts(ExperimentModule):
 		elif exps == False:
 			self.archive.record(ExpDesignFail())
 		else:
-			self.archive.record(ChosenExperiment([random.choice(exps)]))
+			self.archive.record(ChosenExperiment([random.choice(exps)], self.optimal))
@@ -7,191 +7,297 @@ import exp_repr
 from exp_repr import DetectionEntity, LocalisationEntity, DetectionActivity, AdamTwoFactorExperiment
 from mnm_repr import Activity, Condition
 
+class ListSink:
+	# collects written strings; keeps the list-returning export_* API
+	# on top of the write_* functions (which accept any object with write(),
+	# e.g. a buffered file or solver's stdin)
+	def __init__(self):
+		self.strings = []
+		self.write = self.strings.append
+
+
 def export_entities(entities):
-	strings = []
+	sink = ListSink()
+	write_entities(sink, entities)
+	return sink.strings
+
+
+def write_entities(sink, entities):
+	write = sink.write
 	for ent in entities:
-		if isinstance(ent, mnm_repr.Gene):
-			strings.append("\ngene(%s,%s)." %(ent.ID, ent.version))
-		elif isinstance(ent, mnm_repr.Metabolite):
-			strings.append("\nmetabolite(%s,%s)." %(ent.ID, ent.version))
-		elif isinstance(ent, mnm_repr.Protein):
-			strings.append("\nprotein(%s,%s)." %(ent.ID, ent.version))
-		elif isinstance(ent, mnm_repr.Complex):
-			strings.append("\ncomplex(%s,%s)." %(ent.ID, ent.version))
-		else:
-			raise TypeError("export_entities: entity type not recognised:%s" % type(ent))
+		for string in entity_facts(ent):
+			write(string)
 
-		if ent.properties == frozenset([]):
-			continue
 
-		for prop in ent.properties:
-			if isinstance(prop, mnm_repr.Catalyses):
-				strings.append("\ncatalyses(%s,%s,%s)." % (ent.ID, ent.version, prop.activity.ID))
-			elif isinstance(prop, mnm_repr.Transports):
-				strings.append("\ntransports(%s,%s,%s)." % (ent.ID, ent.version, prop.activity.ID))
-			else:
-				raise TypeError("export_entities: property type not recognised:%s" % type(prop))
+def entity_facts(ent):
+	# fact strings cached on the entity; valid until any element changes
+	# (see mnm_repr.generation), e.g. IDs reassigned by evaluator
+	cached = getattr(ent, '_facts', None)
+	if (cached != None) and (cached[0] == mnm_repr.generation):
+		return cached[1]
+
+	strings = []
+	if isinstance(ent, mnm_repr.Gene):
+		strings.append("\ngene(%s,%s)." %(ent.ID, ent.version))
+	elif isinstance(ent, mnm_repr.Metabolite):
+		strings.append("\nmetabolite(%s,%s)." %(ent.ID, ent.version))
+	elif isinstance(ent, mnm_repr.Protein):
+		strings.append("\nprotein(%s,%s)." %(ent.ID, ent.version))
+	elif isinstance(ent, mnm_repr.Complex):
+		strings.append("\ncomplex(%s,%s)." %(ent.ID, ent.version))
+	else:
+		raise TypeError("export_entities: entity type not recognised:%s" % type(ent))
+
+	for prop in ent.properties:
+		if isinstance(prop, mnm_repr.Catalyses):
+			strings.append("\ncatalyses(%s,%s,%s)." % (ent.ID, ent.version, prop.activity.ID))
+		elif isinstance(prop, mnm_repr.Transports):
+			strings.append("\ntransports(%s,%s,%s)." % (ent.ID, ent.version, prop.activity.ID))
+		else:
+			raise TypeError("export_entities: property type not recognised:%s" % type(prop))
 
+	strings = tuple(strings)
+	ent._facts = (mnm_repr.generation, strings)
 	return strings
 
 
 def export_compartments(compartments):
+	sink = ListSink()
+	write_compartments(sink, compartments)
+	return sink.strings
+
+
+def write_compartments(sink, compartments):
 	comps = ";".join([comp.ID for comp in compartments])
-	return [comps.join(['\ncompartment(', ').'])]
+	sink.write(comps.join(['\ncompartment(', ').']))
 
 
 def export_activities(activities):
-	strings = []
-	for act in activities:
-		if act.reversibility == False:
-			if isinstance(act, mnm_repr.Growth):
-				strings.append('\ngrowth(%s).' % act.ID)
-			elif isinstance(act, mnm_repr.Expression):
-				strings.append('\nexpression(%s).' % act.ID)
-			elif isinstance(act, mnm_repr.Reaction):
-				strings.append('\nreaction(%s).' % act.ID)
-			elif isinstance(act, mnm_repr.Transport):
-				strings.append('\ntransport(%s).' % act.ID)
-			elif isinstance(act, mnm_repr.ComplexFormation):
-				strings.append('\ncomplex_formation(%s).' % act.ID)
-			else:
-				raise TypeError("export_activities: activity type not recognised: %s" % type(act))
-
-		elif act.reversibility == True:
-			strings.append('\nreverse(%s,%s_rev).' % (act.ID,act.ID))
-			if isinstance(act, mnm_repr.Growth):
-				strings.append('\ngrowth(%s).' % act.ID)
-				strings.append('\ngrowth(%s_rev).' % act.ID)
-			elif isinstance(act, mnm_repr.Expression):
-				strings.append('\nexpression(%s).' % act.ID)
-				strings.append('\nexpression(%s_rev).' % act.ID)
-			elif isinstance(act, mnm_repr.Reaction):
-				strings.append('\nreaction(%s).' % act.ID)
-				strings.append('\nreaction(%s_rev).' % act.ID)
-			elif isinstance(act, mnm_repr.Transport):
-				strings.append('\ntransport(%s).' % act.ID)
-				strings.append('\ntransport(%s_rev).' % act.ID)
-			elif isinstance(act, mnm_repr.ComplexFormation):
-				strings.append('\ncomplex_formation(%s).' % act.ID)
-				strings.append('\ncomplex_formation(%s_rev).' % act.ID)
-			else:
-				raise TypeError("export_activities: activity type not recognised: %s" % type(act))
+	sink = ListSink()
+	write_activities(sink, activities)
+	return sink.strings
 
-		else:
-			raise ValueError("export_activities: activity's reversibility status not specified")
 
+def write_activities(sink, activities):
+	write = sink.write
 	for act in activities:
-		strings.extend(export_activity(act))
-	return strings
+		for string in activity_facts(act):
+			write(string)
+
+	for act in activities:
+		for string in activity_detail_facts(act):
+			write(string)
 
 
 def export_activity(activity):
+	return list(activity_detail_facts(activity))
+
+
+def write_activity(sink, activity):
+	for string in activity_detail_facts(activity):
+		sink.write(string)
+
+
+def activity_facts(act):
+	# type facts cached on the activity;
+	# valid until any element changes (see mnm_repr.generation)
+	cached = getattr(act, '_facts', None)
+	if (cached != None) and (cached[0] == mnm_repr.generation):
+		return cached[1]
+
 	strings = []
-	if activity.reversibility == False:
-		for req in activity.required_conditions:
-			strings.extend(export_required_condition(req, activity))
-		for change in activity.changes:
-			strings.extend(export_change(change, activity))
-
-	elif activity.reversibility == True:
-		for req in activity.required_conditions:
-			strings.extend(export_required_condition(req, activity))
-		for change in activity.changes:
-			strings.extend(export_change(change, activity))
+	if act.reversibility == False:
+		if isinstance(act, mnm_repr.Growth):
+			strings.append('\ngrowth(%s).' % act.ID)
+		elif isinstance(act, mnm_repr.Expression):
+			strings.append('\nexpression(%s).' % act.ID)
+		elif isinstance(act, mnm_repr.Reaction):
+			strings.append('\nreaction(%s).' % act.ID)
+		elif isinstance(act, mnm_repr.Transport):
+			strings.append('\ntransport(%s).' % act.ID)
+		elif isinstance(act, mnm_repr.ComplexFormation):
+			strings.append('\ncomplex_formation(%s).' % act.ID)
+		else:
+			raise TypeError("export_activities: activity type not recognised: %s" % type(act))
+
+	elif act.reversibility == True:
+		strings.append('\nreverse(%s,%s_rev).' % (act.ID,act.ID))
+		if isinstance(act, mnm_repr.Growth):
+			strings.append('\ngrowth(%s).' % act.ID)
+			strings.append('\ngrowth(%s_rev).' % act.ID)
+		elif isinstance(act, mnm_repr.Expression):
+			strings.append('\nexpression(%s).' % act.ID)
+			strings.append('\nexpression(%s_rev).' % act.ID)
+		elif isinstance(act, mnm_repr.Reaction):
+			strings.append('\nreaction(%s).' % act.ID)
+			strings.append('\nreaction(%s_rev).' % act.ID)
+		elif isinstance(act, mnm_repr.Transport):
+			strings.append('\ntransport(%s).' % act.ID)
+			strings.append('\ntransport(%s_rev).' % act.ID)
+		elif isinstance(act, mnm_repr.ComplexFormation):
+			strings.append('\ncomplex_formation(%s).' % act.ID)
+			strings.append('\ncomplex_formation(%s_rev).' % act.ID)
+		else:
+			raise TypeError("export_activities: activity type not recognised: %s" % type(act))
+
+	else:
+		raise ValueError("export_activities: activity's reversibility status not specified")
+
+	strings = tuple(strings)
+	act._facts = (mnm_repr.generation, strings)
+	return strings
+
+
+def activity_detail_facts(act):
+	# requirements and changes facts, cached like activity_facts
+	cached = getattr(act, '_detail_facts', None)
+	if (cached != None) and (cached[0] == mnm_repr.generation):
+		return cached[1]
+
+	sink = ListSink()
+	if act.reversibility == False:
+		for req in act.required_conditions:
+			write_required_condition(sink, req, act)
+		for change in act.changes:
+			write_change(sink, change, act)
+
+	elif act.reversibility == True:
+		for req in act.required_conditions:
+			write_required_condition(sink, req, act)
+		for change in act.changes:
+			write_change(sink, change, act)
 		# export reverse version
-		for change in list(activity.changes) + [x for x in activity.required_conditions if (not isinstance(x, mnm_repr.PresentEntity))]:
-			strings.extend(export_required_condition(change, activity, '_rev'))
-		for req in [x for x in activity.required_conditions if isinstance(x, mnm_repr.PresentEntity)]:
-			strings.extend(export_change(req, activity, '_rev'))
+		for change in list(act.changes) + [x for x in act.required_conditions if (not isinstance(x, mnm_repr.PresentEntity))]:
+			write_required_condition(sink, change, act, '_rev')
+		for req in [x for x in act.required_conditions if isinstance(x, mnm_repr.PresentEntity)]:
+			write_change(sink, req, act, '_rev')
 
 	else:
 		raise ValueError("export_activity: activity's reversibility status not specified")
 
+	strings = tuple(sink.strings)
+	act._detail_facts = (mnm_repr.generation, strings)
 	return strings
 
 
 def export_required_condition(req, activity, suffix=''):
-	strings = []
+	sink = ListSink()
+	write_required_condition(sink, req, activity, suffix)
+	return sink.strings
+
+
+def write_required_condition(sink, req, activity, suffix=''):
 	if isinstance(req, mnm_repr.PresentEntity):
-		strings.append('\nsubstrate(%s,%s,%s,%s%s).' % (req.entity.ID, req.entity.version, req.compartment.ID, activity.ID, suffix))
+		sink.write('\nsubstrate(%s,%s,%s,%s%s).' % (req.entity.ID, req.entity.version, req.compartment.ID, activity.ID, suffix))
 	elif isinstance(req, mnm_repr.PresentCatalyst):
-		strings.append('\nenz_required(%s%s).' % (activity.ID, suffix))
-		strings.append('\nenz_compartment(%s,%s%s).' % (req.compartment.ID, activity.ID, suffix))
+		sink.write('\nenz_required(%s%s).' % (activity.ID, suffix))
+		sink.write('\nenz_compartment(%s,%s%s).' % (req.compartment.ID, activity.ID, suffix))
 	elif isinstance(req, mnm_repr.PresentTransporter):
-		strings.append('\ntransp_required(%s%s).' % (activity.ID, suffix))
-		strings.append('\ntransp_compartment(%s,%s%s).' % (req.compartment.ID, activity.ID, suffix))
+		sink.write('\ntransp_required(%s%s).' % (activity.ID, suffix))
+		sink.write('\ntransp_compartment(%s,%s%s).' % (req.compartment.ID, activity.ID, suffix))
 	else:
 		raise TypeError("export_activity: requirement type not recognised:%s" % type(req))
-	return strings
 
 def export_change(change, activity, suffix=''):
-	return ['\nproduct(%s,%s,%s,%s%s).' % (change.entity.ID, change.entity.version, change.compartment.ID, activity.ID, suffix)]
+	sink = ListSink()
+	write_change(sink, change, activity, suffix)
+	return sink.strings
+
+
+def write_change(sink, change, activity, suffix=''):
+	sink.write('\nproduct(%s,%s,%s,%s%s).' % (change.entity.ID, change.entity.version, change.compartment.ID, activity.ID, suffix))
 
 
 def export_results(results):
-	strings = []
+	sink = ListSink()
+	write_results(sink, results)
+	return sink.strings
+
+
+def write_results(sink, results):
+	write = sink.write
 	for result in results:
-		ID = result.ID
-		out = result.outcome
-		if isinstance(result.exp_description.experiment_type, exp_repr.ReconstructionTransporterRequired):
-			act = result.exp_description.experiment_type.transport_activity_id
-			trp = result.exp_description.experiment_type.transporter_id
-			strings.append('\nresult(%s, experiment(transp_reconstruction_exp, %s, %s), %s).' % (ID, act, trp, out))
-
-		elif isinstance(result.exp_description.experiment_type, exp_repr.ReconstructionEnzReaction):
-			act = result.exp_description.experiment_type.reaction_id
-			enz = result.exp_description.experiment_type.enzyme_id
-			strings.append('\nresult(%s, experiment(enz_reconstruction_exp, %s, %s), %s).' % (ID, act, enz, out))
-
-		elif isinstance(result.exp_description.experiment_type, exp_repr.ReconstructionActivity):
-			act = result.exp_description.experiment_type.activity_id
-			strings.append('\nresult(%s, experiment(basic_reconstruction_exp, %s), %s).' % (ID, act, out))
-
-		elif isinstance(result.exp_description.experiment_type, exp_repr.AdamTwoFactorExperiment):
-			gene = result.exp_description.experiment_type.gene_id
-			met = result.exp_description.experiment_type.metabolite_id
-			strings.append('\nresult(%s, experiment(adam_two_factor_exp, %s, %s), %s).' % (ID, gene, met, out))
-
-		elif isinstance(result.exp_description.experiment_type, exp_repr.DetectionActivity):
-			act = result.exp_description.experiment_type.activity_id
-			strings.append('\nresult(%s, experiment(detection_activity_exp, %s), %s).' % (ID, act, out))
-
-		elif isinstance(result.exp_description.experiment_type, exp_repr.LocalisationEntity):
-			ent = result.exp_description.experiment_type.entity_id
-			comp = result.exp_description.experiment_type.compartment_id
-			strings.append('\nresult(%s, experiment(localisation_entity_exp, %s, %s), %s).' % (ID, ent, comp, out))
-
-		elif isinstance(result.exp_description.experiment_type, exp_repr.DetectionEntity):
-			ent = result.exp_description.experiment_type.entity_id
-			strings.append('\nresult(%s, experiment(detection_entity_exp, %s), %s).' % (ID, ent, out))
+		write(result_fact(result))
+
+
+def result_fact(result):
+	# cached on the result, keyed on its ID and outcome
+	# (experiment description doesn't change)
+	key = (result.ID, result.outcome)
+	cached = result.__dict__.get('_facts')
+	if (cached != None) and (cached[0] == key):
+		return cached[1]
+
+	ID = result.ID
+	out = result.outcome
+	if isinstance(result.exp_description.experiment_type, exp_repr.ReconstructionTransporterRequired):
+		act = result.exp_description.experiment_type.transport_activity_id
+		trp = result.exp_description.experiment_type.transporter_id
+		fact = '\nresult(%s, experiment(transp_reconstruction_exp, %s, %s), %s).' % (ID, act, trp, out)
+
+	elif isinstance(result.exp_description.experiment_type, exp_repr.ReconstructionEnzReaction):
+		act = result.exp_description.experiment_type.reaction_id
+		enz = result.exp_description.experiment_type.enzyme_id
+		fact = '\nresult(%s, experiment(enz_reconstruction_exp, %s, %s), %s).' % (ID, act, enz, out)
+
+	elif isinstance(result.exp_description.experiment_type, exp_repr.ReconstructionActivity):
+		act = result.exp_description.experiment_type.activity_id
+		fact = '\nresult(%s, experiment(basic_reconstruction_exp, %s), %s).' % (ID, act, out)
+
+	elif isinstance(result.exp_description.experiment_type, exp_repr.AdamTwoFactorExperiment):
+		gene = result.exp_description.experiment_type.gene_id
+		met = result.exp_description.experiment_type.metabolite_id
+		fact = '\nresult(%s, experiment(adam_two_factor_exp, %s, %s), %s).' % (ID, gene, met, out)
+
+	elif isinstance(result.exp_description.experiment_type, exp_repr.DetectionActivity):
+		act = result.exp_description.experiment_type.activity_id
+		fact = '\nresult(%s, experiment(detection_activity_exp, %s), %s).' % (ID, act, out)
+
+	elif isinstance(result.exp_description.experiment_type, exp_repr.LocalisationEntity):
+		ent = result.exp_description.experiment_type.entity_id
+		comp = result.exp_description.experiment_type.compartment_id
+		fact = '\nresult(%s, experiment(localisation_entity_exp, %s, %s), %s).' % (ID, ent, comp, out)
+
+	elif isinstance(result.exp_description.experiment_type, exp_repr.DetectionEntity):
+		ent = result.exp_description.experiment_type.entity_id
+		fact = '\nresult(%s, experiment(detection_entity_exp, %s), %s).' % (ID, ent, out)
 
-		else:
-			raise TypeError('export_results: result type not recognised:%s' % type(result))
+	else:
+		raise TypeError('export_results: result type not recognised:%s' % type(result))
 
-	return strings
+	result._facts = (key, fact)
+	return fact
 
 
 def export_models(models_results):
-	strings = []
+	sink = ListSink()
+	write_models(sink, models_results.keys())
+	return sink.strings
+
+
+def write_models(sink, models):
 	# model().
-	joined_models = ';'.join([x.ID for x in models_results.keys()])
-	strings.append(joined_models.join(['\nmodel(', ').']))
+	joined_models = ';'.join([x.ID for x in models])
+	sink.write(joined_models.join(['\nmodel(', ').']))
 	# specification:
-	for model in models_results.keys():
-		strings.extend(export_model_specification(model))
+	for model in models:
+		write_model_specification(sink, model)
 
-	return strings
 
 def export_model_specification(model):
-	strings = []
+	sink = ListSink()
+	write_model_specification(sink, model)
+	return sink.strings
+
+
+def write_model_specification(sink, model):
+	write = sink.write
 	# setup
 	for cond in model.setup_conditions:
-		strings.append('\nadded_to_model(setup_present(%s,%s,%s),%s).' % (cond.entity.ID, cond.entity.version, cond.compartment.ID, model.ID))
+		write('\nadded_to_model(setup_present(%s,%s,%s),%s).' % (cond.entity.ID, cond.entity.version, cond.compartment.ID, model.ID))
 	# activities
 	for act in model.intermediate_activities:
-		strings.append('\nadded_to_model(%s,%s).' % (act.ID, model.ID))
-
-	return strings
+		write('\nadded_to_model(%s,%s).' % (act.ID, model.ID))
 
 
 def export_termination_conds_revision(base_model):
@@ -235,6 +341,32 @@ def export_relevancy_results_consistency(models_results, base_model):
 	return strings
 
 
+def export_termination_conds_consistency_batch(base_model):
+	# as export_termination_conds_consistency, but instead of rejecting the answer
+	# marks the base model: many models are checked in one program
+	strings = []
+	for cond in base_model.termination_conditions:
+		strings.append('\ninconsistent_model(%s) :- not synthesizable(%s, %s, %s, %s).' % (base_model.ID, cond.entity.ID, cond.entity.version, cond.compartment.ID, base_model.ID))
+	strings.append('\ninconsistent_model(%s) :- not_clean_model(%s).' % (base_model.ID, base_model.ID))
+	return strings
+
+
+def export_relevancy_results_consistency_batch(models_results, base_model):
+	strings = []
+	for model in models_results.keys():
+		for res in models_results[model]:
+			if res in base_model.ignored_results:
+				continue
+			else:
+				strings.append('\nrelevant(%s, %s).' % (res.ID, model.ID))
+				strings.append('\ninconsistent_model(%s) :- inconsistent(%s, %s).' % (base_model.ID, model.ID, res.ID))
+	return strings
+
+
+def consistency_batch_display():
+	return ['\n#hide.', '\n#show inconsistent_model/1.']
+
+
 def export_force_new_model(base_model, external_models):
 	strings = []
 	for model in external_models:
@@ -259,7 +391,9 @@ def export_ignore_results(results):
 	return ['\n#modeh ignored(%s) =%s @2.' % (result.ID, result.exp_description.experiment_type.ignoring_penalty) for result in results]
 
 
-def models_rules(max_number_activities):
+def models_rules(max_number_activities='max_number_activities'):
+	# default: symbolic constant, value supplied to the solver
+	# (see max_number_activities_constant); lets the rules be written once per run
 	return [
 	'\n%%% catalysis/ transport of reversed activities:',
 	'\ncatalyses(Entity, Version, ReverseActivity) :-',
@@ -416,6 +550,10 @@ def models_rules(max_number_activities):
 	'\n	not has_transporter(Activity, Model, Int).']
 
 
+def max_number_activities_constant(max_number_activities):
+	return '\n#const max_number_activities = %s.' % max_number_activities
+
+
 def predictions_rules():
 	return ['\n%%%%%%%%%%%%%%%%%%%%%%%%%%%%',
 	'\n%%%%% prediction rules %%%%%',
@@ -679,14 +817,9 @@ def model_difference_rules():
 #
 
 def export_models_exp_design(models):
-	strings = []
-	joined_models = ';'.join([x.ID for x in models])
-	strings.append(joined_models.join(['\nmodel(', ').']))
-	# specification:
-	for model in models:
-		strings.extend(export_model_specification(model))
-
-	return strings
+	sink = ListSink()
+	write_models(sink, models)
+	return sink.strings
 
 
 def modeh_replacement(cost_model):
@@ -944,3 +1077,13 @@ def export_display_for_oracle(expDescription):
 		return ['\n#hide.', '\n#show predicts/3.']
 	else:
 		raise TypeError("export_display_for_oracle: exp type not recognised: %" % expDescription.experiment_type)
+
+
+def export_display_for_oracle_batch(expDescriptions):
+	# what any of the experiments needs shown
+	shown = []
+	for expD in expDescriptions:
+		for line in export_display_for_oracle(expD)[1:]:
+			if not (line in shown):
+				shown.append(line)
+	return ['\n#hide.'] + shown
@@ -0,0 +1,69 @@
+#! /usr/bin/env python3
+# I, Robert Rozanski, the copyright holder of this work, release this work into the public domain. This applies worldwide. In some countries this may not be legally possible; if so: I grant anyone the right to use this work for any purpose, without any conditions, unless such conditions are required by law.
+
+import os
+import exporter
+
+class FactBase:
+	# append-only facts files kept by the archive (archive.fact_base):
+	# the network (entities, compartments, activities) never changes during a run,
+	# so it is exported once; results only grow, so they are appended
+	# when recorded (AcceptedResults, InitialResults).
+	# Solver calls reference these files instead of re-exporting everything.
+	def __init__(self, archive, directory='./temp', sfx='', resume=False):
+		self.archive = archive
+		self.network_file = os.path.join(directory, 'facts_network_%s' % sfx)
+		self.results_file = os.path.join(directory, 'facts_results_%s' % sfx)
+		self.network_written = False
+		self.number_of_results = 0
+		if not os.path.isdir(directory):
+			os.makedirs(directory)
+		if resume and os.path.isfile(self.results_file):
+			# resumed run (journal): results written so far kept, appended to
+			with open(self.results_file, 'r') as f:
+				self.number_of_results = f.read().count('\nresult(')
+		else:
+			# new run: results from previous runs with the same suffix discarded
+			open(self.results_file, 'w').close()
+
+
+	def get_network_file(self):
+		# written on first use: archive's elements are filled in after its creation
+		if not self.network_written:
+			self.write_network()
+		return self.network_file
+
+
+	def get_results_file(self):
+		return self.results_file
+
+
+	def get_files(self):
+		return [self.get_network_file(), self.get_results_file()]
+
+
+	def write_network(self):
+		with open(self.network_file, 'w') as f:
+			exporter.write_entities(f, self.archive.mnm_entities)
+			exporter.write_compartments(f, self.archive.mnm_compartments)
+			exporter.write_activities(f, self.archive.mnm_activities + self.archive.import_activities)
+		self.network_written = True
+
+
+	def append_results(self, results):
+		with open(self.results_file, 'a') as f:
+			exporter.write_results(f, results)
+		self.number_of_results += len(results)
+
+
+	def reset_results(self, results):
+		open(self.results_file, 'w').close()
+		self.number_of_results = 0
+		self.append_results(results)
+
+
+	def sync_results(self, results):
+		# results of the archive (restored from a journal, or a new run after
+		# resume found no journal): file written again only if it holds others
+		if self.number_of_results != len(results):
+			self.reset_results(results)
@@ -0,0 +1,142 @@
+#! /usr/bin/env python3
+# I, Robert Rozanski, the copyright holder of this work, release this work into the public domain. This applies worldwide. In some countries this may not be legally possible; if so: I grant anyone the right to use this work for any purpose, without any conditions, unless such conditions are required by law.
+
+import os
+import pickle
+import struct
+
+class Journal:
+	# crash-safe record of an overseer run (Overseer.attach_journal):
+	# every event recorded by the archive is appended to the journal, and so is
+	# overseer's state after every transition (with working models: qualities
+	# and ignored results change outside of events). Every snapshot_every
+	# transitions archive and state are pickled into the snapshot and the journal
+	# starts again. Entries: (kind, number, content, working models), each one
+	# pickled with its length before it; incomplete last entry (crash) ignored.
+	# Resume: snapshot, then events of the journal up to its last state
+	# (events of an unfinished transition are dropped: transition is done again).
+	# Entries are flushed when appended (a crash of the program loses nothing);
+	# only state entries of every sync_every transitions are synced to disk
+	# (events before them are useless without them). None: never synced,
+	# a crash of the system may lose transitions since the last snapshot
+	def __init__(self, directory, sfx='', snapshot_every=50, sync_every=1):
+		self.journal_file = os.path.join(directory, 'journal_%s' % sfx)
+		self.snapshot_file = os.path.join(directory, 'snapshot_%s' % sfx)
+		self.snapshot_every = snapshot_every
+		self.sync_every = sync_every
+		self.number = 0 # of the last entry
+		self.transitions = 0 # since the last snapshot
+		self.unsynced = 0 # transitions since the last sync
+		self.syncs = 0
+		self.sink = None
+		if not os.path.isdir(directory):
+			os.makedirs(directory)
+
+
+	def exists(self):
+		return os.path.isfile(self.snapshot_file)
+
+
+	def start(self, archive, state):
+		# new run: previous journal of this suffix discarded
+		self.number = 0
+		if archive.fact_base != None:
+			archive.fact_base.sync_results([res for exp in archive.known_results for res in exp.results])
+		self.write_snapshot(archive, state)
+
+
+	def append_event(self, event, archive):
+		self.append(('event', event, None))
+
+
+	def append_state(self, state, archive):
+		self.transitions += 1
+		if self.transitions >= self.snapshot_every:
+			self.write_snapshot(archive, state)
+		else:
+			self.append(('state', state, archive.working_models))
+			self.unsynced += 1
+			if (self.sync_every != None) and (self.unsynced >= self.sync_every):
+				self.sync()
+
+
+	def append(self, entry):
+		self.number += 1
+		(kind, content, models) = entry
+		data = pickle.dumps((kind, self.number, content, models))
+		if self.sink == None:
+			self.sink = open(self.journal_file, 'ab')
+		self.sink.write(struct.pack('>Q', len(data)) + data)
+		self.sink.flush()
+
+
+	def sync(self):
+		os.fsync(self.sink.fileno())
+		self.unsynced = 0
+		self.syncs += 1
+
+
+	def write_snapshot(self, archive, state):
+		temp_file = '%s.tmp' % self.snapshot_file
+		with open(temp_file, 'wb') as f:
+			pickle.dump((self.number, archive, state), f)
+			f.flush()
+			os.fsync(f.fileno())
+		os.replace(temp_file, self.snapshot_file)
+		# entries up to self.number are in the snapshot
+		if self.sink != None:
+			self.sink.close()
+		self.sink = open(self.journal_file, 'wb')
+		self.transitions = 0
+		self.unsynced = 0
+
+
+	def read_entries(self):
+		entries = []
+		if not os.path.isfile(self.journal_file):
+			return entries
+		with open(self.journal_file, 'rb') as f:
+			while True:
+				header = f.read(8)
+				if len(header) < 8:
+					break
+				data = f.read(struct.unpack('>Q', header)[0])
+				try:
+					entries.append(pickle.loads(data))
+				except Exception:
+					break
+		return entries
+
+
+	def restore(self, archive):
+		# archive (the one modules work on) updated in place; returns overseer's state.
+		# Fact base and journal of the archive are kept: fact base gets all known results again
+		with open(self.snapshot_file, 'rb') as f:
+			(number, saved, state) = pickle.load(f)
+		fact_base = archive.fact_base
+		archive.__dict__.update(saved.__dict__)
+		archive.fact_base = None
+		archive.journal = None
+
+		entries = [entry for entry in self.read_entries() if entry[1] > number]
+		states = [position for (position, entry) in enumerate(entries) if entry[0] == 'state']
+		if states != []:
+			for (kind, entry_number, content, models) in entries[:states[-1] + 1]:
+				if kind == 'event':
+					# attributes set when recorded (timestamp, random choices) kept
+					recorded = dict(content.__dict__)
+					archive.record(content)
+					content.__dict__.update(recorded)
+				else:
+					archive.working_models = models
+					state = content
+				number = entry_number
+		archive.create_indexes()
+
+		archive.fact_base = fact_base
+		if fact_base != None:
+			fact_base.sync_results([res for exp in archive.known_results for res in exp.results])
+		# journal continues after the restored part
+		self.number = number
+		self.write_snapshot(archive, state)
+		return state
@@ -1,13 +1,129 @@
 #! /usr/bin/env python3
 # I, Robert Rozanski, the copyright holder of this work, release this work into the public domain. This applies worldwide. In some countries this may not be legally possible; if so: I grant anyone the right to use this work for any purpose, without any conditions, unless such conditions are required by law.
 
+import weakref
+
+# bumped whenever an attribute used in exported facts (IDs, versions, ...)
+# of any element changes: fact strings cached by exporter are then recomputed
+generation = 0
+
+
+# conditions, interventions and experiment descriptions (exp_repr) are immutable
+# and built once for the same objects (weak table: kept while used). Keyed by
+# identity, not value: elements are renamed after conditions are built (evaluator)
+# and equal activities may differ in IDs. Compartments: one object each
+interned = weakref.WeakValueDictionary()
+compartments = {}
+
+
+def get_value_object(cls, values):
+	# no values: unpickled from an older archive (__setstate__ fills it)
+	if len(values) == 0:
+		obj = object.__new__(cls)
+		object.__setattr__(obj, '_hash', None)
+		return obj
+	if len(values) != len(cls.fields):
+		raise TypeError('%s: expected arguments: %s' % (cls.__name__, ', '.join(cls.fields)))
+	key = (cls,) + tuple([id(value) for value in values])
+	try:
+		return interned[key]
+	except KeyError:
+		pass
+	obj = object.__new__(cls)
+	for (name, value) in zip(cls.fields, values):
+		object.__setattr__(obj, name, value)
+	object.__setattr__(obj, '_hash', None)
+	interned[key] = obj
+	return obj
+
+
+def cached_hash(obj):
+	# hashes kept until any element changes (generation): hashes of conditions
+	# and activities follow IDs of entities; None if not kept
+	cached = obj._hash
+	if (cached != None) and (cached[0] == generation):
+		return cached[1]
+	return None
+
+
+def set_hash(obj, content):
+	value = hash(content)
+	object.__setattr__(obj, '_hash', (generation, value))
+	return value
+
+
+def get_slots(cls):
+	# attributes of instances of cls (all slots, without cached hash and facts)
+	slots = []
+	for base in cls.__mro__:
+		for name in base.__dict__.get('__slots__', ()):
+			if not (name in ('_hash', '_facts', '_detail_facts', '__weakref__')):
+				slots.append(name)
+	return slots
+
+
+def get_state(obj):
+	state = {}
+	for name in get_slots(type(obj)):
+		if hasattr(obj, name):
+			state[name] = getattr(obj, name)
+	return state
+
+
+def set_state(obj, state):
+	# state of get_state or __dict__ (archives pickled before slots): attributes
+	# no longer used (e.g. 'reversible' of old activities) dropped
+	slots = get_slots(type(obj))
+	for (name, value) in state.items():
+		if name in slots:
+			object.__setattr__(obj, name, value)
+	object.__setattr__(obj, '_hash', None)
+
+
+class ValueObject:
+	# immutable; built with get_value_object
+	__slots__ = ()
+	fields = ()
+
+	def __setattr__(self, name, value):
+		raise TypeError('%s: immutable: %s' % (type(self).__name__, name))
+
+	def __reduce__(self):
+		return (type(self), tuple([getattr(self, name) for name in self.fields]))
+
+	def __getstate__(self):
+		return get_state(self)
+
+	def __setstate__(self, state):
+		set_state(self, state)
+
+
 class Element:
+	__slots__ = ('ID', 'name', '_hash', '_facts', '_detail_facts')
+
 	def __init__(self, ID, name):
+		self._hash = None
 		self.ID = ID
 		self.name = name
 
+	def __setattr__(self, name, value):
+		# first assignment (new element) changes no hash or cached content
+		if (name in ('ID', 'version', 'properties', 'required_conditions', 'changes', 'reversibility')) and hasattr(self, name):
+			global generation
+			generation += 1
+		object.__setattr__(self, name, value)
+
+	def __getstate__(self):
+		# cached fact strings (exporter) are not pickled
+		return get_state(self)
+
+	def __setstate__(self, state):
+		set_state(self, state)
+
 
 class Entity(Element):
+	__slots__ = ('version', 'properties', 'add_cost', 'remove_cost', 'detection_cost', 'localisation_cost')
+
 	def __init__(self, ID, name, version, properties):
 		Element.__init__(self, ID, name)
 		self.version = version
@@ -18,30 +134,43 @@ class Entity(Element):
 		self.localisation_cost = 1
 
 	def __hash__(self):
-		return hash((self.ID, self.version))
+		value = cached_hash(self)
+		if value == None:
+			value = set_hash(self, (self.ID, self.version))
+		return value
 
 	def __eq__(self, other):
-		return ((hash(self) == hash(other)) and (type(self) == type(other)))
+		return (self is other) or ((hash(self) == hash(other)) and (type(self) == type(other)))
 
 
 class Gene(Entity):
+	__slots__ = ()
+
 	def __init__(self, ID, name=None, version='none', properties=[]):
 		Entity.__init__(self, ID, name, version, properties)
 
 class Metabolite(Entity):
+	__slots__ = ()
+
 	def __init__(self, ID, name=None, version='none', properties=[]):
 		Entity.__init__(self, ID, name, version, properties)
 
 class Protein(Entity):
+	__slots__ = ()
+
 	def __init__(self, ID, name=None, version='none', properties=[]):
 		Entity.__init__(self, ID, name, version, properties)
 
 class Complex(Entity):
+	__slots__ = ()
+
 	def __init__(self, ID, name=None, version='none', properties=[]):
 		Entity.__init__(self, ID, name, version, properties)
 
 
 class Activity(Element):
+	__slots__ = ('required_conditions', 'changes', 'reversibility', 'detection_cost', 'base_reconstruction_cost', 'add_cost', 'remove_cost')
+
 	def __init__(self, ID, name, required_conditions, changes):
 		Element.__init__(self, ID, name)
 		self.required_conditions = frozenset(required_conditions)
@@ -64,28 +193,41 @@ class Activity(Element):
 		return [con.entity for con in self.changes if isinstance(con, PresentEntity)]
 
 	def __hash__(self):
-		return hash((self.required_conditions, self.changes))
+		value = cached_hash(self)
+		if value == None:
+			value = set_hash(self, (self.required_conditions, self.changes))
+		return value
 
 	def __eq__(self, other):
-		return ((hash(self) == hash(other)) and (type(self) == type(other)))
+		return (self is other) or ((hash(self) == hash(other)) and (type(self) == type(other)))
 
 class Growth(Activity):
+	__slots__ = ()
+
 	def __init__(self, ID, required_conditions, name=None):
 		Activity.__init__(self, ID, name, required_conditions, [])
 
 class Expression(Activity):
+	__slots__ = ()
+
 	def __init__(self, ID, required_conditions, changes, name=None):
 		Activity.__init__(self, ID, name, required_conditions, changes)
 
 class Reaction(Activity):
+	__slots__ = ()
+
 	def __init__(self, ID, required_conditions, changes, name=None):
 		Activity.__init__(self, ID, name, required_conditions, changes)
 
 class Transport(Activity):
+	__slots__ = ()
+
 	def __init__(self, ID, required_conditions, changes, name=None):
 		Activity.__init__(self, ID, name, required_conditions, changes)
 
 class ComplexFormation(Activity):
+	__slots__ = ()
+
 	def __init__(self, ID, required_conditions, changes, name=None):
 		Activity.__init__(self, ID, name, required_conditions, changes)
 
@@ -105,228 +247,253 @@ class Transports(Property):
 		self.activity = activity
 
 
-class Condition:
-	def __init__(self):
-		pass
+class Condition(ValueObject):
+	__slots__ = ()
 
 class PresentEntity(Condition):
-	def __init__(self, entity, compartment):
-		self.entity = entity
-		self.compartment = compartment
+	__slots__ = ('entity', 'compartment', '_hash', '__weakref__')
+	fields = ('entity', 'compartment')
+
+	def __new__(cls, *values):
+		# entity, compartment
+		return get_value_object(cls, values)
 
 	def __hash__(self):
-		return hash((self.entity, self.compartment))
+		value = cached_hash(self)
+		if value == None:
+			value = set_hash(self, (self.entity, self.compartment))
+		return value
 
 	def __eq__(self, other):
-		return ((hash(self) == hash(other)) and (type(self) == type(other)))
+		return (self is other) or ((hash(self) == hash(other)) and (type(self) == type(other)))
 
 class PresentCatalyst(Condition):
-	def __init__(self, compartment):
-		self.compartment = compartment
+	__slots__ = ('compartment', '_hash', '__weakref__')
+	fields = ('compartment',)
+
+	def __new__(cls, *values):
+		# compartment
+		return get_value_object(cls, values)
 
 	def __hash__(self):
 		return hash(self.compartment)
 
 	def __eq__(self, other):
-		return ((hash(self) == hash(other)) and (type(self) == type(other)))
+		return (self is other) or ((hash(self) == hash(other)) and (type(self) == type(other)))
 
 class PresentTransporter(Condition):
-	def __init__(self, compartment):
-		self.compartment = compartment
+	__slots__ = ('compartment', '_hash', '__weakref__')
+	fields = ('compartment',)
+
+	def __new__(cls, *values):
+		# compartment
+		return get_value_object(cls, values)
 
 	def __hash__(self):
 		return hash(self.compartment)
 
 	def __eq__(self, other):
-		return ((hash(self) == hash(other)) and (type(self) == type(other)))
+		return (self is other) or ((hash(self) == hash(other)) and (type(self) == type(other)))
 
 
 
 class Compartment:
-	def __init__(self):
-		self.ID = None
+	# one object per compartment; ID of the class
+	__slots__ = ()
+	ID = None
+
+	def __new__(cls):
+		try:
+			return compartments[cls]
+		except KeyError:
+			compartments[cls] = object.__new__(cls)
+			return compartments[cls]
+
+	def __setattr__(self, name, value):
+		raise TypeError('%s: immutable: %s' % (type(self).__name__, name))
+
+	def __reduce__(self):
+		return (type(self), ())
+
+	def __getstate__(self):
+		return {}
+
+	def __setstate__(self, state):
+		pass # archives pickled before: ID of the class
 
 	def __hash__(self):
 		return hash(self.ID)
 
 	def __eq__(self, other):
-		return ((hash(self) == hash(other)) and (type(self) == type(other)))
+		return (self is other) or ((hash(self) == hash(other)) and (type(self) == type(other)))
 
 
 class Medium(Compartment):
-	def __init__(self):
-		self.ID = "c_01"
+	__slots__ = ()
+	ID = "c_01"
 
 class CellMembrane(Compartment):
-	def __init__(self):
-		self.ID = "c_02"
+	__slots__ = ()
+	ID = "c_02"
 
 class CellMembraneOuterSide(Compartment):
-	def __init__(self):
-		self.ID = "c_03"
+	__slots__ = ()
+	ID = "c_03"
 
 class CellMembraneInnerSide(Compartment):
-	def __init__(self):
-		self.ID = "c_04"
+	__slots__ = ()
+	ID = "c_04"
 
 class Cytosol(Compartment):
-	def __init__(self):
-		self.ID = "c_05"
+	__slots__ = ()
+	ID = "c_05"
 
 class Mitochondrium(Compartment):
-	def __init__(self):
-		self.ID = "c_06"
+	__slots__ = ()
+	ID = "c_06"
 
 class MitochMatrix(Compartment):
-	def __init__(self):
-		self.ID = "c_07"
+	__slots__ = ()
+	ID = "c_07"
 
 class MitochOuterMembrane(Compartment):
-	def __init__(self):
-		self.ID = "c_08"
+	__slots__ = ()
+	ID = "c_08"
 
 class MitochOuterMembraneOuterSide(Compartment):
-	def __init__(self):
-		self.ID = "c_09"
+	__slots__ = ()
+	ID = "c_09"
 
 class MitochOuterMembraneInnerSide(Compartment):
-	def __init__(self):
-		self.ID = "c_10"
+	__slots__ = ()
+	ID = "c_10"
 
 class MitochInnerMembrane(Compartment):
-	def __init__(self):
-		self.ID = "c_11"
+	__slots__ = ()
+	ID = "c_11"
 
 class MitochInnerMembraneOuterSide(Compartment):
-	def __init__(self):
-		self.ID = "c_12"
+	__slots__ = ()
+	ID = "c_12"
 
 class MitochInnerMembraneInnerSide(Compartment):
-	def __init__(self):
-		self.ID = "c_13"
+	__slots__ = ()
+	ID = "c_13"
 
 class GolgiMembrane(Compartment):
-	def __init__(self):
-		self.ID = "c_14"
+	__slots__ = ()
+	ID = "c_14"
 
 class GolgiMembraneOuterSide(Compartment):
-	def __init__(self):
-		self.ID = "c_15"
+	__slots__ = ()
+	ID = "c_15"
 
 class GolgiMembraneInnerSide(Compartment):
-	def __init__(self):
-		self.ID = "c_16"
+	__slots__ = ()
+	ID = "c_16"
 
 class GolgiApparatus(Compartment):
-	def __init__(self):
-		self.ID = "c_17"
+	__slots__ = ()
+	ID = "c_17"
 
 class Nucleus(Compartment):
-	def __init__(self):
-		self.ID = "c_18"
+	__slots__ = ()
+	ID = "c_18"
 
 class NuclearMembrane(Compartment):
-	def __init__(self):
-		self.ID = "c_19"
+	__slots__ = ()
+	ID = "c_19"
 
 class NuclearMembraneOuterSide(Compartment):
-	def __init__(self):
-		self.ID = "c_20"
+	__slots__ = ()
+	ID = "c_20"
 
 class NuclearMembraneInnerSide(Compartment):
-	def __init__(self):
-		self.ID = "c_21"
+	__slots__ = ()
+	ID = "c_21"
 
 class EndoplasmicReticulum(Compartment):
-	def __init__(self):
-		self.ID = "c_22"
+	__slots__ = ()
+	ID = "c_22"
 
 class ERMembrane(Compartment):
-	def __init__(self):
-		self.ID = "c_23"
+	__slots__ = ()
+	ID = "c_23"
 
 class ERMembraneOuterSide(Compartment):
-	def __init__(self):
-		self.ID = "c_24"
+	__slots__ = ()
+	ID = "c_24"
 
 class ERMembraneInnerSide(Compartment):
-	def __init__(self):
-		self.ID = "c_25"
+	__slots__ = ()
+	ID = "c_25"
 
 class Vacuole(Compartment):
-	def __init__(self):
-		self.ID = "c_26"
+	__slots__ = ()
+	ID = "c_26"
 
 class VacuolarMembrane(Compartment):
-	def __init__(self):
-		self.ID = "c_27"
+	__slots__ = ()
+	ID = "c_27"
 
 class VacuolarMembraneMediumSide(Compartment):
-	def __init__(self):
-		self.ID = "c_28"
+	__slots__ = ()
+	ID = "c_28"
 
 class VacuolarMembraneCytosolSide(Compartment):
-	def __init__(self):
-		self.ID = "c_29"
+	__slots__ = ()
+	ID = "c_29"
 
 class VacuolarMembraneInnerSide(Compartment):
-	def __init__(self):
-		self.ID = "c_30"
+	__slots__ = ()
+	ID = "c_30"
 
 class PeroxisomalMembrane(Compartment):
-	def __init__(self):
-		self.ID = "c_31"
+	__slots__ = ()
+	ID = "c_31"
 
 class PeroxisomalMembraneInnerSide(Compartment):
-	def __init__(self):
-		self.ID = "c_32"
+	__slots__ = ()
+	ID = "c_32"
 
 class PeroxisomalMembraneOuterSide(Compartment):
-	def __init__(self):
-		self.ID = "c_33"
+	__slots__ = ()
+	ID = "c_33"
 
 class Peroxisome(Compartment):
-	def __init__(self):
-		self.ID = "c_34"
+	__slots__ = ()
+	ID = "c_34"
 
 class LipidParticle(Compartment):
-	def __init__(self):
-		self.ID = "c_35"
+	__slots__ = ()
+	ID = "c_35"
 
 
 
-class Intervention:
-	def __init__(self, condition_or_activity):
-		self.condition_or_activity = condition_or_activity
+class Intervention(ValueObject):
+	__slots__ = ('condition_or_activity', '_hash', '__weakref__')
+	fields = ('condition_or_activity',)
 
+	def __new__(cls, *values):
+		# condition_or_activity
+		return get_value_object(cls, values)
 
 	def __hash__(self):
-		return hash(self.condition_or_activity)
+		value = cached_hash(self)
+		if value == None:
+			value = set_hash(self, self.condition_or_activity)
+		return value
 
 	def __eq__(self, other):
-		return ((hash(self) == hash(other)) and (type(self) == type(other)))
+		return (self is other) or ((hash(self) == hash(other)) and (type(self) == type(other)))
 
 
 class Add(Intervention):
-	def __init__(self, condition_or_activity):
-		Intervention.__init__(self, condition_or_activity)
-
-	def __hash__(self):
-		return hash(self.condition_or_activity)
-
-	def __eq__(self, other):
-		return ((hash(self) == hash(other)) and (type(self) == type(other)))
+	__slots__ = ()
 
 
 class Remove(Intervention):
-	def __init__(self, condition_or_activity):
-		Intervention.__init__(self, condition_or_activity)
-
-	def __hash__(self):
-		return hash(self.condition_or_activity)
-
-	def __eq__(self, other):
-		return ((hash(self) == hash(other)) and (type(self) == type(other)))
+	__slots__ = ()
 
 
 
@@ -0,0 +1,489 @@
+#! /usr/bin/env python3
+# I, Robert Rozanski, the copyright holder of this work, release this work into the public domain. This applies worldwide. In some countries this may not be legally possible; if so: I grant anyone the right to use this work for any purpose, without any conditions, unless such conditions are required by law.
+
+import mnm_repr
+import exp_repr
+
+# Native evaluation of models: mirrors models_rules, predictions_rules
+# and inconsistency_rules (exporter), i.e. the program solved by XHAIL in
+# RevisionModule.check_consistency. Elements are identified by IDs,
+# as in the exported facts. Whenever the facts would be interpreted in a way
+# that is not reproduced here (e.g. two activities sharing an ID),
+# UndecidedError is raised and the solver has to be used.
+
+
+class UndecidedError(ValueError):
+	pass
+
+
+class ActivityFacts:
+	# facts exported for one activity (or its reverse version)
+	def __init__(self, ID, kind):
+		self.ID = ID
+		self.kind = kind # 'growth', 'expression', 'reaction', 'transport', 'complex_formation'
+		self.substrates = set() # (ent ID, version, comp ID)
+		self.products = set()
+		self.enz_compartments = set() # declared compartments only
+		self.transp_compartments = set()
+		self.enz_required = False
+		self.transp_required = False
+
+
+class NetworkSemantics:
+	# network facts (entities, compartments, activities) indexed by IDs
+	def __init__(self, entities, compartments, activities):
+		self.compartments = set([comp.ID for comp in compartments])
+		self.entity_types = {} # (ID, version): set of types
+		self.catalyses = {} # activity ID: set of (ent ID, version)
+		self.transports = {}
+		self.catalysed_by = {} # (ent ID, version): set of activity IDs
+		self.activities = {} # activity ID: ActivityFacts
+		self.reverse = {} # activity ID: ID of reverse version
+		self.consumers = {} # (ent ID, version, comp ID): IDs of activities using it as substrate
+		self.growth = set(['dummy']) # IDs of growth activities, with growth(dummy) of predictions_rules
+
+		objects = {}
+		for act in activities:
+			if act.ID in objects:
+				if objects[act.ID] is act:
+					continue
+				# facts of both activities would be merged by the solver
+				raise UndecidedError('NetworkSemantics: more than one activity with ID: %s' % act.ID)
+			objects[act.ID] = act
+			self.add_activity(act)
+
+		for ent in entities:
+			self.add_entity(ent)
+
+		for facts in self.activities.values():
+			for substrate in facts.substrates:
+				self.consumers.setdefault(substrate, set()).add(facts.ID)
+
+
+	def add_activity(self, act):
+		if isinstance(act, mnm_repr.Growth):
+			kind = 'growth'
+		elif isinstance(act, mnm_repr.Expression):
+			kind = 'expression'
+		elif isinstance(act, mnm_repr.Reaction):
+			kind = 'reaction'
+		elif isinstance(act, mnm_repr.Transport):
+			kind = 'transport'
+		elif isinstance(act, mnm_repr.ComplexFormation):
+			kind = 'complex_formation'
+		else:
+			raise UndecidedError('NetworkSemantics: activity type not recognised: %s' % type(act))
+		if (act.ID == 'dummy') and (kind != 'growth'):
+			# would be a growth activity for the solver as well
+			raise UndecidedError('NetworkSemantics: activity with ID reserved for growth: %s' % act.ID)
+
+		if act.reversibility == False:
+			forward = ActivityFacts(act.ID, kind)
+			self.add_requirements(forward, act.required_conditions)
+			self.add_changes(forward, act.changes)
+			self.activities[act.ID] = forward
+			if kind == 'growth':
+				self.growth.add(act.ID)
+
+		elif act.reversibility == True:
+			forward = ActivityFacts(act.ID, kind)
+			self.add_requirements(forward, act.required_conditions)
+			self.add_changes(forward, act.changes)
+			rev_ID = '%s_rev' % act.ID
+			backward = ActivityFacts(rev_ID, kind)
+			self.add_requirements(backward, list(act.changes) + [x for x in act.required_conditions if (not isinstance(x, mnm_repr.PresentEntity))])
+			self.add_changes(backward, [x for x in act.required_conditions if isinstance(x, mnm_repr.PresentEntity)])
+			if rev_ID in self.activities:
+				raise UndecidedError('NetworkSemantics: more than one activity with ID: %s' % rev_ID)
+			self.activities[act.ID] = forward
+			self.activities[rev_ID] = backward
+			self.reverse[act.ID] = rev_ID
+			if kind == 'growth':
+				self.growth.update([act.ID, rev_ID])
+
+		else:
+			raise UndecidedError("NetworkSemantics: activity's reversibility status not specified: %s" % act.ID)
+
+
+	def add_requirements(self, facts, conditions):
+		for req in conditions:
+			if isinstance(req, mnm_repr.PresentEntity):
+				facts.substrates.add((req.entity.ID, req.entity.version, req.compartment.ID))
+			elif isinstance(req, mnm_repr.PresentCatalyst):
+				facts.enz_required = True
+				if req.compartment.ID in self.compartments:
+					facts.enz_compartments.add(req.compartment.ID)
+			elif isinstance(req, mnm_repr.PresentTransporter):
+				facts.transp_required = True
+				if req.compartment.ID in self.compartments:
+					facts.transp_compartments.add(req.compartment.ID)
+			else:
+				raise UndecidedError('NetworkSemantics: requirement type not recognised: %s' % type(req))
+
+
+	def add_changes(self, facts, changes):
+		for change in changes:
+			facts.products.add((change.entity.ID, change.entity.version, change.compartment.ID))
+
+
+	def add_entity(self, ent):
+		if isinstance(ent, mnm_repr.Gene):
+			kind = 'gene'
+		elif isinstance(ent, mnm_repr.Metabolite):
+			kind = 'metabolite'
+		elif isinstance(ent, mnm_repr.Protein):
+			kind = 'protein'
+		elif isinstance(ent, mnm_repr.Complex):
+			kind = 'complex'
+		else:
+			raise UndecidedError('NetworkSemantics: entity type not recognised: %s' % type(ent))
+		key = (ent.ID, ent.version)
+		self.entity_types.setdefault(key, set()).add(kind)
+
+		for prop in ent.properties:
+			if isinstance(prop, mnm_repr.Catalyses):
+				table = self.catalyses
+			elif isinstance(prop, mnm_repr.Transports):
+				table = self.transports
+			else:
+				raise UndecidedError('NetworkSemantics: property type not recognised: %s' % type(prop))
+			# properties hold for reverse versions too
+			act_IDs = [prop.activity.ID]
+			if prop.activity.ID in self.reverse:
+				act_IDs.append(self.reverse[prop.activity.ID])
+			for act_ID in act_IDs:
+				table.setdefault(act_ID, set()).add(key)
+				if table is self.catalyses:
+					self.catalysed_by.setdefault(key, set()).add(act_ID)
+
+
+	def has_type(self, ent_ID, version, kind):
+		return kind in self.entity_types.get((ent_ID, version), set())
+
+
+class ModelSemantics:
+	# synthesizable, active, involved and predicted outcomes of one model
+	def __init__(self, network, model, max_number_activities, eliminated_below=None):
+		# eliminated_below: activities known to be eliminated in this model
+		# (e.g. eliminated in a model with more setup conditions and activities)
+		self.network = network
+		self.model = model
+
+		self.in_model = set()
+		for act in model.intermediate_activities:
+			if not (act.ID in network.activities):
+				raise UndecidedError('ModelSemantics: activity not in the network: %s' % act.ID)
+			self.in_model.add(act.ID)
+			if act.ID in network.reverse:
+				self.in_model.add(network.reverse[act.ID])
+
+		self.setup = set()
+		for cond in model.setup_conditions:
+			if not isinstance(cond, mnm_repr.PresentEntity):
+				raise UndecidedError('ModelSemantics: setup condition type not recognised: %s' % type(cond))
+			self.setup.add((cond.entity.ID, cond.entity.version, cond.compartment.ID))
+
+		self.eliminated = self.calculate_eliminated(max_number_activities, eliminated_below)
+		self.active = self.in_model - self.eliminated
+		# most predictions require a growth activity not predicted to be
+		# inactive; the dummy one satisfies it unless it is an inactive activity of the model
+		self.growth_failed = network.growth.issubset(self.eliminated)
+
+		self.synthesizable = set()
+		for act_ID in self.active:
+			self.synthesizable.update(network.activities[act_ID].products)
+
+		# involved: species in declared compartments
+		involved_species = set(self.setup)
+		for act_ID in self.in_model:
+			involved_species.update(network.activities[act_ID].substrates)
+			involved_species.update(network.activities[act_ID].products)
+		self.involved = {} # ent ID: set of versions
+		for (ent_ID, version, comp_ID) in involved_species:
+			if comp_ID in network.compartments:
+				self.involved.setdefault(ent_ID, set()).add(version)
+
+		self.adam_true = None # calculated on first use
+
+
+	def calculate_eliminated(self, max_number_activities, eliminated_below=None):
+		# eliminated activities only grow with iterations;
+		# iterations stop at a fixpoint or when the counter reaches the constant
+		if eliminated_below != None:
+			# starting above the first iterations leads to the same fixpoint;
+			# each iteration eliminates at least one activity, so the counter
+			# could not have stopped the iterations if the fixpoint is small enough
+			current = eliminated_below & self.in_model
+			previous = None
+			while current != previous:
+				previous = current
+				current = self.eliminated_at(self.in_model - current)
+			if len(current) <= max_number_activities:
+				return current
+
+		previous = self.eliminated_at(self.in_model)
+		current = self.eliminated_at(self.in_model - previous)
+		iteration = 1
+		while ((iteration - 1) < max_number_activities) and (current != previous):
+			previous = current
+			current = self.eliminated_at(self.in_model - current)
+			iteration += 1
+		return current
+
+
+	def eliminated_at(self, not_eliminated):
+		reachable = self.reachable_species(not_eliminated)
+		eliminated = set()
+		for act_ID in self.in_model:
+			facts = self.network.activities[act_ID]
+			if not facts.substrates.issubset(reachable):
+				eliminated.add(act_ID)
+			elif facts.enz_required and not self.has_entity(facts.enz_compartments, self.network.catalyses.get(act_ID, set()), reachable):
+				eliminated.add(act_ID)
+			elif facts.transp_required and not self.has_entity(facts.transp_compartments, self.network.transports.get(act_ID, set()), reachable):
+				eliminated.add(act_ID)
+		return eliminated
+
+
+	def has_entity(self, compartments, entities, reachable):
+		for comp_ID in compartments:
+			for (ent_ID, version) in entities:
+				if (ent_ID, version, comp_ID) in reachable:
+					return True
+		return False
+
+
+	def reachable_species(self, act_IDs):
+		# initially present species and species produced by an activity
+		# with at least one reachable substrate (path_back_to_initially_present)
+		reachable = set(self.setup)
+		changed = True
+		while changed:
+			changed = False
+			for act_ID in act_IDs:
+				facts = self.network.activities[act_ID]
+				if facts.products.issubset(reachable):
+					continue
+				if not facts.substrates.isdisjoint(reachable):
+					reachable.update(facts.products)
+					changed = True
+		return reachable
+
+
+	def predicts(self, experiment_type):
+		# set of predicted outcomes ('true', 'false'); empty if indifferent
+		tp = experiment_type
+		if isinstance(tp, exp_repr.DetectionEntity):
+			if self.in_setup(tp.entity_id, None):
+				return set(['true'])
+			if self.growth_failed:
+				return set()
+			if self.detected(tp.entity_id, None):
+				return set(['true'])
+			if tp.entity_id in self.involved:
+				return set(['false'])
+			return set()
+
+		elif isinstance(tp, exp_repr.LocalisationEntity):
+			if not (tp.compartment_id in self.network.compartments):
+				return set()
+			if self.in_setup(tp.entity_id, tp.compartment_id):
+				return set(['true'])
+			if self.growth_failed:
+				return set()
+			if self.detected(tp.entity_id, tp.compartment_id):
+				return set(['true'])
+			if tp.entity_id in self.involved:
+				return set(['false'])
+			return set()
+
+		elif isinstance(tp, exp_repr.DetectionActivity):
+			if not (tp.activity_id in self.in_model):
+				return set()
+			if self.growth_failed:
+				# only growth activities are predicted not to be detected
+				if tp.activity_id in self.network.growth:
+					return set(['false'])
+				return set()
+			if tp.activity_id in self.active:
+				return set(['true'])
+			return set(['false'])
+
+		elif isinstance(tp, exp_repr.ReconstructionActivity):
+			if not (tp.activity_id in self.in_model):
+				return set()
+			facts = self.network.activities[tp.activity_id]
+			if (not facts.enz_required) and (not facts.transp_required):
+				return set(['true'])
+			return set()
+
+		elif isinstance(tp, exp_repr.ReconstructionEnzReaction):
+			return self.predicts_reconstruction(tp.reaction_id, tp.enzyme_id, 'enz_required', self.network.catalyses)
+
+		elif isinstance(tp, exp_repr.ReconstructionTransporterRequired):
+			return self.predicts_reconstruction(tp.transport_activity_id, tp.transporter_id, 'transp_required', self.network.transports)
+
+		elif isinstance(tp, exp_repr.AdamTwoFactorExperiment):
+			if self.growth_failed:
+				return set()
+			if self.adam_true == None:
+				self.adam_true = self.calculate_adam_true()
+			if (tp.gene_id, tp.metabolite_id) in self.adam_true:
+				return set(['true'])
+			gene_involved = [v for v in self.involved.get(tp.gene_id, set()) if self.network.has_type(tp.gene_id, v, 'gene')]
+			met_involved = [v for v in self.involved.get(tp.metabolite_id, set()) if self.network.has_type(tp.metabolite_id, v, 'metabolite')]
+			if (gene_involved != []) and (met_involved != []):
+				return set(['false'])
+			return set()
+
+		else:
+			raise UndecidedError('ModelSemantics: experiment type not recognised: %s' % type(tp))
+
+
+	def in_setup(self, ent_ID, comp_ID):
+		# comp_ID None: any declared compartment
+		for (e_ID, version, c_ID) in self.setup:
+			if (e_ID == ent_ID) and (c_ID in self.network.compartments) and ((comp_ID == None) or (c_ID == comp_ID)):
+				return True
+		return False
+
+
+	def detected(self, ent_ID, comp_ID):
+		# comp_ID None: any declared compartment
+		if self.in_setup(ent_ID, comp_ID):
+			return True
+		versions = self.involved.get(ent_ID, set())
+		for (e_ID, version, c_ID) in self.synthesizable:
+			if (e_ID == ent_ID) and (version in versions) and (c_ID in self.network.compartments) and ((comp_ID == None) or (c_ID == comp_ID)):
+				return True
+		return False
+
+
+	def predicts_reconstruction(self, act_ID, ent_ID, required, table):
+		if not (act_ID in self.in_model):
+			return set()
+		if not getattr(self.network.activities[act_ID], required):
+			return set()
+		able = set([v for (e_ID, v) in table.get(act_ID, set()) if e_ID == ent_ID])
+		outcomes = set()
+		for version in self.involved.get(ent_ID, set()):
+			if version in able:
+				outcomes.add('true')
+			elif able != set():
+				outcomes.add('false')
+		return outcomes
+
+
+	def calculate_adam_true(self):
+		network = self.network
+		adam_true = set()
+		for act_ID in self.in_model:
+			expression = network.activities[act_ID]
+			if expression.kind != 'expression':
+				continue
+			genes = set([ent_ID for (ent_ID, version, comp_ID) in expression.substrates if comp_ID in network.compartments])
+			if genes == set():
+				continue
+			metabolites = set()
+			# enzymes produced by the expression
+			for (ent_ID, version, comp_ID) in expression.products:
+				if not (comp_ID in network.compartments):
+					continue
+				for reaction_ID in network.catalysed_by.get((ent_ID, version), set()):
+					if (reaction_ID in self.in_model) and network.activities[reaction_ID].enz_required and (comp_ID in network.activities[reaction_ID].enz_compartments):
+						metabolites.update(self.metabolites_near(reaction_ID))
+			# enzymes produced from what the expression produces
+			for product in expression.products:
+				for (ent_ID, version, comp_ID) in self.species_produced_from(product):
+					if (not ((ent_ID, version) in network.entity_types)) or (not (comp_ID in network.compartments)):
+						continue
+					for reaction_ID in network.catalysed_by.get((ent_ID, version), set()):
+						if (reaction_ID in network.activities) and (comp_ID in network.activities[reaction_ID].enz_compartments):
+							metabolites.update(self.metabolites_near(reaction_ID))
+			for gene_ID in genes:
+				for met_ID in metabolites:
+					adam_true.add((gene_ID, met_ID))
+		return adam_true
+
+
+	def species_produced_from(self, species):
+		# path_back_from_to(From, ..., species, ...) on the first iteration
+		produced = set()
+		to_visit = [species]
+		visited = set()
+		while to_visit != []:
+			current = to_visit.pop()
+			if current in visited:
+				continue
+			visited.add(current)
+			for act_ID in self.network.consumers.get(current, set()):
+				if act_ID in self.in_model:
+					for product in self.network.activities[act_ID].products:
+						produced.add(product)
+						to_visit.append(product)
+		return produced
+
+
+	def metabolites_near(self, reaction_ID):
+		# metabolites within distance 2 from the catalysed reaction
+		network = self.network
+		facts = network.activities[reaction_ID]
+		if not ((reaction_ID in self.in_model) and (facts.kind == 'reaction') and facts.enz_required):
+			return set()
+		level = set(facts.products)
+		species = set(level)
+		for distance in range(2):
+			next_level = set()
+			for inter in level:
+				for act_ID in network.consumers.get(inter, set()):
+					if (act_ID in self.in_model) and (network.activities[act_ID].kind == 'reaction'):
+						next_level.update(network.activities[act_ID].products)
+			species.update(next_level)
+			level = next_level
+		return set([ent_ID for (ent_ID, version, comp_ID) in species if (comp_ID in network.compartments) and network.has_type(ent_ID, version, 'metabolite')])
+
+
+	def not_clean(self):
+		if self.eliminated != set():
+			return True
+		return self.has_multiple_versions()
+
+
+	def has_multiple_versions(self):
+		# more than one version of an entity involved
+		for versions in self.involved.values():
+			if len(versions) > 1:
+				return True
+		return False
+
+
+	def inconsistent(self, result):
+		if not (result.outcome in ['true', 'false']):
+			raise UndecidedError('ModelSemantics: outcome not recognised: %s' % result.outcome)
+		predictions = self.predicts(result.exp_description.experiment_type)
+		return any([prediction != result.outcome for prediction in predictions])
+
+
+def check_consistency(network, base_model, models_results, max_number_activities):
+	# models_results: base and derivative models with relevant results
+	# (RevisionModule.make_derivative_models); returns None if not decided
+	try:
+		base = ModelSemantics(network, base_model, max_number_activities)
+		for cond in base_model.termination_conditions:
+			if not ((cond.entity.ID, cond.entity.version, cond.compartment.ID) in base.synthesizable):
+				return False
+		if base.not_clean():
+			return False
+		for model in models_results.keys():
+			if model is base_model:
+				semantics = base
+			else:
+				semantics = ModelSemantics(network, model, max_number_activities)
+			for res in models_results[model]:
+				if res in base_model.ignored_results:
+					continue
+				if semantics.inconsistent(res):
+					return False
+		return True
+	except UndecidedError:
+		return None
@@ -0,0 +1,389 @@
+#! /usr/bin/env python3
+# I, Robert Rozanski, the copyright holder of this work, release this work into the public domain. This applies worldwide. In some countries this may not be legally possible; if so: I grant anyone the right to use this work for any purpose, without any conditions, unless such conditions are required by law.
+
+import itertools
+from time import time
+import mnm_repr
+import exp_repr
+import exporter
+import model_semantics
+from model_semantics import UndecidedError
+
+# numpy is optional: without it candidates are scored one by one
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+
+class NativeDesigner:
+	# experiment design without the solver (ExperimentModule.design_mode).
+	# Same objective as advanced_exp_design_rules: models' probabilities split
+	# into true, false and indifferent predictions, |Tr*10-n| + |Fa*10-n| + Ind*10,
+	# then the cost of design elements (if costs are used); same constraints
+	# as design_constraints_basic (one true and one false model, one version
+	# of each entity in models, no interventions for adam-style experiments,
+	# substrates added with import activities) and bans of performed experiments.
+	# Candidates come from the cost model. Interventions: combinations of at most
+	# max_interventions choices (an import activity with its substrates is one
+	# choice; None: any number, as in the design program). If that leaves
+	# choices out, designs found are not proven optimal (optimal: False) and
+	# no design found is UndecidedError (the solver might find one).
+	# Answers are lists of components, as in the solver's answers.
+	def __init__(self, archive, cost_model, use_costs, max_interventions=1):
+		self.archive = archive
+		self.cost_model = cost_model
+		self.use_costs = use_costs
+		self.max_interventions = max_interventions
+		self.network = None
+		self.network_signature = None
+		# predictions of models resulting from interventions, kept between
+		# cycles (cleared when network changes): model content: {experiment
+		# term: prediction code}, None if more than one version of an entity.
+		# Only new models (and new candidates) need ModelSemantics;
+		# new qualities only need scoring again
+		self.prediction_cache = {}
+		self.prediction_cache_size = 100000
+		# False if the last design stopped at its deadline or
+		# max_interventions left combinations of interventions out
+		self.optimal = True
+
+
+	def design(self, constant_for_scores, deadline=None):
+		# components of all optimal experiments ([] if there's none);
+		# UndecidedError if the network can't be handled natively.
+		# deadline (time()): after it, the best experiments found so far
+		# (search goes on until there's any)
+		self.optimal = True
+		network = self.get_network()
+		models = sorted(self.archive.working_models, key=lambda m: str(m.ID))
+		qualities = [m.quality for m in models]
+		bans = self.get_bans()
+		base_candidates = self.get_base_candidates(network)
+		costs = self.get_costs()
+		groups = self.get_intervention_groups(network)
+		bounded = (self.max_interventions != None) and (len(groups) > self.max_interventions)
+
+		best = None
+		optimal = []
+		for intervention_set in self.get_intervention_sets(groups):
+			rows = self.get_prediction_rows(network, models, base_candidates, intervention_set)
+			if rows == None:
+				continue
+			scores = score_rows([row for (candidate, row) in rows], qualities, constant_for_scores)
+			for ((candidate, row), score) in zip(rows, scores):
+				if score == None:
+					continue
+				if self.is_banned(candidate[0], intervention_set, bans):
+					continue
+				components = candidate[1] + list(intervention_set)
+				# ties: fewest interventions (more only add what changes no prediction)
+				objective = (score, get_cost(components, costs), len(intervention_set))
+				if (best == None) or (objective < best):
+					best = objective
+					optimal = [components]
+				elif objective == best:
+					optimal.append(components)
+			if (deadline != None) and (optimal != []) and (time() > deadline):
+				self.optimal = False
+				break
+		if bounded:
+			if optimal == []:
+				raise UndecidedError('NativeDesigner: no design with at most %s interventions' % self.max_interventions)
+			self.optimal = False
+		return optimal
+
+
+	def evaluate(self, experiment_type, interventions, constant_for_scores):
+		# objective (score, cost) of one experiment; None if not allowed
+		network = self.get_network()
+		models = sorted(self.archive.working_models, key=lambda m: str(m.ID))
+		candidate = get_candidate(experiment_type)
+		intervention_set = tuple(sorted([intervention_component(inter) for inter in interventions]))
+		rows = self.get_prediction_rows(network, models, [candidate], intervention_set)
+		if (rows == None) or (rows == []) or self.is_banned(candidate[0], intervention_set, self.get_bans()):
+			return None
+		score = score_rows([rows[0][1]], [m.quality for m in models], constant_for_scores)[0]
+		if score == None:
+			return None
+		return (score, get_cost(candidate[1] + list(intervention_set), self.get_costs()))
+
+
+	def get_network(self):
+		# rebuilt only if the network changes
+		arch = self.archive
+		signature = (len(arch.mnm_entities), len(arch.mnm_compartments), len(arch.mnm_activities), len(arch.import_activities), mnm_repr.generation)
+		if signature != self.network_signature:
+			self.network_signature = signature
+			self.prediction_cache = {}
+			self.network = model_semantics.NetworkSemantics(arch.mnm_entities, arch.mnm_compartments, arch.mnm_activities + arch.import_activities)
+		return self.network
+
+
+	def get_max_number_activities(self):
+		# as in the design program (ExperimentModule)
+		return len(self.archive.mnm_activities + self.archive.import_activities)
+
+
+	def get_prediction_rows(self, network, models, base_candidates, intervention_set):
+		# (candidate, predictions of all models) for candidates allowed with
+		# these interventions; None if any model has more than one version of an entity
+		if intervention_set != ():
+			base_candidates = [c for c in base_candidates if not isinstance(c[0], exp_repr.AdamTwoFactorExperiment)]
+		columns = []
+		for model in models:
+			predictions = self.get_predictions(network, self.apply_interventions(model, intervention_set), base_candidates)
+			if predictions == None:
+				return None
+			columns.append(predictions)
+		rows = []
+		for candidate in base_candidates:
+			term = tuple(candidate[1])
+			rows.append((candidate, [predictions[term] for predictions in columns]))
+		return rows
+
+
+	def get_predictions(self, network, model, candidates):
+		# different intervention sets resulting in the same model share the entry
+		key = (model.setup_conditions, model.intermediate_activities)
+		predictions = self.prediction_cache.get(key, {})
+		if predictions == None:
+			return None
+		missing = [c for c in candidates if not (tuple(c[1]) in predictions)]
+		if missing == []:
+			return predictions
+
+		model_sem = model_semantics.ModelSemantics(network, model, self.get_max_number_activities())
+		if model_sem.has_multiple_versions():
+			predictions = None
+		else:
+			for (tp, components) in missing:
+				predictions[tuple(components)] = prediction_code(model_sem.predicts(tp))
+		if (not (key in self.prediction_cache)) and (len(self.prediction_cache) >= self.prediction_cache_size):
+			self.prediction_cache = {}
+		self.prediction_cache[key] = predictions
+		return predictions
+
+
+	def apply_interventions(self, model, intervention_set):
+		# interventions applied to all models; removal wins over addition
+		interventions = self.get_interventions()
+		setup = set(model.setup_conditions)
+		activities = set(model.intermediate_activities)
+		removed = set()
+		for component in intervention_set:
+			inter = interventions[component]
+			if isinstance(inter, mnm_repr.Remove):
+				removed.add(inter.condition_or_activity)
+			elif isinstance(inter.condition_or_activity, mnm_repr.Condition):
+				setup.add(inter.condition_or_activity)
+			else:
+				activities.add(inter.condition_or_activity)
+		return mnm_repr.Model(model.ID, setup - removed, activities, [])
+
+
+	def get_interventions(self):
+		# answer component: intervention (from the cost model; only those
+		# with elements in the archive, others can't be processed)
+		arch = self.archive
+		interventions = {}
+		for inter in list(self.cost_model.intervention_add.keys()) + list(self.cost_model.intervention_remove.keys()):
+			item = inter.condition_or_activity
+			if isinstance(item, mnm_repr.Condition):
+				if not ((item.entity in arch.mnm_entities) and (item.compartment in arch.mnm_compartments)):
+					continue
+			elif not (item in arch.mnm_activities + arch.import_activities):
+				continue
+			interventions[intervention_component(inter)] = inter
+		return interventions
+
+
+	def get_intervention_groups(self, network):
+		# one choice of interventions: adding import activity requires
+		# adding its substrates (both directions, if reversible)
+		interventions = self.get_interventions()
+		groups = []
+		for component in sorted(interventions.keys()):
+			inter = interventions[component]
+			if isinstance(inter.condition_or_activity, mnm_repr.Condition):
+				groups.append((component,))
+				continue
+			act_ID = inter.condition_or_activity.ID
+			substrates = set()
+			for ID in [act_ID, network.reverse.get(act_ID)]:
+				if ID in network.activities:
+					substrates.update(network.activities[ID].substrates)
+			required = ['add(setup_present(%s,%s,%s))' % substrate for substrate in sorted(substrates)]
+			if all([req in interventions for req in required]):
+				groups.append(tuple([component] + required))
+		return groups
+
+
+	def get_intervention_sets(self, groups):
+		max_size = len(groups)
+		if self.max_interventions != None:
+			max_size = min(self.max_interventions, max_size)
+		seen = set()
+		for size in range(max_size + 1):
+			for combination in itertools.combinations(groups, size):
+				intervention_set = tuple(sorted(set([component for group in combination for component in group])))
+				if intervention_set in seen:
+					continue
+				seen.add(intervention_set)
+				yield intervention_set
+
+
+	def get_base_candidates(self, network):
+		# (experiment type, components) for all experiments from the cost model
+		# that the design program can design (elements present in the network)
+		cost_model = self.cost_model
+		entity_IDs = set([ent_ID for (ent_ID, version) in network.entity_types.keys()])
+		candidates = []
+		for tp in cost_model.types.keys():
+			if tp == exp_repr.DetectionEntity:
+				for ent_ID in IDs(cost_model.design_entity_det.keys()):
+					if ent_ID in entity_IDs:
+						candidates.append(get_candidate(exp_repr.DetectionEntity(ent_ID)))
+			elif tp == exp_repr.LocalisationEntity:
+				for ent_ID in IDs(cost_model.design_entity_loc.keys()):
+					for comp_ID in sorted(cost_model.design_compartment.keys()):
+						if (ent_ID in entity_IDs) and (comp_ID in network.compartments):
+							candidates.append(get_candidate(exp_repr.LocalisationEntity(ent_ID, comp_ID)))
+			elif tp == exp_repr.DetectionActivity:
+				for act_ID in IDs(cost_model.design_activity_det.keys()):
+					if act_ID in network.activities:
+						candidates.append(get_candidate(exp_repr.DetectionActivity(act_ID)))
+			elif tp == exp_repr.ReconstructionActivity:
+				for act_ID in IDs(cost_model.design_activity_rec.keys()):
+					if act_ID in network.activities:
+						candidates.append(get_candidate(exp_repr.ReconstructionActivity(act_ID)))
+			elif tp in [exp_repr.ReconstructionEnzReaction, exp_repr.ReconstructionTransporterRequired]:
+				for act_ID in IDs(cost_model.design_activity_rec.keys()):
+					for ent_ID in IDs(cost_model.design_available.keys()):
+						if (act_ID in network.activities) and (ent_ID in entity_IDs):
+							candidates.append(get_candidate(tp(act_ID, ent_ID)))
+			elif tp == exp_repr.AdamTwoFactorExperiment:
+				for gene_ID in IDs(cost_model.design_deletable.keys()):
+					for met_ID in IDs(cost_model.design_available.keys()):
+						# gene and metabolite with the same version (design_constraints_basic)
+						versions = [v for (e_ID, v) in network.entity_types.keys() if (e_ID == gene_ID) and network.has_type(e_ID, v, 'gene')]
+						if any([network.has_type(met_ID, v, 'metabolite') for v in versions]):
+							candidates.append(get_candidate(exp_repr.AdamTwoFactorExperiment(gene_ID, met_ID)))
+			else:
+				raise TypeError('get_base_candidates: experiment type not recognised: %s' % tp)
+		return candidates
+
+
+	def get_costs(self):
+		# answer component: cost (none if costs not used)
+		costs = {}
+		if self.use_costs:
+			for (element, cost) in exporter.export_experiment_specification_elements(self.cost_model).items():
+				costs[element.replace(' ', '')] = cost
+		return costs
+
+
+	def get_bans(self):
+		# experiment term: sets of interventions banned with it
+		bans = {}
+		for exp in self.archive.known_results:
+			for res in exp.results:
+				des = res.exp_description
+				term = experiment_term(des.experiment_type)
+				bans.setdefault(term, []).append(set([intervention_component(inter) for inter in des.interventions]))
+		return bans
+
+
+	def is_banned(self, experiment_type, intervention_set, bans):
+		# a ban holds for the experiment with its interventions and any others
+		chosen = set(intervention_set)
+		for banned in bans.get(experiment_term(experiment_type), []):
+			if banned <= chosen:
+				return True
+		return False
+
+
+def IDs(elements):
+	return sorted(set([el.ID for el in elements]))
+
+
+def get_cost(components, costs):
+	return sum([costs.get(component, 0) for component in components])
+
+
+def get_candidate(tp):
+	# (experiment type, answer components without interventions)
+	if isinstance(tp, exp_repr.DetectionEntity):
+		components = ['design_type(detection_entity_exp)', 'design_entity_det(%s)' % tp.entity_id]
+	elif isinstance(tp, exp_repr.LocalisationEntity):
+		components = ['design_type(localisation_entity_exp)', 'design_entity_loc(%s)' % tp.entity_id, 'design_compartment(%s)' % tp.compartment_id]
+	elif isinstance(tp, exp_repr.DetectionActivity):
+		components = ['design_type(detection_activity_exp)', 'design_activity_det(%s)' % tp.activity_id]
+	elif isinstance(tp, exp_repr.ReconstructionActivity):
+		components = ['design_type(basic_reconstruction_exp)', 'design_activity_rec(%s)' % tp.activity_id]
+	elif isinstance(tp, exp_repr.ReconstructionEnzReaction):
+		components = ['design_type(enz_reconstruction_exp)', 'design_activity_rec(%s)' % tp.reaction_id, 'design_available(%s)' % tp.enzyme_id]
+	elif isinstance(tp, exp_repr.ReconstructionTransporterRequired):
+		components = ['design_type(transp_reconstruction_exp)', 'design_activity_rec(%s)' % tp.transport_activity_id, 'design_available(%s)' % tp.transporter_id]
+	elif isinstance(tp, exp_repr.AdamTwoFactorExperiment):
+		components = ['design_type(adam_two_factor_exp)', 'design_deletable(%s)' % tp.gene_id, 'design_available(%s)' % tp.metabolite_id]
+	else:
+		raise TypeError('get_candidate: experiment type not recognised: %s' % type(tp))
+	return (tp, components)
+
+
+def experiment_term(tp):
+	(tp, components) = get_candidate(tp)
+	return tuple(components)
+
+
+def intervention_component(inter):
+	item = inter.condition_or_activity
+	if isinstance(item, mnm_repr.Condition):
+		item = 'setup_present(%s,%s,%s)' % (item.entity.ID, item.entity.version, item.compartment.ID)
+	else:
+		item = item.ID
+	if isinstance(inter, mnm_repr.Add):
+		return 'add(%s)' % item
+	elif isinstance(inter, mnm_repr.Remove):
+		return 'remove(%s)' % item
+	else:
+		raise TypeError('intervention_component: type of intervention not recognised: %s' % type(inter))
+
+
+def prediction_code(predictions):
+	# 1: true, -1: false, 0: indifferent (one version of entities: never both)
+	if 'true' in predictions:
+		return 1
+	if 'false' in predictions:
+		return -1
+	return 0
+
+
+def score_rows(rows, qualities, n):
+	# scores of candidates (rows of prediction codes, one per model);
+	# None if no model predicts true or no model predicts false
+	if rows == []:
+		return []
+	if numpy != None:
+		matrix = numpy.array(rows, dtype=numpy.int8)
+		weights = numpy.array(qualities, dtype=numpy.float64)
+		true = (matrix == 1)
+		false = (matrix == -1)
+		tr = true.dot(weights)
+		fa = false.dot(weights)
+		ind = (matrix == 0).dot(weights)
+		scores = numpy.abs(tr*10 - n) + numpy.abs(fa*10 - n) + ind*10
+		feasible = true.any(axis=1) & false.any(axis=1)
+		return [float(score) if ok else None for (score, ok) in zip(scores.tolist(), feasible.tolist())]
+
+	scores = []
+	for row in rows:
+		tr = sum([q for (code, q) in zip(row, qualities) if code == 1])
+		fa = sum([q for (code, q) in zip(row, qualities) if code == -1])
+		ind = sum([q for (code, q) in zip(row, qualities) if code == 0])
+		if (1 in row) and (-1 in row):
+			scores.append(float(abs(tr*10 - n) + abs(fa*10 - n) + ind*10))
+		else:
+			scores.append(None)
+	return scores
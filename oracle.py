@@ -2,6 +2,7 @@
 # I, Robert Rozanski, the copyright holder of this work, release this work into the public domain. This applies worldwide. In some countries this may not be legally possible; if so: I grant anyone the right to use this work for any purpose, without any conditions, unless such conditions are required by law.
 
 import exporter
+from rule_library import RuleLibrary
 
 from copy import copy
 
@@ -9,17 +10,27 @@ from exp_repr import DetectionEntity, LocalisationEntity, DetectionActivity, Ada
 
 from mnm_repr import Catalyses, Transports
 
-import subprocess
+from solver_runner import SolverRunner
+
+import mnm_repr
+
+import model_semantics
+
+import oracle_store
+
+import answer_parser
 
 import re
 
+import os
+
 from archive import NewResults
 
 import random
 
 
 class Oracle:
-	def __init__(self, archive, entities_ref, activities_ref, model_ref, all_ent, all_comp, all_act, sfx=""):
+	def __init__(self, archive, entities_ref, activities_ref, model_ref, all_ent, all_comp, all_act, sfx="", directory='./temp'):
 		ent_id_list = [e.ID for e in entities_ref]
 		if len(ent_id_list) != len(set(ent_id_list)):
 			print([(e.ID, e.version, type(e)) for e in entities_ref])
@@ -31,37 +42,108 @@ class Oracle:
 		self.all_ent = all_ent
 		self.all_comp = all_comp
 		self.all_act = all_act
-		self.work_file = './temp/workfile_gringo_clasp_oracle_%s' % sfx
+		# reference network doesn't change during a run: written once, streamed
+		self.directory = directory
+		self.network_file = os.path.join(directory, 'facts_network_oracle_%s' % sfx)
+		self.network_written = False
+		self.runner = SolverRunner()
+		self.rule_library = RuleLibrary()
+		# in vivo experiments: 'native' (model_semantics; ASP if not decided),
+		# 'asp' (gringo | clasp only) or 'verify' (both, outcomes compared)
+		self.in_vivo_mode = 'asp'
+		self.network_semantics = None
+		self.network_signature = None
+		# ModelSemantics of the reference model and of the models
+		# resulting from interventions (cleared when network changes)
+		self.reference_semantics = None
+		self.semantics_cache = {}
+		self.semantics_cache_size = 10000
+		# OracleStore shared by runs of the same test case (None: not used)
+		self.store = None
+		self.case_key = None
+		self.case_signature = None
+		# in vitro experiments: reference activities and entities' properties by IDs
+		self.activity_IDs = set([a.ID for a in activities_ref])
+		self.catalysed_by_entity = {}
+		self.transported_by_entity = {}
+		for ent in entities_ref:
+			self.catalysed_by_entity[ent.ID] = set([p.activity.ID for p in ent.properties if isinstance(p, Catalyses)])
+			self.transported_by_entity[ent.ID] = set([p.activity.ID for p in ent.properties if isinstance(p, Transports)])
 
 
 	def execute_exps(self):
-		ress = []
-		for expD in self.archive.chosen_experiment_descriptions:
-			ress.append(self.execute_exp(expD))
-		self.archive.record(NewResults(Experiment(None, ress)))
+		ress = self.execute_exps_batch(list(self.archive.chosen_experiment_descriptions))
+		self.archive.record(NewResults(Experiment(None, [self.simulate_error(res) for res in ress])))
 
 
 	def execute_exp(self, expD):
-		tp = expD.experiment_type
-		if isinstance(tp, DetectionEntity) or isinstance(tp, LocalisationEntity) or isinstance(tp, DetectionActivity) or isinstance(tp, AdamTwoFactorExperiment):
-			return self.execute_in_vivo(expD)
-		else:
-			return self.execute_in_vitro_exp(expD)
+		return self.simulate_error(self.execute_exps_batch([expD])[0])
+
+
+	def simulate_error(self, result):
+		# no errors (see SloppyOracle)
+		return result
+
+
+	def execute_exps_batch(self, expDs):
+		# results without errors, in order of experiments. In vivo experiments
+		# not decided natively are solved together (execute_in_vivo_asp_batch)
+		if not (self.in_vivo_mode in ['native', 'asp', 'verify']):
+			raise ValueError('execute_exps_batch: in vivo mode not recognised: %s' % self.in_vivo_mode)
+		results = [None for expD in expDs]
+		exp_keys = [None for expD in expDs]
+		to_solve = []
+		for (index, expD) in enumerate(expDs):
+			if self.store != None:
+				exp_keys[index] = oracle_store.experiment_key(expD)
+				outcome = self.store.get(self.get_case_key(), exp_keys[index])
+				if outcome != None:
+					results[index] = Result(None, expD, outcome)
+					exp_keys[index] = None # already stored
+					continue
+			tp = expD.experiment_type
+			if not (isinstance(tp, DetectionEntity) or isinstance(tp, LocalisationEntity) or isinstance(tp, DetectionActivity) or isinstance(tp, AdamTwoFactorExperiment)):
+				results[index] = self.execute_in_vitro_exp(expD)
+				continue
+			if self.in_vivo_mode != 'asp':
+				try:
+					results[index] = self.execute_in_vivo_native(expD)
+				except model_semantics.UndecidedError:
+					pass
+			if (results[index] == None) or (self.in_vivo_mode == 'verify'):
+				to_solve.append(index)
+
+		solved = self.execute_in_vivo_asp_batch([expDs[index] for index in to_solve])
+		for (index, res) in zip(to_solve, solved):
+			if (results[index] != None) and (results[index].outcome != res.outcome):
+				raise ValueError('execute_exps_batch: native outcome (%s) differs from ASP outcome (%s): %s' % (results[index].outcome, res.outcome, expDs[index]))
+			results[index] = res
+
+		for (index, res) in enumerate(results):
+			if exp_keys[index] != None:
+				self.store.put(self.get_case_key(), exp_keys[index], res.outcome)
+		return results
+
+
+	def get_case_key(self):
+		signature = (len(self.all_ent), len(self.all_comp), len(self.all_act), len(self.archive.import_activities), mnm_repr.generation)
+		if signature != self.case_signature:
+			self.case_signature = signature
+			self.case_key = oracle_store.case_fingerprint(self.entities, self.activities, self.model,
+				self.all_ent, self.all_comp, self.all_act + self.archive.import_activities)
+		return self.case_key
 
 
 	def execute_in_vitro_exp(self, expD):
 		if isinstance(expD.experiment_type, ReconstructionActivity):
-			act_ids = [a.ID for a in self.activities]
-			if (expD.experiment_type.activity_id in act_ids):
+			if (expD.experiment_type.activity_id in self.activity_IDs):
 				return Result(None, expD, 'true')
 			else:
 				return Result(None, expD, 'false')
 
 		elif isinstance(expD.experiment_type, ReconstructionEnzReaction):
-			act_ids = [a.ID for a in self.activities]
-			matching_entity = [ent for ent in self.entities if ent.ID == expD.experiment_type.enzyme_id][0]
-			catalysed_by_entity = [p.activity.ID for p in matching_entity.properties if isinstance(p, Catalyses)]
-			if not (expD.experiment_type.reaction_id in act_ids):
+			catalysed_by_entity = self.catalysed_by_entity[expD.experiment_type.enzyme_id]
+			if not (expD.experiment_type.reaction_id in self.activity_IDs):
 				return Result(None, expD, 'false')
 			elif not (expD.experiment_type.reaction_id in catalysed_by_entity):
 				return Result(None, expD, 'false')
@@ -69,10 +151,8 @@ class Oracle:
 				return Result(None, expD, 'true')
 
 		elif isinstance(expD.experiment_type, ReconstructionTransporterRequired):
-			act_ids = [a.ID for a in self.activities]
-			matching_entity = [ent for ent in self.entities if ent.ID == expD.experiment_type.transporter_id][0]
-			transported_by_entity = [p.activity.ID for p in matching_entity.properties if isinstance(p, Transports)]
-			if not (expD.experiment_type.transport_activity_id in act_ids):
+			transported_by_entity = self.transported_by_entity[expD.experiment_type.transporter_id]
+			if not (expD.experiment_type.transport_activity_id in self.activity_IDs):
 				return Result(None, expD, 'false')
 			elif not (expD.experiment_type.transport_activity_id in transported_by_entity):
 				return Result(None, expD, 'false')
@@ -84,39 +164,176 @@ class Oracle:
 
 
 	def execute_in_vivo(self, expD):
+		if self.in_vivo_mode == 'asp':
+			return self.execute_in_vivo_asp(expD)
+		elif not (self.in_vivo_mode in ['native', 'verify']):
+			raise ValueError('execute_in_vivo: in vivo mode not recognised: %s' % self.in_vivo_mode)
+		try:
+			res = self.execute_in_vivo_native(expD)
+		except model_semantics.UndecidedError:
+			return self.execute_in_vivo_asp(expD)
+		if self.in_vivo_mode == 'verify':
+			res_asp = self.execute_in_vivo_asp(expD)
+			if res.outcome != res_asp.outcome:
+				raise ValueError('execute_in_vivo: native outcome (%s) differs from ASP outcome (%s): %s' % (res.outcome, res_asp.outcome, expD))
+		return res
+
+
+	def execute_in_vivo_native(self, expD):
+		network = self.get_network_semantics()
+		if network == None:
+			raise model_semantics.UndecidedError('execute_in_vivo_native: network not supported')
+		return self.process_semantics(self.get_model_semantics(network, expD.interventions), expD)
+
+
+	def get_model_semantics(self, network, interventions):
+		copied_model = copy(self.model)
+		copied_model.ID = 'copied_%s' % self.model.ID
+		copied_model.apply_interventions(interventions)
+		# different intervention sets resulting in the same model share the entry
+		key = (copied_model.setup_conditions, copied_model.intermediate_activities)
+		if key in self.semantics_cache:
+			return self.semantics_cache[key]
+
+		reference = self.get_reference_semantics(network)
+		eliminated_below = None
+		if (copied_model.setup_conditions <= reference.model.setup_conditions) and (copied_model.intermediate_activities <= reference.model.intermediate_activities):
+			# only removals: reference eliminations still hold,
+			# only the activities affected by removals are eliminated on top of them
+			eliminated_below = reference.eliminated
+		semantics = model_semantics.ModelSemantics(network, copied_model, len(copied_model.intermediate_activities), eliminated_below)
+
+		if len(self.semantics_cache) >= self.semantics_cache_size:
+			self.semantics_cache = {}
+		self.semantics_cache[key] = semantics
+		return semantics
+
+
+	def get_reference_semantics(self, network):
+		if (self.reference_semantics == None) or (self.reference_semantics.model != self.model):
+			copied_model = copy(self.model)
+			copied_model.ID = 'copied_%s' % self.model.ID
+			self.reference_semantics = model_semantics.ModelSemantics(network, copied_model, len(copied_model.intermediate_activities))
+		return self.reference_semantics
+
+
+	def get_network_semantics(self):
+		# rebuilt only if the network changes (import activities are in the archive)
+		signature = (len(self.all_ent), len(self.all_comp), len(self.all_act), len(self.archive.import_activities), mnm_repr.generation)
+		if signature != self.network_signature:
+			self.network_signature = signature
+			self.reference_semantics = None
+			self.semantics_cache = {}
+			try:
+				self.network_semantics = model_semantics.NetworkSemantics(self.all_ent, self.all_comp, self.all_act + self.archive.import_activities)
+			except model_semantics.UndecidedError:
+				self.network_semantics = None
+		return self.network_semantics
+
+
+	def execute_in_vivo_asp(self, expD):
 		inp = self.prepare_input_in_vivo(expD)
-		out = self.write_and_execute(inp)
+		rule_files = self.rule_library.get_files(['predictions_rules', 'models_rules']) + [self.get_network_file()]
+		out = self.write_and_execute(inp, rule_files)
 		res = self.process_output(out, expD)
 		return res
 
 
+	def execute_in_vivo_asp_batch(self, expDs):
+		# each experiment is a model derived from the reference model;
+		# models with the same number of activities share one program
+		# (max_number_activities is a constant of the program)
+		groups = {}
+		for (index, expD) in enumerate(expDs):
+			copied_model = copy(self.model)
+			copied_model.ID = 'oracle_exp_%s' % index
+			copied_model.apply_interventions(expD.interventions)
+			groups.setdefault(len(copied_model.intermediate_activities), []).append((index, copied_model))
+
+		rule_files = self.rule_library.get_files(['predictions_rules', 'models_rules']) + [self.get_network_file()]
+		results = [None for expD in expDs]
+		for number_of_activities in sorted(groups.keys()):
+			group = groups[number_of_activities]
+			inp = [exporter.export_display_for_oracle_batch([expDs[index] for (index, model) in group]),
+				exporter.export_models_exp_design([model for (index, model) in group]),
+				[exporter.max_number_activities_constant(number_of_activities)]]
+			out = self.write_and_execute([val for sublist in inp for val in sublist], rule_files)
+			atoms = self.index_answer(out)
+			for (index, model) in group:
+				results[index] = self.process_atoms(atoms, model.ID, expDs[index])
+		return results
+
+
+	def index_answer(self, out):
+		# model ID: present species (entity, compartment), active activities
+		# and experiments predicted to be true (terms as in the answer)
+		answer = answer_parser.get_answer(out)
+		if answer == None:
+			raise ValueError('index_answer: no answer found: %s' % out)
+		index = answer_parser.index_atoms(answer)
+		atoms = {}
+		for name in ['synthesizable', 'initially_present']:
+			for (ent, version, comp, model_ID) in index.get(name, []):
+				atoms.setdefault(model_ID, {}).setdefault('present', set()).add((ent, comp))
+		for (act, model_ID) in index.get('active', []):
+			atoms.setdefault(model_ID, {}).setdefault('active', set()).add(act)
+		for (model_ID, experiment, outcome) in index.get('predicts', []):
+			if outcome == 'true':
+				atoms.setdefault(model_ID, {}).setdefault('predicted_true', set()).add(experiment)
+		return atoms
+
+
+	def process_atoms(self, atoms, model_ID, expD):
+		# same outcomes as process_output, for one of the models of a batch
+		model_atoms = atoms.get(model_ID, {})
+		tp = expD.experiment_type
+		if isinstance(tp, DetectionEntity):
+			present = [ent for (ent, comp) in model_atoms.get('present', set()) if ent == tp.entity_id]
+			return Result(None, expD, 'true' if present != [] else 'false')
+
+		elif isinstance(tp, LocalisationEntity):
+			present = (tp.entity_id, tp.compartment_id) in model_atoms.get('present', set())
+			return Result(None, expD, 'true' if present else 'false')
+
+		elif isinstance(tp, DetectionActivity):
+			return Result(None, expD, 'true' if tp.activity_id in model_atoms.get('active', set()) else 'false')
+
+		elif isinstance(tp, AdamTwoFactorExperiment):
+			experiment = 'experiment(adam_two_factor_exp,%s,%s)' % (tp.gene_id, tp.metabolite_id)
+			return Result(None, expD, 'true' if experiment in model_atoms.get('predicted_true', set()) else 'false')
+
+		else:
+			raise TypeError("oracle process_atoms: experiment type not recognised: %s" % expD.experiment_type)
+
+
 	def prepare_input_in_vivo(self, expD):
 		copied_model = copy(self.model)
 		copied_model.ID = 'copied_%s' % self.model.ID
 		copied_model.apply_interventions(expD.interventions)
-		exported_ent = exporter.export_entities(self.all_ent)
-		exported_comp = exporter.export_compartments(self.all_comp)
-		exported_act = exporter.export_activities(self.all_act + self.archive.import_activities)
 		exported_model = exporter.export_models_exp_design([copied_model])
-		exported_model_rules = exporter.models_rules(len(copied_model.intermediate_activities))
+		exported_const = [exporter.max_number_activities_constant(len(copied_model.intermediate_activities))]
 		exported_display = exporter.export_display_for_oracle(expD)
-		exported_prediction_rules = exporter.predictions_rules()
-		inp = [exported_display, exported_ent, exported_comp, exported_act, exported_model, exported_prediction_rules, exported_model_rules]
+		# static rules and network: passed as files (see execute_in_vivo_asp)
+		inp = [exported_display, exported_model, exported_const]
 		inp = [val for sublist in inp for val in sublist]
 		return inp
 
 
-	def write_and_execute(self, inp):
-		with open(self.work_file, 'w') as f:
-			for string in inp:
-				f.write(string)
-		# could suppress there warnig messages later on
-		gringo = subprocess.Popen(['gringo', self.work_file], stdout=subprocess.PIPE)
-		clasp = subprocess.Popen(['clasp', '-n', '0'], stdin=gringo.stdout, stdout=subprocess.PIPE)
-		gringo.stdout.close()
-		output_enc = clasp.communicate()[0]
-		output_dec = output_enc.decode('utf-8')
-		return output_dec
+	def get_network_file(self):
+		if not self.network_written:
+			if not os.path.isdir(self.directory):
+				os.makedirs(self.directory)
+			with open(self.network_file, 'w') as f:
+				exporter.write_entities(f, self.all_ent)
+				exporter.write_compartments(f, self.all_comp)
+				exporter.write_activities(f, self.all_act + self.archive.import_activities)
+			self.network_written = True
+		return self.network_file
+
+
+	def write_and_execute(self, inp, rule_files=None):
+		# rule_files: static rules (RuleLibrary; None: no files); inp: dynamic part only
+		return self.runner.gringo_clasp(inp, rule_files).output
 
 
 	def process_output(self, out, expD):
@@ -137,9 +354,10 @@ class Oracle:
 				return Result(None, expD, 'false')
 
 		elif isinstance(expD.experiment_type, LocalisationEntity):
-			if (re.search('synthesizable\(%s,.*?,%s,' % (expD.experiment_type.entity_id, expD.experiment_type.compartment_id), answer) != None):
+			# version can't contain commas: matches within one atom only
+			if (re.search('synthesizable\(%s,[^,]*,%s,' % (expD.experiment_type.entity_id, expD.experiment_type.compartment_id), answer) != None):
 				return Result(None, expD, 'true')
-			elif (re.search('initially_present\(%s,.*?,%s,' % (expD.experiment_type.entity_id, expD.experiment_type.compartment_id), answer) != None):
+			elif (re.search('initially_present\(%s,[^,]*,%s,' % (expD.experiment_type.entity_id, expD.experiment_type.compartment_id), answer) != None):
 				return Result(None, expD, 'true')
 			else:
 				return Result(None, expD, 'false')
@@ -161,19 +379,36 @@ class Oracle:
 			raise TypeError("oracle process_output: experiment type not recognised: %s" % expD.experiment_type)
 
 
+	def process_semantics(self, semantics, expD):
+		# same outcomes as process_output, from model_semantics
+		tp = expD.experiment_type
+		if isinstance(tp, DetectionEntity):
+			present = [s for s in semantics.setup | semantics.synthesizable if s[0] == tp.entity_id]
+			return Result(None, expD, 'true' if present != [] else 'false')
+
+		elif isinstance(tp, LocalisationEntity):
+			present = [s for s in semantics.setup | semantics.synthesizable if (s[0] == tp.entity_id) and (s[2] == tp.compartment_id)]
+			return Result(None, expD, 'true' if present != [] else 'false')
+
+		elif isinstance(tp, DetectionActivity):
+			return Result(None, expD, 'true' if tp.activity_id in semantics.active else 'false')
+
+		elif isinstance(tp, AdamTwoFactorExperiment):
+			# predicts atoms: gated by growth as in predictions_rules
+			return Result(None, expD, 'true' if 'true' in semantics.predicts(tp) else 'false')
+
+		else:
+			raise TypeError("oracle process_semantics: experiment type not recognised: %s" % expD.experiment_type)
+
+
 class SloppyOracle(Oracle):
 	# allows to randomly flip the outcome of experiment
 	# (simulates experimental errors, etc.)
-	def __init__(self, archive, entities_ref, activities_ref, model_ref, all_ent, all_comp, all_act, sfx="", error_parameter=0.00):
-		Oracle.__init__(self, archive, entities_ref, activities_ref, model_ref, all_ent, all_comp, all_act, sfx)
+	def __init__(self, archive, entities_ref, activities_ref, model_ref, all_ent, all_comp, all_act, sfx="", error_parameter=0.00, directory='./temp'):
+		Oracle.__init__(self, archive, entities_ref, activities_ref, model_ref, all_ent, all_comp, all_act, sfx, directory)
 		self.error_parameter = error_parameter
 
-	def execute_exp(self, expD):
-		tp = expD.experiment_type
-		if isinstance(tp, DetectionEntity) or isinstance(tp, LocalisationEntity) or isinstance(tp, DetectionActivity) or isinstance(tp, AdamTwoFactorExperiment):
-			result = self.execute_in_vivo(expD)
-		else:
-			result = self.execute_in_vitro_exp(expD)
+	def simulate_error(self, result):
 		# randomly decide whether to flip the outcome
 		# (true->false or vice versa)
 		if random.random() < self.error_parameter: # flip
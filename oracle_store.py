@@ -0,0 +1,117 @@
+#! /usr/bin/env python3
+# I, Robert Rozanski, the copyright holder of this work, release this work into the public domain. This applies worldwide. In some countries this may not be legally possible; if so: I grant anyone the right to use this work for any purpose, without any conditions, unless such conditions are required by law.
+
+import os
+import fcntl
+import hashlib
+import exporter
+import mnm_repr
+from copy import copy
+from exp_repr import Result
+
+
+class OracleStore:
+	# persistent outcomes of oracle experiments (before any error is simulated),
+	# shared by repetitions, configurations and evaluator processes.
+	# One line per outcome: case fingerprint, experiment key and outcome.
+	# The file is only appended to, under an exclusive lock; lines appended
+	# by other processes are read (under a shared lock) on a miss.
+	def __init__(self, path='./temp/oracle_store'):
+		self.path = path
+		self.outcomes = {} # (case key, experiment key): outcome
+		self.offset = 0 # bytes of the file already read
+		self.hits = 0
+		self.misses = 0
+		directory = os.path.dirname(self.path)
+		if (directory != '') and (not os.path.isdir(directory)):
+			os.makedirs(directory)
+
+
+	def get(self, case_key, exp_key):
+		key = (case_key, exp_key)
+		if not (key in self.outcomes):
+			self.refresh()
+		if key in self.outcomes:
+			self.hits += 1
+			return self.outcomes[key]
+		self.misses += 1
+		return None
+
+
+	def put(self, case_key, exp_key, outcome):
+		if (case_key, exp_key) in self.outcomes:
+			return
+		line = '%s\t%s\t%s\n' % (case_key, exp_key, outcome)
+		with open(self.path, 'a') as f:
+			fcntl.flock(f, fcntl.LOCK_EX)
+			try:
+				f.write(line)
+				f.flush()
+			finally:
+				fcntl.flock(f, fcntl.LOCK_UN)
+		self.outcomes[(case_key, exp_key)] = outcome
+
+
+	def refresh(self):
+		try:
+			f = open(self.path, 'r')
+		except (IOError, OSError):
+			return
+		with f:
+			fcntl.flock(f, fcntl.LOCK_SH)
+			try:
+				f.seek(self.offset)
+				data = f.read()
+			finally:
+				fcntl.flock(f, fcntl.LOCK_UN)
+		# lines are written whole, but a file can be cut short (e.g. disk full)
+		end = data.rfind('\n') + 1
+		for line in data[:end].splitlines():
+			fields = line.split('\t')
+			if len(fields) == 3:
+				self.outcomes[(fields[0], fields[1])] = fields[2]
+		self.offset += len(data[:end].encode('utf-8'))
+
+
+	def get_statistics(self):
+		return {'hits':self.hits, 'misses':self.misses}
+
+
+def case_fingerprint(entities_ref, activities_ref, model_ref, all_ent, all_comp, all_act):
+	# facts are sorted: iteration order of sets differs between processes
+	copied_model = copy(model_ref)
+	copied_model.ID = 'reference'
+	parts = [
+		('entities_ref', exporter.export_entities(entities_ref)),
+		('activities_ref', sorted([act.ID for act in activities_ref])),
+		('model_ref', exporter.export_models_exp_design([copied_model])),
+		('entities', exporter.export_entities(all_ent)),
+		('compartments', exporter.export_compartments(all_comp)),
+		('activities', exporter.export_activities(all_act))]
+	hsh = hashlib.sha1()
+	for (name, strings) in parts:
+		hsh.update(name.encode('utf-8'))
+		hsh.update(b'\x00')
+		for string in sorted(strings):
+			hsh.update(string.encode('utf-8'))
+			hsh.update(b'\x00')
+	return hsh.hexdigest()
+
+
+def experiment_key(expD):
+	# order of interventions is not significant:
+	# experiment designs add or remove each element once
+	strings = [exporter.result_fact(Result('exp', expD, 'outcome'))]
+	strings.extend(sorted([intervention_string(intervention) for intervention in expD.interventions]))
+	return hashlib.sha1(''.join(strings).encode('utf-8')).hexdigest()
+
+
+def intervention_string(intervention):
+	item = intervention.condition_or_activity
+	if isinstance(item, mnm_repr.PresentEntity):
+		item_string = 'setup_present(%s, %s, %s)' % (item.entity.ID, item.entity.version, item.compartment.ID)
+	elif isinstance(item, mnm_repr.Activity):
+		item_string = item.ID
+	else:
+		raise TypeError('intervention_string: intervention is neither condition nor activity: %s' % type(item))
+	return '\n%s(%s)' % (type(intervention).__name__.lower(), item_string)
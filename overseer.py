@@ -2,7 +2,7 @@
 # I, Robert Rozanski, the copyright holder of this work, release this work into the public domain. This applies worldwide. In some countries this may not be legally possible; if so: I grant anyone the right to use this work for any purpose, without any conditions, unless such conditions are required by law.
 
 from sys import stdout
-import pickle
+import archive_format
 from time import gmtime, time
 from archive import CheckPointFail, CheckPointSuccess, RevisedModel, AdditionalModels, AcceptedResults, NewResults
 from revision_module import RevCIAddB, RevCIAddR, RevCAddB, RevCAddR
@@ -23,6 +23,44 @@ class Overseer:
 		self.cycles_counter = 0
 		self.suffix = suffix
 		self.tried_producing_additional_models = 0
+		self.journal = None # Journal; optional
+		# 'pickle' (as before) or 'compact' (archive_format.save; smaller,
+		# timeline readable alone); archive_format.load reads both
+		self.archive_file_format = 'pickle'
+
+
+	def attach_journal(self, journal, resume=False):
+		# resume: archive and state restored from the journal, run continues
+		if resume and journal.exists():
+			self.set_state(journal.restore(self.archive))
+			print('resuming development: %s; state: %s' % (self.suffix, self.current_state))
+			stdout.flush()
+		else:
+			journal.start(self.archive, self.get_state())
+		self.journal = journal
+		self.archive.journal = journal
+
+
+	def get_state(self):
+		# time elapsed kept instead of start time: downtime not counted on resume
+		return {'current_state': self.current_state,
+			'cycles_since_last_new_model': self.cycles_since_last_new_model,
+			'cycles_since_best_model_changed': self.cycles_since_best_model_changed,
+			'current_best_models': self.current_best_models,
+			'cycles_counter': self.cycles_counter,
+			'tried_producing_additional_models': self.tried_producing_additional_models,
+			'time_elapsed': time() - self.archive.start_time}
+
+
+	def set_state(self, state):
+		self.current_state = state['current_state']
+		self.cycles_since_last_new_model = state['cycles_since_last_new_model']
+		self.cycles_since_best_model_changed = state['cycles_since_best_model_changed']
+		self.current_best_models = state['current_best_models']
+		self.cycles_counter = state['cycles_counter']
+		self.tried_producing_additional_models = state['tried_producing_additional_models']
+		self.archive.start_time = time() - state['time_elapsed']
+
 
 	def lower_equivalence_flag(self):
 		self.archive.all_models_equivalent = False
@@ -44,9 +82,10 @@ class Overseer:
 		current_time = gmtime()
 		time_stamp = '_'.join([str(x) for x in [current_time[0], current_time[1], current_time[2], current_time[3], current_time[4], current_time[5]]])
 		file_path = ('pickled_archives/archive_%s_%s' % (time_stamp, self.suffix))
-		pkl_file = open(file_path, 'wb')
-		pickle.dump(self.archive, pkl_file)
-		pkl_file.close()
+		if self.archive_file_format == 'compact':
+			archive_format.save(self.archive, file_path)
+		else:
+			archive_format.save_pickle(self.archive, file_path)
 		print('error flags?: %s' % self.archive.error_flag)
 		print('run out of time: %s' % (not self.time_passed_check()))
 		print('run out of cycles: %s' % (self.cycles_counter >= self.max_numb_cycles))
@@ -103,6 +142,8 @@ class Overseer:
 			tran_dict[0]['method']() # execute
 			# update state
 			self.current_state = tran_dict[0]['dst']
+			if self.journal != None:
+				self.journal.append_state(self.get_state(), self.archive)
 
 
 	def available_transitions(self):
@@ -2,11 +2,13 @@
 # I, Robert Rozanski, the copyright holder of this work, release this work into the public domain. This applies worldwide. In some countries this may not be legally possible; if so: I grant anyone the right to use this work for any purpose, without any conditions, unless such conditions are required by law.
 
 import exporter
+import model_semantics
+from rule_library import RuleLibrary
 
 from archive import RefutedModels, RevisedModel, RevisionFail, AdditionalModels, AdditModProdFail, RevisedIgnoredUpdate, RedundantModel
 import archive
 from copy import copy
-import subprocess
+from solver_runner import SolverRunner
 import mnm_repr
 import re
 import random
@@ -18,25 +20,51 @@ class RevisionModule:
 		self.xhail = xhail
 		self.gringo = gringo
 		self.clasp = clasp
-		# adds suffix specific for the task (required for multiprocessing)
-		self.work_file = './temp/workfile_xhail_%s' % sfx
+		self.runner = SolverRunner()
+		# all working models checked for consistency in one solver call
+		self.batch_consistency = True
+		# results ignored during revision (set by subclasses; used by revise)
+		self.ignoring = False
+		# consistency decided without the solver when possible (model_semantics)
+		self.native_consistency = True
+		self.network_semantics = None
+		self.network_signature = None
+		self.rule_library = RuleLibrary()
+		# answers used per revision (None: all optimal answers): XHAIL enumerates
+		# all (-a) and that many are sampled, so one answer isn't always the first.
+		# Own generator (fixed seed): the sequence of the random module doesn't
+		# depend on max_answers
+		self.max_answers = None
+		self.sample_random = random.Random(0)
+		# revision by a portfolio: (name, clasp executable) given to XHAIL at once,
+		# first to finish wins (None: self.clasp only)
+		self.portfolio = None
 
 
 	def test_and_revise_all(self):
-		inconsistent_models = []
-		for model in self.archive.working_models:
-			if not self.check_consistency(model):
-				inconsistent_models.append(model)
-			else:
-				pass
+		# sorted: models revised (and events recorded) in the same order in every run
+		working_models = sorted(self.archive.working_models, key=lambda m: m.ID)
+		if self.native_consistency:
+			verdicts = [self.check_consistency_native(model) for model in working_models]
+		else:
+			verdicts = [None for model in working_models]
+		# the solver for models not decided natively
+		undecided = [model for (model, verdict) in zip(working_models, verdicts) if verdict == None]
+		if self.batch_consistency:
+			solved = self.check_consistency_batch(undecided)
+		else:
+			solved = self.check_consistency_all(undecided)
+		solved.reverse()
+		verdicts = [solved.pop() if verdict == None else verdict for verdict in verdicts]
+		inconsistent_models = [model for (model, consistent) in zip(working_models, verdicts) if not consistent]
 
 		revision_events = []
 		update_events = []
 		updated_ignoring_models = []
 		redundant_model_created_events = []
-		for model in inconsistent_models:
-			#(new_mods, updated_base_model)
-			out = self.revise(model)
+		#(new_mods, updated_base_model)
+		outs = self.revise_all(inconsistent_models)
+		for (model, out) in zip(inconsistent_models, outs):
 			# in this case: there is no other consistent model
 			if out == False:
 				self.archive.record(RevisionFail())
@@ -44,11 +72,12 @@ class RevisionModule:
 			else:
 				if (out[0] != []): # new_mods
 					# check if new model redundant:
-					activities_from_current_models = [mod.intermediate_activities for mod in self.archive.working_models]
+					index = self.archive.get_activity_index()
+					activities_from_current_models = set([index.get_bits(mod.intermediate_activities) for mod in self.archive.working_models])
 					non_redundant_new_models = []
 					for new_model in out[0]:
 						# is redundant (set of activities identical to some other model)
-						if new_model.intermediate_activities in activities_from_current_models:
+						if index.get_bits(new_model.intermediate_activities) in activities_from_current_models:
 							redundant_model_created_events.append(RedundantModel(model, new_model))
 						else: # is not redundant
 							non_redundant_new_models.append(new_model)
@@ -67,16 +96,92 @@ class RevisionModule:
 
 
 	def check_consistency(self, model):
+		if self.native_consistency:
+			outcome = self.check_consistency_native(model)
+			if outcome != None:
+				return outcome
+		(inpt, rule_files) = self.prepare_consistency(model)
+		raw_output = self.write_and_execute_xhail(inpt, rule_files)
+		outcome = self.process_output_consistency(raw_output)
+		return outcome
+
+
+	def check_consistency_native(self, model):
+		# None: not decided, solver needed
+		network = self.get_network_semantics()
+		if network == None:
+			return None
+		extracted_results = [exp.results for exp in self.archive.known_results]
+		extracted_results = [val for sublist in extracted_results for val in sublist]
+		models_results = self.make_derivative_models(model, extracted_results)
+		return model_semantics.check_consistency(network, model, models_results, self.calculate_max_number_activities(model))
+
+
+	def get_network_semantics(self):
+		# rebuilt when network grows or any ID changes
+		signature = (len(self.archive.mnm_entities), len(self.archive.mnm_compartments),
+			len(self.archive.mnm_activities), len(self.archive.import_activities), mnm_repr.generation)
+		if signature != self.network_signature:
+			self.network_signature = signature
+			try:
+				self.network_semantics = model_semantics.NetworkSemantics(self.archive.mnm_entities,
+					self.archive.mnm_compartments, self.archive.mnm_activities + self.archive.import_activities)
+			except model_semantics.UndecidedError:
+				self.network_semantics = None
+		return self.network_semantics
+
+
+	def check_consistency_all(self, models):
+		# solver calls run concurrently (runner's workers)
+		futures = []
+		for model in models:
+			(inpt, rule_files) = self.prepare_consistency(model)
+			futures.append(self.runner.submit_xhail(inpt, rule_files, self.xhail, self.gringo, self.clasp))
+		return [self.process_output_consistency(future.result().check()) for future in futures]
+
+
+	def prepare_consistency(self, model):
 		res_mods = self.prepare_input_results_models_consistency(model)
 		max_number_activities = self.calculate_max_number_activities(model)
-		mod_rules = exporter.models_rules(max_number_activities)
-		pred_rules = exporter.predictions_rules()
-		incons_rules = exporter.inconsistency_rules()
-		inpt = [res_mods, mod_rules, pred_rules, incons_rules]
+		const = [exporter.max_number_activities_constant(max_number_activities)]
+		inpt = [res_mods, const]
 		inpt = [val for sublist in inpt for val in sublist] # flatten
-		raw_output = self.write_and_execute_xhail(inpt)
-		outcome = self.process_output_consistency(raw_output)
-		return outcome
+		rule_files = self.rule_library.get_files(['models_rules', 'predictions_rules', 'inconsistency_rules'])
+		return (inpt, rule_files + self.get_fact_files())
+
+
+	def check_consistency_batch(self, models):
+		# one gringo|clasp call for all models (no XHAIL: nothing to abduce);
+		# returns verdicts in the order of models
+		if models == []:
+			return []
+		inpt = self.prepare_input_consistency_batch(models)
+		rule_files = self.rule_library.get_files(['models_rules', 'predictions_rules', 'inconsistency_rules'])
+		run = self.runner.gringo_clasp(inpt, rule_files + self.get_fact_files(), ['-n', '1'], self.gringo, self.clasp)
+		inconsistent_ids = self.process_output_consistency_batch(run.check())
+		# program has no constraints: no answer means something went wrong
+		if inconsistent_ids == None:
+			return [self.check_consistency(model) for model in models]
+		return [not (model.ID in inconsistent_ids) for model in models]
+
+
+	def prepare_input_consistency_batch(self, models):
+		extracted_results = [exp.results for exp in self.archive.known_results]
+		extracted_results = [val for sublist in extracted_results for val in sublist]
+		output = [self.prepare_input_elements()]
+		# results already in the archive's facts file (see get_fact_files)
+		if self.archive.fact_base == None:
+			output.append(exporter.export_results(extracted_results))
+		# derivative models' IDs contain base model's ID: no clashes between models
+		for base_model in models:
+			models_results = self.make_derivative_models(base_model, extracted_results)
+			output.append(exporter.export_models(models_results))
+			output.append(exporter.export_termination_conds_consistency_batch(base_model))
+			output.append(exporter.export_relevancy_results_consistency_batch(models_results, base_model))
+		output.append(exporter.consistency_batch_display())
+		# does not depend on model
+		output.append([exporter.max_number_activities_constant(self.calculate_max_number_activities(models[0]))])
+		return [val for sublist in output for val in sublist]
 
 
 	def calculate_max_number_activities(self, model):
@@ -112,6 +217,9 @@ class RevisionModule:
 
 
 	def prepare_input_elements(self):
+		# network already in the archive's facts file (see get_fact_files)
+		if self.archive.fact_base != None:
+			return []
 		exped_entities = exporter.export_entities(self.archive.mnm_entities)
 		exped_compartments = exporter.export_compartments(self.archive.mnm_compartments)
 		exped_activities = exporter.export_activities(self.archive.mnm_activities + self.archive.import_activities)
@@ -127,7 +235,11 @@ class RevisionModule:
 		# flattened
 		extracted_results = [val for sublist in extracted_results for val in sublist]
 
-		exped_results = exporter.export_results(extracted_results)
+		# results already in the archive's facts file (see get_fact_files)
+		if self.archive.fact_base != None:
+			exped_results = []
+		else:
+			exped_results = exporter.export_results(extracted_results)
 		models_results = self.make_derivative_models(base_model, extracted_results)
 		# specification and model()
 		exped_models = exporter.export_models(models_results)
@@ -139,15 +251,28 @@ class RevisionModule:
 		return (out, models_results)
 
 
-	def write_and_execute_xhail(self, inpt):
-		# try: remove the workfile
-		with open(self.work_file, 'w') as f:
-			for string in inpt:
-				read_data = f.write(string)
-		# could suppress there warnig messages later on
-		output_enc = subprocess.check_output(["java", "-jar", self.xhail, "-g", self.gringo, "-c", self.clasp, "-a", "-f", self.work_file])
-		output_dec = output_enc.decode('utf-8')
-		return output_dec
+	def get_fact_files(self):
+		if self.archive.fact_base == None:
+			return []
+		return self.archive.fact_base.get_files()
+
+
+	def write_and_execute_xhail(self, inpt, rule_files=None, options=None):
+		# rule_files: static rules (RuleLibrary) and facts files (FactBase); inpt: dynamic part only
+		# (None: no files); options: XHAIL options (None: -a)
+		run = self.runner.xhail(inpt, rule_files, self.xhail, self.gringo, self.clasp, options)
+		# raises if xhail fails or runs out of time (as check_output did)
+		return run.check()
+
+
+	def write_and_execute_revision(self, inpt, rule_files):
+		return self.run_revision(inpt, rule_files).check()
+
+
+	def run_revision(self, inpt, rule_files):
+		if self.portfolio != None:
+			return self.runner.portfolio_xhail(inpt, rule_files, self.xhail, self.gringo, self.portfolio, ['-a'])
+		return self.runner.xhail(inpt, rule_files, self.xhail, self.gringo, self.clasp, ['-a'])
 
 
 	def process_output_consistency(self, output):
@@ -157,6 +282,13 @@ class RevisionModule:
 			return False
 
 
+	def process_output_consistency_batch(self, output):
+		answer = re.search('Answer: 1\n(.*)', output)
+		if answer == None:
+			return None
+		return set(re.findall('inconsistent_model\((.*?)\)', answer.group(1)))
+
+
 	def make_derivative_models(self, base_model, extracted_results):
 		unique_interventions = set([result.exp_description.interventions for result in extracted_results])
 
@@ -267,8 +399,48 @@ class RevisionModule:
 		return new_model
 
 
+	def revise(self, base_model, force_new_model=False):
+		return self.prepare_input_execute_and_process(base_model, self.ignoring, force_new_model)
+
+
+	def revise_all(self, models, force_new_model=False):
+		# solver calls run concurrently (runner's workers), but outputs are processed
+		# one by one in models' order: random choices don't depend on timing.
+		# Stops after the first failed revision (as revising one by one would)
+		if type(self).revise != RevisionModule.revise:
+			# subclass revises its own way: one by one
+			return self.revise_one_by_one(models, force_new_model)
+		prepared = [self.prepare_revision(model, self.ignoring, force_new_model) for model in models]
+		futures = [self.runner.get_executor().submit(self.run_revision, inpt, rule_files) for (cmodel, inpt, rule_files) in prepared]
+		outs = []
+		for (model, (cmodel, inpt, rule_files), future) in zip(models, prepared, futures):
+			out = self.process_revision(model, cmodel, future.result().check())
+			outs.append(out)
+			if out == False:
+				for other in futures:
+					other.cancel()
+				break
+		return outs
+
+
+	def revise_one_by_one(self, models, force_new_model=False):
+		outs = []
+		for model in models:
+			out = self.revise(model, force_new_model)
+			outs.append(out)
+			if out == False:
+				break
+		return outs
+
+
 	def prepare_input_execute_and_process(self, base_model, ignoring, force_new_model):
 		# pretty much revise; base_model = original one
+		(cmodel, inpt, rule_files) = self.prepare_revision(base_model, ignoring, force_new_model)
+		raw_output = self.write_and_execute_revision(inpt, rule_files)
+		return self.process_revision(base_model, cmodel, raw_output)
+
+
+	def prepare_revision(self, base_model, ignoring, force_new_model):
 		cmodel = copy(base_model)
 		cmodel.ID = 'base'
 
@@ -285,30 +457,30 @@ class RevisionModule:
 			results = [val for sublist in results for val in sublist] # flatten
 			modeh_ignore = exporter.export_ignore_results(results)
 
-		inter_rules = exporter.interventions_rules()
+		rule_names = ['interventions_rules', 'models_rules', 'predictions_rules', 'inconsistency_rules']
 
 		difference_facts = []
-		model_difference_rules = []
 		if force_new_model:
 			# base model (id) must not be in the working mods
 			difference_facts = exporter.export_force_new_model(cmodel, self.archive.working_models)
-			model_difference_rules = exporter.model_difference_rules()
+			rule_names.append('model_difference_rules')
 
 		max_number_activities = len(self.archive.mnm_activities + self.archive.import_activities)
-		mod_rules = exporter.models_rules(max_number_activities)
-		pred_rules = exporter.predictions_rules()
-		incons_rules = exporter.inconsistency_rules()
+		const = [exporter.max_number_activities_constant(max_number_activities)]
 
-		inpt = [res_mods, modeh_add_act, modeh_rem_act, modeh_ignore, inter_rules, difference_facts, model_difference_rules, mod_rules, pred_rules, incons_rules]
+		inpt = [res_mods, modeh_add_act, modeh_rem_act, modeh_ignore, difference_facts, const]
 		inpt = [val for sublist in inpt for val in sublist] # flatten
+		return (cmodel, inpt, self.rule_library.get_files(rule_names) + self.get_fact_files())
 
-		raw_output = self.write_and_execute_xhail(inpt)
 
+	def process_revision(self, base_model, cmodel, raw_output):
 		processed_output = self.process_output_revision(raw_output)
 		# decide what to do based on output
 		# revision fail
 		if processed_output == []:
 			return False
+		if (self.max_answers != None) and (len(processed_output) > self.max_answers):
+			processed_output = self.sample_random.sample(processed_output, self.max_answers)
 
 		new_mod = []
 		updated_base_model = False
@@ -344,9 +516,6 @@ class RevCAddB(RevisionModule):
 	def __init__(self, archive, sfx=""):
 		RevisionModule.__init__(self, archive, sfx=sfx)
 
-	def revise(self, base_model, force_new_model=False):
-		return self.prepare_input_execute_and_process(base_model, False, force_new_model)
-
 	def produce_additional_models(self):
 		model = self.get_current_best_model()
 		out = self.revise(model, True)
@@ -364,9 +533,6 @@ class RevCAddR(RevisionModule):
 	def __init__(self, archive, sfx=""):
 		RevisionModule.__init__(self, archive, sfx=sfx)
 
-	def revise(self, base_model, force_new_model=False):
-		return self.prepare_input_execute_and_process(base_model, False, force_new_model)
-
 	def produce_additional_models(self):
 		model = self.create_random_model()
 		if not self.check_consistency(model):
@@ -386,9 +552,7 @@ class RevCIAddB(RevisionModule):
 	# rev: minimise changes and ignored; additional: revise the best
 	def __init__(self, archive, sfx=""):
 		RevisionModule.__init__(self, archive, sfx=sfx)
-
-	def revise(self, base_model, force_new_model=False):
-		return self.prepare_input_execute_and_process(base_model, True, force_new_model)
+		self.ignoring = True
 
 	def produce_additional_models(self):
 		model = self.get_current_best_model()
@@ -408,9 +572,7 @@ class RevCIAddR(RevisionModule):
 	# rev: minimise changes and ignored; additional: random
 	def __init__(self, archive, sfx=""):
 		RevisionModule.__init__(self, archive, sfx=sfx)
-
-	def revise(self, base_model, force_new_model=False):
-		return self.prepare_input_execute_and_process(base_model, True, force_new_model)
+		self.ignoring = True
 
 	def produce_additional_models(self):
 		model = self.create_random_model()
@@ -0,0 +1,63 @@
+#! /usr/bin/env python3
+# I, Robert Rozanski, the copyright holder of this work, release this work into the public domain. This applies worldwide. In some countries this may not be legally possible; if so: I grant anyone the right to use this work for any purpose, without any conditions, unless such conditions are required by law.
+
+import os
+import hashlib
+from tempfile import mkstemp
+
+import exporter
+
+# static rule sets; max_number_activities is left as a constant
+# and has to be passed to the solver (-c or #const)
+RULE_SETS = {
+	'models_rules':exporter.models_rules,
+	'predictions_rules':exporter.predictions_rules,
+	'inconsistency_rules':exporter.inconsistency_rules,
+	'interventions_rules':exporter.interventions_rules,
+	'model_difference_rules':exporter.model_difference_rules,
+	'experiment_design_rules':exporter.experiment_design_rules,
+	'advanced_exp_design_rules':exporter.advanced_exp_design_rules,
+	'design_constraints_basic':exporter.design_constraints_basic,
+	'cost_minimisation_rules':exporter.cost_minimisation_rules,
+	'hide_show_statements':exporter.hide_show_statements}
+
+# directory of libraries created without one (modules create their own)
+default_directory = './temp/rules'
+
+
+class RuleLibrary:
+	# rule sets are compiled into files in the temp directory once per run;
+	# solver calls get their paths alongside a small file with dynamic facts.
+	# File names contain a hash of the content, so different versions
+	# of the rules never overwrite each other (and the paths identify the content).
+	def __init__(self, directory=None):
+		if directory == None:
+			directory = default_directory
+		self.directory = directory
+		self.files = {} # rule set name: path
+
+
+	def get_file(self, name):
+		if name not in self.files:
+			self.files[name] = self.write_rule_set(name, RULE_SETS[name]())
+		return self.files[name]
+
+
+	def get_files(self, names):
+		return [self.get_file(name) for name in names]
+
+
+	def write_rule_set(self, name, strings):
+		text = ''.join(strings)
+		digest = hashlib.sha1(text.encode('utf-8')).hexdigest()[:12]
+		path = os.path.join(self.directory, '%s_%s.lp' % (name, digest))
+		if os.path.isfile(path):
+			return path
+		if not os.path.isdir(self.directory):
+			os.makedirs(self.directory)
+		# temporary file + rename: other processes never see a half-written file
+		handle, temp_path = mkstemp(dir=self.directory, prefix='.tmp_')
+		with os.fdopen(handle, 'w') as f:
+			f.write(text)
+		os.replace(temp_path, path)
+		return path
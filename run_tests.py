@@ -11,6 +11,19 @@ from tests import cost_model_test
 from tests import experiment_module_test
 from tests import oracle_test
 from tests import overseer_test
+from tests import solver_cache_test
+from tests import rule_library_test
+from tests import fact_base_test
+from tests import solver_runner_test
+from tests import model_semantics_test
+from tests import oracle_store_test
+from tests import answer_parser_test
+from tests import design_session_test
+from tests import native_designer_test
+from tests import journal_test
+from tests import archive_format_test
+from tests import bitset_repr_test
+from tests import answer_collector_test
 
 suite_1 = unittest.TestLoader().loadTestsFromTestCase(mnm_repr_test.ModelTest)
 suite_2 = unittest.TestLoader().loadTestsFromTestCase(archive_test.ArchiveTest)
@@ -21,6 +34,19 @@ suite_6 = unittest.TestLoader().loadTestsFromTestCase(cost_model_test.CostModelT
 suite_7 = unittest.TestLoader().loadTestsFromTestCase(experiment_module_test.ExperimentModuleTest)
 suite_8 = unittest.TestLoader().loadTestsFromTestCase(oracle_test.OracleTest)
 suite_9 = unittest.TestLoader().loadTestsFromTestCase(overseer_test.OverseerTest)
+suite_10 = unittest.TestLoader().loadTestsFromTestCase(solver_cache_test.SolverCacheTest)
+suite_11 = unittest.TestLoader().loadTestsFromTestCase(rule_library_test.RuleLibraryTest)
+suite_12 = unittest.TestLoader().loadTestsFromTestCase(fact_base_test.FactBaseTest)
+suite_13 = unittest.TestLoader().loadTestsFromTestCase(solver_runner_test.SolverRunnerTest)
+suite_14 = unittest.TestLoader().loadTestsFromTestCase(model_semantics_test.ModelSemanticsTest)
+suite_15 = unittest.TestLoader().loadTestsFromTestCase(oracle_store_test.OracleStoreTest)
+suite_16 = unittest.TestLoader().loadTestsFromTestCase(answer_parser_test.AnswerParserTest)
+suite_17 = unittest.TestLoader().loadTestsFromTestCase(design_session_test.DesignSessionTest)
+suite_18 = unittest.TestLoader().loadTestsFromTestCase(native_designer_test.NativeDesignerTest)
+suite_19 = unittest.TestLoader().loadTestsFromTestCase(journal_test.JournalTest)
+suite_20 = unittest.TestLoader().loadTestsFromTestCase(archive_format_test.ArchiveFormatTest)
+suite_21 = unittest.TestLoader().loadTestsFromTestCase(bitset_repr_test.BitsetReprTest)
+suite_22 = unittest.TestLoader().loadTestsFromTestCase(answer_collector_test.AnswerCollectorTest)
 
 suits = [suite_5] #suite_1, suite_2, suite_3, suite_4, suite_5, suite_6, suite_7, suite_8
 
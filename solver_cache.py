@@ -0,0 +1,124 @@
+#! /usr/bin/env python3
+# I, Robert Rozanski, the copyright holder of this work, release this work into the public domain. This applies worldwide. In some countries this may not be legally possible; if so: I grant anyone the right to use this work for any purpose, without any conditions, unless such conditions are required by law.
+
+import os
+import hashlib
+from tempfile import mkstemp
+
+class SolverCache:
+	# persistent cache of solver outputs shared by revision, experiment design and oracle.
+	# Entries are content-addressed: the key is a hash of the program text
+	# and of the solver command line (without the path of the work file).
+	# One file per entry; file's modification time marks the last use,
+	# so the least recently used entries are evicted when max_size (bytes) is exceeded.
+	# Size of the directory is counted once and then kept by put(); entries of
+	# other processes are counted when the directory is listed again (eviction)
+	def __init__(self, directory='./temp/solver_cache', max_size=512*1024*1024):
+		self.directory = directory
+		self.max_size = max_size
+		self.size = None # bytes; None: not counted yet
+		self.hits = 0
+		self.misses = 0
+		if not os.path.isdir(self.directory):
+			os.makedirs(self.directory)
+
+
+	def make_key(self, program, command, files=None):
+		# program: list of strings (as written to the work file)
+		# files: input files given on the command line whose content can change
+		if files == None:
+			files = []
+		hsh = hashlib.sha1()
+		for arg in command:
+			hsh.update(arg.encode('utf-8'))
+			hsh.update(b'\x00')
+		hsh.update(b'\x00')
+		for path in files:
+			with open(path, 'rb') as f:
+				for block in iter(lambda: f.read(1024*1024), b''):
+					hsh.update(block)
+			hsh.update(b'\x00')
+		for string in program:
+			hsh.update(string.encode('utf-8'))
+		return hsh.hexdigest()
+
+
+	def get_entry_path(self, key):
+		return os.path.join(self.directory, key)
+
+
+	def get(self, key):
+		path = self.get_entry_path(key)
+		try:
+			with open(path, 'r') as f:
+				output = f.read()
+		# missing or evicted by other process in the meantime
+		except (IOError, OSError):
+			self.misses += 1
+			return None
+		try:
+			os.utime(path, None) # mark as recently used
+		except OSError:
+			pass
+		self.hits += 1
+		return output
+
+
+	def put(self, key, output):
+		# written to a temporary file first and then renamed:
+		# concurrent runs never read half-written entries
+		handle, temp_path = mkstemp(dir=self.directory, prefix='.tmp_')
+		with os.fdopen(handle, 'w') as f:
+			f.write(output)
+		if self.size == None:
+			self.size = self.count_size()
+		try:
+			# entry replaced
+			self.size -= os.stat(self.get_entry_path(key)).st_size
+		except OSError:
+			pass
+		self.size += os.stat(temp_path).st_size
+		os.replace(temp_path, self.get_entry_path(key))
+		if self.size > self.max_size:
+			self.evict()
+
+
+	def list_entries(self):
+		# (last use, size, name)
+		entries = []
+		for name in os.listdir(self.directory):
+			if name.startswith('.tmp_'):
+				continue
+			try:
+				stat = os.stat(os.path.join(self.directory, name))
+			except OSError:
+				continue
+			entries.append((stat.st_mtime, stat.st_size, name))
+		return entries
+
+
+	def count_size(self):
+		return sum([size for (mtime, size, name) in self.list_entries()])
+
+
+	def evict(self):
+		entries = self.list_entries()
+		total_size = sum([size for (mtime, size, name) in entries])
+		self.size = total_size
+		if total_size <= self.max_size:
+			return
+		# oldest first
+		entries.sort()
+		for (mtime, size, name) in entries:
+			if total_size <= self.max_size:
+				break
+			try:
+				os.remove(os.path.join(self.directory, name))
+			except OSError:
+				pass
+			total_size -= size
+		self.size = total_size
+
+
+	def get_statistics(self):
+		return {'hits':self.hits, 'misses':self.misses}
@@ -0,0 +1,377 @@
+#! /usr/bin/env python3
+# I, Robert Rozanski, the copyright holder of this work, release this work into the public domain. This applies worldwide. In some countries this may not be legally possible; if so: I grant anyone the right to use this work for any purpose, without any conditions, unless such conditions are required by law.
+
+import os
+import time
+import threading
+import subprocess
+import resource
+from tempfile import mkstemp, gettempdir, TemporaryFile
+from queue import Queue
+from concurrent.futures import ThreadPoolExecutor
+
+
+# portfolio members: (name, clasp options); clasp 3 configurations
+CLASP_PORTFOLIO = [('tweety', ['--configuration=tweety']),
+	('trendy', ['--configuration=trendy']),
+	('frumpy', ['--configuration=frumpy']),
+	('jumpy', ['--configuration=jumpy'])]
+
+
+class SolverRun:
+	# outcome of one solver call
+	def __init__(self, commands, output, errors='', returncodes=None, timed_out=False, cached=False, ok=True, stopped=False):
+		self.commands = commands
+		self.output = output
+		self.errors = errors # stderr of all processes
+		if returncodes == None:
+			returncodes = []
+		self.returncodes = returncodes
+		self.timed_out = timed_out
+		self.cached = cached
+		self.ok = ok
+		self.stopped = stopped # reading stopped by the collector
+
+	def get_returncode(self):
+		if self.returncodes == []:
+			return None
+		return self.returncodes[-1]
+
+	def check(self):
+		# same exceptions as subprocess.check_output
+		if self.timed_out:
+			raise subprocess.TimeoutExpired(self.commands, None, self.output, self.errors)
+		if not self.ok:
+			raise subprocess.CalledProcessError(self.get_returncode(), self.commands, self.output, self.errors)
+		return self.output
+
+
+class Cancellation:
+	# processes of one call; all killed on cancel (portfolio members that lost)
+	def __init__(self):
+		self.processes = []
+		self.cancelled = False
+		self.lock = threading.Lock()
+
+	def add(self, process):
+		with self.lock:
+			self.processes.append(process)
+			if self.cancelled:
+				process.kill()
+
+	def cancel(self):
+		with self.lock:
+			self.cancelled = True
+			for process in self.processes:
+				process.kill()
+
+
+class SolverRunner:
+	# runs solvers (gringo | clasp, XHAIL) for revision, experiment design and oracle.
+	# Programs are streamed through stdin; if a solver can't read stdin (XHAIL)
+	# or use_stdin is False, each call gets its own temporary file
+	# (on tmpfs, if available), so concurrent calls never share files.
+	# time_limit: wall-clock seconds per call; memory_limit: bytes per process.
+	# Outputs of successful calls are stored in the cache (SolverCache), if given.
+	# collector (answer_parser.AnswerCollector): output read line by line
+	# into it and replaced by its (compact) output; it can stop the solver.
+	# Portfolios: the same program solved by several members (configurations)
+	# at once; the first to finish with a proven outcome wins, others are killed.
+	# portfolio_statistics: member name: runs, wins and time (s)
+	def __init__(self, cache=None, time_limit=None, memory_limit=None, temp_dir=None, workers=2):
+		self.cache = cache
+		self.time_limit = time_limit
+		self.memory_limit = memory_limit
+		if temp_dir == None:
+			if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+				temp_dir = '/dev/shm'
+			else:
+				temp_dir = gettempdir()
+		self.temp_dir = temp_dir
+		self.use_stdin = True
+		self.workers = workers
+		self.executor = None # created on first asynchronous call
+		self.portfolio_statistics = {}
+		self.statistics_lock = threading.Lock()
+
+
+	def __getstate__(self):
+		# executor and lock can't be pickled (evaluator's multiprocessing)
+		state = self.__dict__.copy()
+		state['executor'] = None
+		del state['statistics_lock']
+		return state
+
+
+	def __setstate__(self, state):
+		self.__dict__.update(state)
+		self.statistics_lock = threading.Lock()
+
+
+	def gringo_clasp(self, program, files=None, clasp_options=None, gringo='gringo', clasp='clasp', collector=None, cancellation=None):
+		# clasp exit codes: 10 (sat), 20 (unsat), 30 (optimum/all found);
+		# gringo reads the program from stdin when given '-'
+		if files == None:
+			files = []
+		if clasp_options == None:
+			clasp_options = ['-n', '0']
+		commands = [[gringo] + files, [clasp] + clasp_options]
+		return self.run(commands, program, files, ok_codes=[10, 20, 30], stdin_arg='-', collector=collector, cancellation=cancellation)
+
+
+	def portfolio_gringo_clasp(self, program, files=None, clasp_options=None, portfolio=CLASP_PORTFOLIO, gringo='gringo', clasp='clasp', collector_factory=None):
+		# portfolio: (name, clasp options added to clasp_options);
+		# collector_factory: new collector for each member (None: no collector)
+		if clasp_options == None:
+			clasp_options = ['-n', '0']
+		members = []
+		for (name, options) in portfolio:
+			collector = None if collector_factory == None else collector_factory()
+			members.append((name, self.gringo_clasp, (program, files, clasp_options + options, gringo, clasp, collector)))
+		return self.run_portfolio(members, clasp_proven)
+
+
+	def xhail(self, program, files, xhail, gringo, clasp, options=None, cancellation=None):
+		# XHAIL reads files only. JVM reserves much more virtual memory than it uses,
+		# so memory limit is passed as maximum heap size instead of rlimit
+		if options == None:
+			options = ['-a']
+		java = ['java']
+		if self.memory_limit != None:
+			java.append('-Xmx%sm' % max(1, self.memory_limit // (1024*1024)))
+		commands = [java + ['-jar', xhail, '-g', gringo, '-c', clasp] + options + ['-f'] + files]
+		return self.run(commands, program, files, ok_codes=[0], stdin_arg=None, limit_memory=False, cancellation=cancellation)
+
+
+	def portfolio_xhail(self, program, files, xhail, gringo, portfolio, options=None):
+		# XHAIL takes no clasp options: portfolio: (name, clasp executable),
+		# e.g. scripts running clasp with different configurations
+		members = [(name, self.xhail, (program, files, xhail, gringo, clasp, options)) for (name, clasp) in portfolio]
+		return self.run_portfolio(members, lambda run: run.ok)
+
+
+	def run_portfolio(self, members, proven):
+		# members: (name, runner method, arguments); proven(run): True if the
+		# outcome can't be improved. If no member proves it: first successful
+		# run in members' order (or first run)
+		results = Queue()
+		cancellations = [Cancellation() for member in members]
+		for (number, (name, method, args)) in enumerate(members):
+			thread = threading.Thread(target=self.run_member, args=(results, number, method, args, cancellations[number]))
+			thread.daemon = True
+			thread.start()
+
+		runs = [None for member in members]
+		times = [None for member in members]
+		winner = None
+		for member in members:
+			(number, run, elapsed) = results.get()
+			runs[number] = run
+			times[number] = elapsed
+			if (winner == None) and (not isinstance(run, Exception)) and proven(run):
+				winner = number
+				for (other, cancellation) in enumerate(cancellations):
+					if other != number:
+						cancellation.cancel()
+
+		if winner == None:
+			successful = [number for (number, run) in enumerate(runs) if (not isinstance(run, Exception)) and run.ok]
+			winner = successful[0] if successful != [] else 0
+		self.record_portfolio(members, times, winner)
+		if isinstance(runs[winner], Exception):
+			raise runs[winner]
+		return runs[winner]
+
+
+	def run_member(self, results, number, method, args, cancellation):
+		start = time.monotonic()
+		try:
+			run = method(*args, cancellation=cancellation)
+		except Exception as err:
+			run = err
+		results.put((number, run, time.monotonic() - start))
+
+
+	def record_portfolio(self, members, times, winner):
+		with self.statistics_lock:
+			for (number, (name, method, args)) in enumerate(members):
+				statistics = self.portfolio_statistics.setdefault(name, {'runs':0, 'wins':0, 'time':0.0})
+				statistics['runs'] += 1
+				statistics['time'] += times[number]
+				if number == winner:
+					statistics['wins'] += 1
+
+
+	def submit_gringo_clasp(self, program, files=None, clasp_options=None, gringo='gringo', clasp='clasp', collector=None):
+		return self.get_executor().submit(self.gringo_clasp, program, files, clasp_options, gringo, clasp, collector)
+
+
+	def submit_xhail(self, program, files, xhail, gringo, clasp, options=None):
+		return self.get_executor().submit(self.xhail, program, files, xhail, gringo, clasp, options)
+
+
+	def get_executor(self):
+		if self.executor == None:
+			self.executor = ThreadPoolExecutor(max_workers=self.workers)
+		return self.executor
+
+
+	def shutdown(self):
+		if self.executor != None:
+			self.executor.shutdown()
+			self.executor = None
+
+
+	def run(self, commands, program, files=None, ok_codes=None, stdin_arg=None, limit_memory=True, collector=None, cancellation=None):
+		# commands: list of commands piped into one another (e.g. gringo | clasp);
+		# program: list of strings given to the first command;
+		# files: input files on the command line (their content is part of the cache key)
+		# stdin_arg: argument making the first command read stdin (None: can't read stdin)
+		if files == None:
+			files = []
+		if ok_codes == None:
+			ok_codes = [0]
+		if self.cache != None:
+			key_command = [arg for command in commands for arg in command + ['|']]
+			key = self.cache.make_key(program, key_command, files)
+			output = self.cache.get(key)
+			if output != None:
+				return SolverRun(commands, output, cached=True)
+
+		temp_path = None
+		if self.use_stdin and (stdin_arg != None):
+			commands = [commands[0] + [stdin_arg]] + commands[1:]
+		else:
+			handle, temp_path = mkstemp(dir=self.temp_dir, prefix='huginn_', suffix='.lp')
+			with os.fdopen(handle, 'w') as f:
+				for string in program:
+					f.write(string)
+			commands = [commands[0] + [temp_path]] + commands[1:]
+
+		try:
+			run = self.execute(commands, program, temp_path == None, limit_memory, collector, cancellation)
+		finally:
+			if temp_path != None:
+				os.remove(temp_path)
+
+		if run.stopped:
+			# processes killed on purpose; output complete for the collector, not cached
+			run.ok = not run.timed_out
+			return run
+		run.ok = (not run.timed_out) and all([code == 0 for code in run.returncodes[:-1]]) and (run.get_returncode() in ok_codes)
+		if run.ok and (self.cache != None):
+			self.cache.put(key, run.output)
+		return run
+
+
+	def execute(self, commands, program, stream_program, limit_memory, collector=None, cancellation=None):
+		preexec_fn = None
+		if limit_memory and (self.memory_limit != None):
+			preexec_fn = self.set_memory_limit
+
+		processes = []
+		error_files = []
+		try:
+			stdin = subprocess.PIPE if stream_program else subprocess.DEVNULL
+			for command in commands:
+				error_file = TemporaryFile(dir=self.temp_dir)
+				error_files.append(error_file)
+				process = subprocess.Popen(command, stdin=stdin, stdout=subprocess.PIPE, stderr=error_file, preexec_fn=preexec_fn)
+				if cancellation != None:
+					cancellation.add(process)
+				if processes != []:
+					# only the next process reads it now
+					processes[-1].stdout.close()
+				processes.append(process)
+				stdin = process.stdout
+
+			writer = None
+			if stream_program:
+				# separate thread: big programs would fill the pipe
+				# while the last process' output is not being read
+				pipe = processes[0].stdin
+				processes[0].stdin = None # written and closed by the writer only
+				writer = threading.Thread(target=self.write_program, args=(pipe, program))
+				writer.daemon = True
+				writer.start()
+
+			timed_out = False
+			stopped = False
+			if collector == None:
+				try:
+					output = processes[-1].communicate(timeout=self.time_limit)[0]
+				except subprocess.TimeoutExpired:
+					timed_out = True
+					for process in processes:
+						process.kill()
+					output = processes[-1].communicate()[0]
+			else:
+				reader = threading.Thread(target=self.read_lines, args=(processes, collector))
+				reader.daemon = True
+				reader.start()
+				reader.join(self.time_limit)
+				if reader.is_alive():
+					timed_out = True
+					for process in processes:
+						process.kill()
+					reader.join()
+				processes[-1].wait()
+				stopped = collector.stopped
+				output = collector.get_output().encode('utf-8')
+
+			deadline = None if self.time_limit == None else time.monotonic() + self.time_limit
+			for process in processes[:-1]:
+				try:
+					process.wait(timeout=None if deadline == None else max(0, deadline - time.monotonic()))
+				except subprocess.TimeoutExpired:
+					timed_out = True
+					process.kill()
+					process.wait()
+			if writer != None:
+				writer.join()
+
+			errors = []
+			for error_file in error_files:
+				error_file.seek(0)
+				errors.append(error_file.read().decode('utf-8', 'replace'))
+		finally:
+			for process in processes:
+				if process.poll() == None:
+					process.kill()
+					process.wait()
+			for error_file in error_files:
+				error_file.close()
+
+		return SolverRun(commands, output.decode('utf-8'), ''.join(errors), [p.returncode for p in processes], timed_out, stopped=stopped)
+
+
+	def read_lines(self, processes, collector):
+		# last process' output, line by line; solver stopped if collector has enough
+		for line in processes[-1].stdout:
+			if collector.add_line(line.decode('utf-8').rstrip('\n')):
+				for process in processes:
+					process.kill()
+				break
+		processes[-1].stdout.close()
+
+
+	def write_program(self, pipe, program):
+		try:
+			for string in program:
+				pipe.write(string.encode('utf-8'))
+			pipe.close()
+		# solver killed (time limit) or exited early
+		except (BrokenPipeError, ValueError):
+			pass
+
+
+	def set_memory_limit(self):
+		# runs in the child process before exec
+		resource.setrlimit(resource.RLIMIT_AS, (self.memory_limit, self.memory_limit))
+
+
+def clasp_proven(run):
+	# optimum (or unsatisfiability) proven; also for cached and collected outputs
+	if not run.ok:
+		return False
+	return (run.get_returncode() in [20, 30]) or ('OPTIMUM FOUND' in run.output) or ('UNSATISFIABLE' in run.output)
@@ -0,0 +1,60 @@
+#! /usr/bin/env python3
+# I, Robert Rozanski, the copyright holder of this work, release this work into the public domain. This applies worldwide. In some countries this may not be legally possible; if so: I grant anyone the right to use this work for any purpose, without any conditions, unless such conditions are required by law.
+
+import unittest
+import sys
+import shutil
+from tempfile import mkdtemp
+import answer_parser
+from answer_parser import AnswerCollector
+from solver_runner import SolverRunner
+
+class AnswerCollectorTest(unittest.TestCase):
+	def setUp(self):
+		self.output = 'clasp version 2.1.3\nReading from stdin\nSolving...\nAnswer: 1\nactive(r1,m0) predicts(m0,experiment(adam_two_factor_exp,g1,met1),true)\nAnswer: 2\nactive(r2,m0)\nSATISFIABLE\n'
+		self.directory = mkdtemp()
+		self.runner = SolverRunner(temp_dir=self.directory)
+
+	def tearDown(self):
+		self.runner.shutdown()
+		shutil.rmtree(self.directory)
+
+
+	def test_collector_keeps_best_answers(self):
+		collector = AnswerCollector()
+		output = ['Solving...', 'Answer: 1', 'a b', 'Optimization: 5 2', 'Answer: 2', 'c', 'Optimization: 3 4', 'Answer: 3', 'd', 'Optimization: 3 1', 'OPTIMUM FOUND', '', 'Optimization : 3 1']
+		for line in output:
+			self.assertFalse(collector.add_line(line))
+		self.assertEqual(collector.answers, [['d']])
+		self.assertEqual(collector.get_optimum(), [3, 1])
+		self.assertEqual(collector.get_output(), 'Answer: 1\nd\nOptimization: 3 1\nSolving...\nOPTIMUM FOUND\nOptimization : 3 1\n')
+
+
+	def test_collector_stops_when_enough_optimal(self):
+		collector = AnswerCollector(max_answers=2)
+		for line in ['Answer: 1', 'a', 'Optimization: 4', 'Answer: 2', 'b', 'Optimization: 2', 'Answer: 3', 'b', 'Optimization: 2', 'Answer: 4']:
+			self.assertFalse(collector.add_line(line))
+		self.assertFalse(collector.add_line('c'))
+		self.assertTrue(collector.add_line('Optimization: 2'))
+		self.assertEqual(collector.answers, [['b'], ['c']])
+		self.assertEqual(collector.get_optimum(), [2])
+		self.assertIn('OPTIMUM FOUND', collector.get_output())
+
+
+	def test_collector_no_optimization(self):
+		collector = AnswerCollector(max_answers=1)
+		for line in self.output.split('\n'):
+			collector.add_line(line)
+		self.assertEqual(answer_parser.get_answers(collector.get_output()), answer_parser.get_answers(self.output))
+		self.assertEqual(collector.get_optimum(), None)
+
+
+	def test_collector_stops_solver(self):
+		# prints optimal answers, then would run for long
+		script = 'import sys, time\nfor i in range(3): print("Answer: %s\\na%s\\nOptimization: 1" % (i, i % 2))\nsys.stdout.flush()\ntime.sleep(30)'
+		self.runner.time_limit = 10
+		run = self.runner.run([[sys.executable, '-c', script]], [], collector=AnswerCollector(max_answers=2))
+		self.assertTrue(run.stopped)
+		self.assertFalse(run.timed_out)
+		self.assertTrue(run.ok)
+		self.assertEqual(run.output, 'Answer: 1\na0\nOptimization: 1\nAnswer: 2\na1\nOptimization: 1\nOPTIMUM FOUND\nOptimization : 1\n')
@@ -0,0 +1,36 @@
+#! /usr/bin/env python3
+# I, Robert Rozanski, the copyright holder of this work, release this work into the public domain. This applies worldwide. In some countries this may not be legally possible; if so: I grant anyone the right to use this work for any purpose, without any conditions, unless such conditions are required by law.
+
+import unittest
+import answer_parser
+
+class AnswerParserTest(unittest.TestCase):
+	def setUp(self):
+		self.output = 'clasp version 2.1.3\nReading from stdin\nSolving...\nAnswer: 1\nactive(r1,m0) predicts(m0,experiment(adam_two_factor_exp,g1,met1),true)\nAnswer: 2\nactive(r2,m0)\nSATISFIABLE\n'
+
+
+	def test_get_answers(self):
+		answers = answer_parser.get_answers(self.output)
+		self.assertEqual(answers, [['active(r1,m0)', 'predicts(m0,experiment(adam_two_factor_exp,g1,met1),true)'], ['active(r2,m0)']])
+
+
+	def test_get_answer(self):
+		self.assertEqual(answer_parser.get_answer(self.output, 2), ['active(r2,m0)'])
+		self.assertEqual(answer_parser.get_answer(self.output, 3), None)
+		self.assertEqual(answer_parser.get_answer('UNSATISFIABLE\n'), None)
+
+
+	def test_get_answer_empty(self):
+		self.assertEqual(answer_parser.get_answer('Answer: 1\n\nSATISFIABLE\n'), [])
+
+
+	def test_split_atom(self):
+		self.assertEqual(answer_parser.split_atom('predicts(m0,experiment(adam_two_factor_exp,g1,met1),true)'), ('predicts', ['m0', 'experiment(adam_two_factor_exp,g1,met1)', 'true']))
+		self.assertEqual(answer_parser.split_atom('designed'), ('designed', []))
+		self.assertRaises(ValueError, answer_parser.split_atom, 'active(r1,m0')
+
+
+	def test_index_atoms(self):
+		index = answer_parser.index_atoms(answer_parser.get_answer(self.output))
+		self.assertEqual(index['active'], [['r1', 'm0']])
+		self.assertEqual(index['predicts'], [['m0', 'experiment(adam_two_factor_exp,g1,met1)', 'true']])
@@ -0,0 +1,119 @@
+#! /usr/bin/env python3
+# I, Robert Rozanski, the copyright holder of this work, release this work into the public domain. This applies worldwide. In some countries this may not be legally possible; if so: I grant anyone the right to use this work for any purpose, without any conditions, unless such conditions are required by law.
+
+import unittest
+import os
+import shutil
+import struct
+from tempfile import mkdtemp
+import archive_format
+from archive_format import NodeRef
+from archive import Archive, InitialModels, InitialResults, ChosenExperiment, NewResults, AcceptedResults, RefutedModels, RevisedModel
+from mnm_repr import Metabolite, Protein, Cytosol, Medium, PresentEntity, Reaction, Growth, Model, Add, Catalyses
+import exp_repr
+
+
+class ArchiveFormatTest(unittest.TestCase):
+	def setUp(self):
+		self.directory = mkdtemp()
+		self.path = os.path.join(self.directory, 'archive')
+		self.archive = Archive()
+		self.archive.mnm_compartments = [Cytosol(), Medium()]
+		self.archive.mnm_entities = [Metabolite('met_%s' % number) for number in range(20)] + [Protein('pro1')]
+		self.archive.mnm_activities = [Growth('growth', [PresentEntity(self.archive.mnm_entities[0], Cytosol())])]
+		for number in range(1, 20):
+			# conditions built again for each activity (as parsed from answers)
+			act = Reaction('act_%s' % number, [PresentEntity(Metabolite('met_%s' % (number - 1)), Cytosol())], [PresentEntity(Metabolite('met_%s' % number), Cytosol())])
+			act.reversibility = False
+			self.archive.mnm_activities.append(act)
+		self.archive.mnm_entities[-1].properties = frozenset([Catalyses(self.archive.mnm_activities[1])])
+		acts = self.archive.mnm_activities
+
+		exd = exp_repr.ExperimentDescription(exp_repr.DetectionEntity('met_1'), [Add(PresentEntity(Metabolite('met_0'), Medium()))])
+		self.exp0 = exp_repr.Experiment(None, [exp_repr.Result(None, exd, 'true')])
+		self.models = [Model(None, [], acts[:number], []) for number in range(10, 20)]
+		self.archive.record(InitialModels(self.models))
+		self.archive.record(InitialResults([self.exp0]))
+		self.archive.record(ChosenExperiment([exd]))
+		exp1 = exp_repr.Experiment(None, [exp_repr.Result(None, exp_repr.ExperimentDescription(exp_repr.DetectionEntity('met_2'), []), 'false')])
+		self.archive.record(NewResults(exp1))
+		self.archive.record(AcceptedResults(exp1))
+		self.archive.record(RefutedModels(self.models[:2]))
+		self.revised = Model(None, [], list(self.models[0].intermediate_activities) + [acts[19]], [])
+		self.archive.record(RevisedModel(self.models[0], [self.revised]))
+		self.revised.quality = 7
+		self.revised.update_covered_results(exp1.results)
+
+	def tearDown(self):
+		shutil.rmtree(self.directory)
+
+
+	def test_save_load(self):
+		archive_format.save(self.archive, self.path)
+		loaded = archive_format.load(self.path)
+		self.assertEqual([type(event) for event in loaded.development_history], [type(event) for event in self.archive.development_history])
+		self.assertEqual(loaded.working_models, self.archive.working_models)
+		self.assertEqual(loaded.mnm_activities, self.archive.mnm_activities)
+		self.assertEqual([act.ID for act in loaded.mnm_activities], [act.ID for act in self.archive.mnm_activities])
+		self.assertEqual(loaded.get_matching_result('res_1').outcome, 'false')
+		revised = [model for model in loaded.working_models if model.ID == self.revised.ID][0]
+		self.assertEqual(revised.quality, 7)
+		self.assertEqual([res.ID for res in revised.results_covered], ['res_1'])
+		self.assertEqual(loaded.get_model_origin_event(revised), loaded.development_history[-1])
+		# one object for each node: events and working models share models, models share activities
+		self.assertIs(loaded.development_history[-1].old_model, [model for model in loaded.development_history[0].models if model.ID == self.models[0].ID][0])
+		self.assertIn(revised, loaded.development_history[-1].revised_models)
+		act = [act for act in revised.intermediate_activities if act.ID == 'act_5'][0]
+		self.assertIs(act, [act for act in loaded.mnm_activities if act.ID == 'act_5'][0])
+		self.assertIs(list(act.changes)[0], list([act for act in loaded.mnm_activities if act.ID == 'act_6'][0].required_conditions)[0])
+		self.assertIs(list(loaded.mnm_entities[-1].properties)[0].activity, loaded.mnm_activities[1])
+
+
+	def test_smaller_than_pickle(self):
+		archive_format.save(self.archive, self.path)
+		archive_format.save_pickle(self.archive, self.path + '_pickle')
+		self.assertTrue(os.path.getsize(self.path) < os.path.getsize(self.path + '_pickle'))
+
+
+	def test_read_timeline(self):
+		archive_format.save(self.archive, self.path)
+		timeline = archive_format.read_timeline(self.path)
+		self.assertEqual([type(event) for event in timeline], [type(event) for event in self.archive.development_history])
+		self.assertEqual([event.timestamp for event in timeline], [event.timestamp for event in self.archive.development_history])
+		refuted = timeline[5].refuted_models
+		self.assertEqual(len(refuted), 2)
+		for ref in refuted:
+			self.assertIsInstance(ref, NodeRef)
+			self.assertEqual(ref.section, 'models')
+			self.assertIn(ref, timeline[0].models)
+
+
+	def test_pickled_archives(self):
+		archive_format.save_pickle(self.archive, self.path)
+		self.assertFalse(archive_format.is_compact(self.path))
+		loaded = archive_format.load(self.path)
+		self.assertEqual(loaded.working_models, self.archive.working_models)
+		self.assertEqual(len(archive_format.read_timeline(self.path)), len(self.archive.development_history))
+		archive_format.convert(self.path, self.path + '_compact')
+		self.assertTrue(archive_format.is_compact(self.path + '_compact'))
+		self.assertEqual(archive_format.load(self.path + '_compact').working_models, self.archive.working_models)
+
+
+	def test_version(self):
+		archive_format.save(self.archive, self.path)
+		with open(self.path, 'r+b') as f:
+			f.seek(len(archive_format.MAGIC))
+			f.write(struct.pack('>H', archive_format.FORMAT_VERSION + 1))
+		self.assertRaises(ValueError, archive_format.load, self.path)
+
+
+	def test_shipped_archive(self):
+		# pickled before slots (activities with a stale 'reversible' attribute)
+		path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'pickled_archives', 'archive_2015_11_9_20_52_6_conf02_tc01_r0')
+		loaded = archive_format.load(path)
+		self.assertEqual(len(loaded.development_history), 179)
+		self.assertEqual(len(archive_format.read_timeline(path)), 179)
+		act = loaded.mnm_activities[0]
+		self.assertFalse(hasattr(act, 'reversible'))
+		archive_format.save(loaded, self.path)
+		self.assertEqual(len(archive_format.load(self.path).development_history), 179)
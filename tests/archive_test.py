@@ -6,6 +6,7 @@ from archive import Archive
 import archive
 import exp_repr
 import mnm_repr
+import pickle
 
 class ArchiveTest(unittest.TestCase):
 	def setUp(self):
@@ -107,3 +108,54 @@ class ArchiveTest(unittest.TestCase):
 		res = self.archive.get_results_after_model(mod1)
 		self.assertIn('res1', res)
 		self.assertIn('res2', res)
+
+	def test_indexes_kept_by_record(self):
+		mod1 = mnm_repr.Model('m', [], [], [])
+		mod2 = mnm_repr.Model('m', [mnm_repr.PresentEntity(mnm_repr.Metabolite('met1'), mnm_repr.Cytosol())], [], [])
+		initial = archive.InitialModels([mod1])
+		self.archive.record(initial)
+		exp1 = exp_repr.Experiment('exp1', [exp_repr.Result('r', None, 'true')])
+		new_results = archive.NewResults(exp1)
+		self.archive.record(new_results)
+		additional = archive.AdditionalModels([mod2])
+		self.archive.record(additional)
+		self.assertIs(self.archive.get_model_origin_event(mod1), initial)
+		self.assertIs(self.archive.get_model_origin_event(mod2), additional)
+		self.assertEqual(self.archive.get_events_after_event(initial), [new_results, additional])
+		# pickled archive: indexes built again
+		copied = pickle.loads(pickle.dumps(self.archive))
+		self.assertEqual(len(copied.get_events_after_event(copied.development_history[0])), 2)
+
+	def test_get_matching_element(self):
+		met1 = mnm_repr.Metabolite('met1')
+		met1_v = mnm_repr.Metabolite('met1', version='v1')
+		r1 = mnm_repr.Reaction('r1', [], [])
+		t1 = mnm_repr.Transport('t1', [], [])
+		self.archive.mnm_entities = [met1, met1_v]
+		self.archive.mnm_activities = [r1]
+		self.archive.mnm_compartments = [mnm_repr.Cytosol()]
+		self.archive.import_activities = [t1]
+		self.assertIs(self.archive.get_matching_element('met1', 'v1'), met1_v)
+		self.assertIs(self.archive.get_matching_element('met1', 'none'), met1)
+		self.assertIs(self.archive.get_matching_element('r1', 'v1'), r1)
+		self.assertEqual(self.archive.get_matching_element('c_05'), mnm_repr.Cytosol())
+		self.assertIs(self.archive.get_matching_element('t1'), t1)
+		self.assertRaises(ValueError, self.archive.get_matching_element, 'met1')
+		# new IDs and new elements found
+		r1.ID = 'act_0'
+		r2 = mnm_repr.Reaction('r2', [], [])
+		self.archive.mnm_activities.append(r2)
+		self.assertIs(self.archive.get_matching_element('act_0'), r1)
+		self.assertIs(self.archive.get_matching_element('r2'), r2)
+		self.assertRaises(ValueError, self.archive.get_matching_element, 'r1')
+
+	def test_get_matching_result(self):
+		res1 = exp_repr.Result('res_0', None, 'true')
+		res2 = exp_repr.Result('res_1', None, 'false')
+		self.archive.known_results = [exp_repr.Experiment('exp_0', [res1])]
+		self.assertIs(self.archive.get_matching_result('res_0'), res1)
+		self.assertRaises(ValueError, self.archive.get_matching_result, 'res_1')
+		self.archive.record(archive.AcceptedResults(exp_repr.Experiment('exp_1', [res2])))
+		self.assertIs(self.archive.get_matching_result('res_1'), res2)
+		self.archive.known_results = []
+		self.assertRaises(ValueError, self.archive.get_matching_result, 'res_0')
@@ -0,0 +1,96 @@
+#! /usr/bin/env python3
+# I, Robert Rozanski, the copyright holder of this work, release this work into the public domain. This applies worldwide. In some countries this may not be legally possible; if so: I grant anyone the right to use this work for any purpose, without any conditions, unless such conditions are required by law.
+
+import unittest
+import pickle
+import bitset_repr
+from bitset_repr import ActivityIndex, BitsetModel
+from archive import Archive
+from mnm_repr import Metabolite, Cytosol, Medium, PresentEntity, Reaction, Transport, Model, Add, Remove
+
+
+class BitsetReprTest(unittest.TestCase):
+	def setUp(self):
+		self.mets = [Metabolite('met%s' % number) for number in range(6)]
+		self.acts = [Reaction('r%s' % number, [PresentEntity(self.mets[number], Cytosol())], [PresentEntity(self.mets[number + 1], Cytosol())]) for number in range(5)]
+		self.t1 = Transport('t1', [PresentEntity(self.mets[0], Medium())], [PresentEntity(self.mets[0], Cytosol())])
+		self.archive = Archive()
+		self.archive.mnm_activities = list(self.acts)
+		self.archive.import_activities = [self.t1]
+		self.index = self.archive.get_activity_index()
+		self.cond = PresentEntity(self.mets[0], Medium())
+		self.mod1 = Model('m0', [self.cond], self.acts[:3], [])
+		self.mod2 = Model('m1', [self.cond], self.acts[2:], [])
+
+
+	def test_index(self):
+		self.assertEqual(len(self.index), 6)
+		self.assertEqual(self.index.get_number(self.acts[3]), 3)
+		self.assertEqual(self.index.get_number(self.t1), 5)
+		self.assertIs(self.archive.get_activity_index(), self.index)
+		# activity not in the network: next number, others kept
+		act = Reaction('r9', [PresentEntity(self.mets[5], Cytosol())], [])
+		self.assertEqual(self.index.get_number(act), 6)
+		self.assertEqual(self.index.get_bits([self.acts[0], act]), 0b1000001)
+		# equal activity built again: same number
+		self.assertEqual(self.index.get_number(Reaction('r0', [PresentEntity(self.mets[0], Cytosol())], [PresentEntity(self.mets[1], Cytosol())])), 0)
+		# IDs changed: numbers kept
+		self.mets[0].ID = 'met_renamed'
+		self.assertEqual(self.index.get_number(self.acts[0]), 0)
+		self.assertEqual([act.ID for act in pickle.loads(pickle.dumps(self.index)).get_activities(0b101)], ['r0', 'r2'])
+
+
+	def test_conversion(self):
+		bitset = bitset_repr.from_model(self.mod1, self.index)
+		self.assertEqual(bitset.bits, 0b111)
+		self.assertEqual(len(bitset), 3)
+		self.assertIn(self.acts[1], bitset)
+		self.assertNotIn(self.acts[4], bitset)
+		model = bitset_repr.to_model(bitset)
+		self.assertEqual(model, self.mod1)
+		self.assertEqual(model.ID, 'm0')
+		self.assertEqual(bitset_repr.from_vector(self.index, bitset.to_vector(), [self.cond]), bitset)
+		module_numpy = bitset_repr.numpy
+		bitset_repr.numpy = None
+		try:
+			self.assertEqual(bitset.to_vector(), [True, True, True, False, False, False])
+		finally:
+			bitset_repr.numpy = module_numpy
+
+
+	def test_set_algebra(self):
+		bits1 = bitset_repr.from_model(self.mod1, self.index)
+		bits2 = bitset_repr.from_model(self.mod2, self.index)
+		for (operation, expected) in [('union', self.mod1.intermediate_activities | self.mod2.intermediate_activities),
+				('intersection', self.mod1.intermediate_activities & self.mod2.intermediate_activities),
+				('difference', self.mod1.intermediate_activities - self.mod2.intermediate_activities),
+				('symmetric_difference', self.mod1.intermediate_activities ^ self.mod2.intermediate_activities)]:
+			self.assertEqual(frozenset(getattr(bits1, operation)(bits2).get_activities()), expected)
+		self.assertEqual(bits1.distance(bits2), 4)
+		self.assertEqual(bits1.similarity(bits2), 1/5)
+		self.assertEqual(bits1.similarity(bits1), 1.0)
+		self.assertEqual(BitsetModel(self.index, 0).similarity(BitsetModel(self.index, 0)), 1.0)
+		self.assertEqual(len(set([bits1, bitset_repr.from_model(Model('other', [self.cond], self.acts[:3], []), self.index)])), 1)
+		self.assertRaises(ValueError, bits1.union, BitsetModel(ActivityIndex(), 0))
+
+
+	def test_similarity_matrix(self):
+		models = [bitset_repr.from_model(model, self.index) for model in [self.mod1, self.mod2, Model('m2', [], [], [])]]
+		expected = [[1.0, 0.2, 0.0], [0.2, 1.0, 0.0], [0.0, 0.0, 1.0]]
+		self.assertEqual(bitset_repr.similarity_matrix(models), expected)
+		module_numpy = bitset_repr.numpy
+		bitset_repr.numpy = None
+		try:
+			self.assertEqual(bitset_repr.similarity_matrix(models), expected)
+		finally:
+			bitset_repr.numpy = module_numpy
+
+
+	def test_apply_interventions(self):
+		interventions = [Add(self.acts[4]), Remove(self.acts[0]), Remove(self.cond), Add(PresentEntity(self.mets[1], Medium()))]
+		bitset = bitset_repr.from_model(self.mod1, self.index)
+		bitset.apply_interventions(interventions)
+		self.mod1.apply_interventions(interventions)
+		self.assertEqual(bitset_repr.to_model(bitset), self.mod1)
+		self.assertRaises(KeyError, bitset.apply_intervention, Remove(self.acts[0]))
+		self.assertRaises(TypeError, bitset.apply_intervention, 'fake intervention')
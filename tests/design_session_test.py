@@ -0,0 +1,131 @@
+#! /usr/bin/env python3
+# I, Robert Rozanski, the copyright holder of this work, release this work into the public domain. This applies worldwide. In some countries this may not be legally possible; if so: I grant anyone the right to use this work for any purpose, without any conditions, unless such conditions are required by law.
+
+import unittest
+from design_session import DesignSession
+from experiment_module import ExperimentModule
+from solver_runner import SolverRun
+from archive import Archive, AllModelsEmpiricallyEquivalent
+from exp_cost_model import CostModel
+import mnm_repr
+import exp_repr
+from tests.temp_rules import TempRulesTest
+
+
+class CountingSession(DesignSession):
+	def __init__(self, *args, **kwargs):
+		DesignSession.__init__(self, *args, **kwargs)
+		self.static_writes = 0
+
+	def write_static(self):
+		self.static_writes += 1
+		DesignSession.write_static(self)
+
+
+class RecordingRunner:
+	# stands in for SolverRunner: records programs, solver not called
+	def __init__(self, output):
+		self.output = output
+		self.calls = []
+
+	def gringo_clasp(self, program, files=[], clasp_options=['-n', '0'], gringo='gringo', clasp='clasp', collector=None):
+		self.calls.append((program, files))
+		return SolverRun([], self.output)
+
+
+class DesignSessionTest(TempRulesTest):
+	def setUp(self):
+		TempRulesTest.setUp(self)
+		self.met1 = mnm_repr.Metabolite('met1')
+		self.met2 = mnm_repr.Metabolite('met2')
+		self.cytosol = mnm_repr.Cytosol()
+		self.cond1 = mnm_repr.PresentEntity(self.met1, self.cytosol)
+		self.cond2 = mnm_repr.PresentEntity(self.met2, self.cytosol)
+		self.r1 = mnm_repr.Reaction('r1', [self.cond1], [self.cond2])
+		self.r1.reversibility = False
+		self.mod1 = mnm_repr.Model('m0', [self.cond1], [self.r1], [])
+		self.mod2 = mnm_repr.Model('m1', [self.cond1], [], [])
+
+		self.cost_model = CostModel([self.met1, self.met2], [self.cytosol], [self.r1], [self.cond1])
+		self.cost_model.set_all_basic_costs_to_1()
+		self.cost_model.calculate_derived_costs([self.r1])
+		self.cost_model.remove_None_valued_elements()
+
+		self.arch = Archive()
+		self.arch.working_models = [self.mod1, self.mod2]
+		self.arch.mnm_compartments = [self.cytosol]
+		self.arch.mnm_entities = [self.met1, self.met2]
+		self.arch.mnm_activities = [self.r1]
+		self.session = CountingSession(self.arch, self.cost_model, True, self.directory, 'test')
+
+
+	def new_experiment(self, ent_ID, interventions=[]):
+		exd = exp_repr.ExperimentDescription(exp_repr.DetectionEntity(ent_ID), interventions)
+		return exp_repr.Experiment(None, [exp_repr.Result(None, exd, 'true')])
+
+
+	def read_program(self, files, cycle_input):
+		text = ''
+		for path in files:
+			with open(path, 'r') as f:
+				text += f.read()
+		return text + ''.join(cycle_input)
+
+
+	def test_same_program_as_full_export(self):
+		self.arch.known_results = [self.new_experiment('met1'), self.new_experiment('met2', [mnm_repr.Add(self.cond2)])]
+		exp_module = ExperimentModule(self.arch, self.cost_model, True, directory=self.directory)
+		full = ''.join(exp_module.prepare_input_for_exp_design())
+		session = self.read_program(self.session.get_files(), self.session.get_cycle_input(exp_module.calculate_constant_for_scores()))
+		self.assertEqual(sorted(full.split('\n')), sorted(session.split('\n')))
+
+
+	def test_static_written_once_bans_appended(self):
+		self.session.get_files()
+		self.arch.known_results.append(self.new_experiment('met1'))
+		self.session.get_files()
+		self.arch.known_results.append(self.new_experiment('met2'))
+		self.arch.working_models = [self.mod1]
+		(static_file, bans_file) = self.session.get_files()
+		self.assertEqual(self.session.static_writes, 1)
+		with open(bans_file, 'r') as f:
+			bans = f.read()
+		self.assertEqual(bans, '\n:- designed(experiment(detection_entity_exp, met1)).\n:- designed(experiment(detection_entity_exp, met2)).')
+		cycle_input = ''.join(self.session.get_cycle_input(5))
+		self.assertNotIn('m1', cycle_input)
+		self.assertNotIn('cost(', cycle_input)
+
+
+	def test_bans_written_again_if_results_replaced(self):
+		self.arch.known_results = [self.new_experiment('met1')]
+		self.session.get_files()
+		self.arch.known_results = [self.new_experiment('met2')]
+		(static_file, bans_file) = self.session.get_files()
+		with open(bans_file, 'r') as f:
+			bans = f.read()
+		self.assertEqual(bans, '\n:- designed(experiment(detection_entity_exp, met2)).')
+
+
+	def test_static_written_again_if_network_changes(self):
+		self.session.get_files()
+		self.arch.mnm_entities.append(mnm_repr.Metabolite('met3'))
+		self.session.get_files()
+		self.assertEqual(self.session.static_writes, 2)
+
+
+	def test_design_experiments_with_session(self):
+		exp_module = ExperimentModule(self.arch, self.cost_model, False, sfx='test', directory=self.directory)
+		exp_module.session = self.session
+		exp_module.design_mode = 'asp'
+		exp_module.runner = RecordingRunner('UNSATISFIABLE\n')
+		for cycle in range(2):
+			self.assertIsInstance(exp_module.design_experiments(), AllModelsEmpiricallyEquivalent)
+		self.assertEqual(len(exp_module.runner.calls), 2)
+		(program, files) = exp_module.runner.calls[1]
+		self.assertIn(self.session.static_file, files)
+		self.assertIn(self.session.bans_file, files)
+		self.assertNotIn('metabolite(met1,none)', ''.join(program))
+		# use_costs switched off before the first cycle: static part without costs
+		self.assertEqual(self.session.static_writes, 1)
+		with open(self.session.static_file, 'r') as f:
+			self.assertNotIn('cost(', f.read())
@@ -8,10 +8,12 @@ import exp_repr
 from archive import Archive
 from exp_cost_model import CostModel
 from exp_repr import DetectionEntity, LocalisationEntity, DetectionActivity, AdamTwoFactorExperiment, ReconstructionActivity, ReconstructionEnzReaction, ReconstructionTransporterRequired, ExperimentDescription
+from tests.temp_rules import TempRulesTest
 
 
-class ExperimentModuleTest(unittest.TestCase):
+class ExperimentModuleTest(TempRulesTest):
 	def setUp(self):
+		TempRulesTest.setUp(self)
 		# models:
 		self.g1 = Gene('g1')
 		self.p1 = Protein('p1')
@@ -60,7 +62,7 @@ class ExperimentModuleTest(unittest.TestCase):
 		self.arch.mnm_activities = self.activities
 
 		# exp module
-		self.exp_module = ExperimentModule(self.arch, self.cost_model, False)
+		self.exp_module = ExperimentModule(self.arch, self.cost_model, False, directory=self.directory)
 
 
 	def test_calculate_constant_for_scores(self):
@@ -68,6 +70,7 @@ class ExperimentModuleTest(unittest.TestCase):
 
 
 	def test_design_experiments_nocost(self): # cost=False
+		self.exp_module.design_mode = 'asp'
 		exps = self.exp_module.design_experiments()
 		self.assertEqual(exps[0].experiment_type.activity_id, 'growth')
 		self.assertIsInstance(exps[0].experiment_type, DetectionActivity)
@@ -76,11 +79,27 @@ class ExperimentModuleTest(unittest.TestCase):
 
 	def test_design_experiments_cost(self): # cost=True
 		self.exp_module.use_costs = True
+		self.exp_module.design_mode = 'asp'
 		exps = self.exp_module.design_experiments()
 		self.assertEqual(exps[0].experiment_type.activity_id, 'growth')
 		self.assertIsInstance(exps[0].experiment_type, DetectionActivity)
 		self.assertEqual(exps[0].interventions, frozenset([]))
 
+
+	def test_design_experiments_native(self):
+		self.exp_module.design_mode = 'native'
+		exps = self.exp_module.design_experiments()
+		self.assertEqual(len(exps), 2)
+		self.assertIn(ExperimentDescription(DetectionActivity('growth'), []), exps)
+		self.assertIn(ExperimentDescription(DetectionEntity('met2'), []), exps)
+
+
+	def test_process_answer(self):
+		components = ['design_type(localisation_entity_exp)', 'design_entity_loc(met1)', 'design_compartment(c_05)', 'add(setup_present(met2,none,c_05))']
+		exd = self.exp_module.process_answer(components)
+		self.assertEqual(exd, ExperimentDescription(LocalisationEntity('met1', 'c_05'), [Add(self.cond2)]))
+		self.assertEqual(components, [])
+
 #
 # processing output:
 #
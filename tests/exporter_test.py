@@ -2,6 +2,8 @@
 # I, Robert Rozanski, the copyright holder of this work, release this work into the public domain. This applies worldwide. In some countries this may not be legally possible; if so: I grant anyone the right to use this work for any purpose, without any conditions, unless such conditions are required by law.
 
 import unittest
+import io
+import pickle
 import exporter
 import mnm_repr
 import exp_repr
@@ -30,6 +32,28 @@ class ExporterTest(unittest.TestCase):
 		self.assertEqual("\ncomplex(e4,none).", exported[2])
 		self.assertEqual("\ntransports(e4,none,a2).", exported[3])
 
+	def test_write_activities_into_file(self):
+		# streaming version writes the same text the list version returns
+		met1 = mnm_repr.Metabolite('m1')
+		met2 = mnm_repr.Metabolite('m2')
+		comp = mnm_repr.Medium()
+		act = mnm_repr.Reaction('r1', [mnm_repr.PresentEntity(met1, comp)], [mnm_repr.PresentEntity(met2, comp)])
+		act.reversibility = True
+		sink = io.StringIO()
+		exporter.write_activities(sink, [act])
+		self.assertEqual(sink.getvalue(), ''.join(exporter.export_activities([act])))
+		self.assertIn('\nproduct(m1,none,c_01,r1_rev).', sink.getvalue())
+
+	def test_cached_facts_follow_id_change(self):
+		ent = mnm_repr.Protein('e1', 'none', 'none', [mnm_repr.Catalyses(mnm_repr.Activity('a1', None, [], []))])
+		self.assertEqual(exporter.export_entities([ent]), ["\nprotein(e1,none).", "\ncatalyses(e1,none,a1)."])
+		# reassigning IDs (as evaluator does) invalidates cached facts
+		list(ent.properties)[0].activity.ID = 'a2'
+		ent.ID = 'e2'
+		self.assertEqual(exporter.export_entities([ent]), ["\nprotein(e2,none).", "\ncatalyses(e2,none,a2)."])
+		# not pickled
+		self.assertFalse(hasattr(pickle.loads(pickle.dumps(ent)), '_facts'))
+
 	def test_export_compartments(self):
 		# a couple of compartments
 		c1 = mnm_repr.Medium()
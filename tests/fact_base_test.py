@@ -0,0 +1,67 @@
+#! /usr/bin/env python3
+# I, Robert Rozanski, the copyright holder of this work, release this work into the public domain. This applies worldwide. In some countries this may not be legally possible; if so: I grant anyone the right to use this work for any purpose, without any conditions, unless such conditions are required by law.
+
+import unittest
+import shutil
+from tempfile import mkdtemp
+from fact_base import FactBase
+from archive import Archive, AcceptedResults, NewResults
+import mnm_repr
+import exp_repr
+
+class FactBaseTest(unittest.TestCase):
+	def setUp(self):
+		self.directory = mkdtemp()
+		self.archive = Archive()
+		self.met1 = mnm_repr.Metabolite('met1')
+		self.met2 = mnm_repr.Metabolite('met2')
+		self.comp = mnm_repr.Medium()
+		self.r1 = mnm_repr.Reaction('r1', [mnm_repr.PresentEntity(self.met1, self.comp)], [mnm_repr.PresentEntity(self.met2, self.comp)])
+		self.r1.reversibility = False
+		self.archive.mnm_entities = [self.met1, self.met2]
+		self.archive.mnm_compartments = [self.comp]
+		self.archive.mnm_activities = [self.r1]
+		self.archive.fact_base = FactBase(self.archive, self.directory, 'test')
+
+	def tearDown(self):
+		shutil.rmtree(self.directory)
+
+
+	def test_network_written_once(self):
+		path = self.archive.fact_base.get_network_file()
+		self.archive.mnm_entities.append(mnm_repr.Metabolite('met3'))
+		self.archive.fact_base.get_network_file()
+		with open(path, 'r') as f:
+			content = f.read()
+		self.assertIn('\nmetabolite(met1,none).', content)
+		self.assertIn('\nreaction(r1).', content)
+		self.assertNotIn('met3', content)
+
+
+	def test_results_appended_on_record(self):
+		exd1 = exp_repr.ExperimentDescription(exp_repr.DetectionEntity('met1'), [])
+		exd2 = exp_repr.ExperimentDescription(exp_repr.DetectionEntity('met2'), [])
+		exp1 = exp_repr.Experiment(None, [exp_repr.Result(None, exd1, 'true')])
+		exp2 = exp_repr.Experiment(None, [exp_repr.Result(None, exd2, 'false')])
+		for exp in [exp1, exp2]:
+			self.archive.record(NewResults(exp))
+			self.archive.record(AcceptedResults(exp))
+		with open(self.archive.fact_base.get_results_file(), 'r') as f:
+			content = f.read()
+		self.assertEqual(content, '\nresult(res_0, experiment(detection_entity_exp, met1), true).\nresult(res_1, experiment(detection_entity_exp, met2), false).')
+		self.assertEqual(self.archive.fact_base.number_of_results, 2)
+
+
+	def test_results_kept_on_resume(self):
+		exp = exp_repr.Experiment(None, [exp_repr.Result(None, exp_repr.ExperimentDescription(exp_repr.DetectionEntity('met1'), []), 'true')])
+		self.archive.record(NewResults(exp))
+		self.archive.record(AcceptedResults(exp))
+		resumed = FactBase(self.archive, self.directory, 'test', resume=True)
+		self.assertEqual(resumed.number_of_results, 1)
+		resumed.sync_results(list(exp.results))
+		with open(resumed.get_results_file(), 'r') as f:
+			self.assertEqual(f.read().count('res_0'), 1)
+		# other results (restored archive behind the file): written again
+		resumed.sync_results([])
+		self.assertEqual(resumed.number_of_results, 0)
+		self.assertEqual(FactBase(self.archive, self.directory, 'test').number_of_results, 0)
@@ -0,0 +1,145 @@
+#! /usr/bin/env python3
+# I, Robert Rozanski, the copyright holder of this work, release this work into the public domain. This applies worldwide. In some countries this may not be legally possible; if so: I grant anyone the right to use this work for any purpose, without any conditions, unless such conditions are required by law.
+
+import unittest
+import os
+import shutil
+from tempfile import mkdtemp
+from journal import Journal
+from overseer import Overseer
+from fact_base import FactBase
+from archive import Archive, InitialModels, NewResults, AcceptedResults, RefutedModels, CheckPointSuccess
+from mnm_repr import Metabolite, Medium, PresentEntity, Growth, Model
+import exp_repr
+
+
+class JournalTest(unittest.TestCase):
+	def setUp(self):
+		self.directory = mkdtemp()
+		self.met1 = Metabolite('met1')
+		self.cond = PresentEntity(self.met1, Medium())
+		self.growth = Growth('growth', [self.cond])
+		self.exd = exp_repr.ExperimentDescription(exp_repr.DetectionEntity('met1'), [])
+
+	def tearDown(self):
+		shutil.rmtree(self.directory)
+
+
+	def new_run(self, snapshot_every=50, resume=False):
+		# archive and overseer as after a (re)start of the program; transitions record events
+		archive = Archive()
+		archive.mnm_entities = [self.met1]
+		archive.fact_base = FactBase(archive, self.directory, 'test', resume)
+		models = [Model('m0', [], [self.growth], []), Model('m1', [self.cond], [self.growth], [])]
+		if not resume:
+			archive.record(InitialModels(models))
+		overseer = Overseer(archive, 'ignoring', 2, 10, 4, 'test')
+		overseer.transition_table = [
+			{'name':'start_development', 'src':'start', 'dst':'result_recorded', 'method':self.add_result},
+			{'name':'refute', 'src':'result_recorded', 'dst':'checkpoint', 'method':self.refute},
+			{'name':'do_check', 'src':'checkpoint', 'dst':'result_recorded', 'method':self.check}]
+		self.archive = archive
+		self.overseer = overseer
+		overseer.attach_journal(Journal(self.directory, 'test', snapshot_every), resume)
+		return overseer
+
+
+	def add_result(self):
+		exp = exp_repr.Experiment(None, [exp_repr.Result(None, self.exd, 'true')])
+		self.archive.record(NewResults(exp))
+		self.archive.record(AcceptedResults(exp))
+
+	def refute(self):
+		models = sorted(self.archive.working_models, key=lambda m: m.ID)
+		# quality changed outside events
+		models[-1].quality = 5
+		self.archive.record(RefutedModels(models[:1]))
+
+	def check(self):
+		self.overseer.cycles_counter += 1
+		self.archive.record(CheckPointSuccess())
+
+
+	def test_resume(self):
+		overseer = self.new_run()
+		for name in ['start_development', 'refute', 'do_check']:
+			overseer.do_transition(name)
+		history = [type(event) for event in overseer.archive.development_history]
+		models = set(overseer.archive.working_models)
+		# crash: new archive, overseer and modules
+		resumed = self.new_run(resume=True)
+		self.assertEqual(resumed.current_state, 'result_recorded')
+		self.assertEqual(resumed.cycles_counter, 1)
+		self.assertEqual([type(event) for event in resumed.archive.development_history], history)
+		self.assertEqual(resumed.archive.working_models, models)
+		self.assertEqual([exp.ID for exp in resumed.archive.known_results], ['exp_0'])
+		self.assertEqual(resumed.archive.get_matching_result('res_0').outcome, 'true')
+		self.assertEqual(resumed.archive.get_model_origin_event(list(models)[0]), resumed.archive.development_history[0])
+		# fact base: each result once
+		with open(resumed.archive.fact_base.get_results_file(), 'r') as f:
+			self.assertEqual(f.read().count('res_0'), 1)
+		# run continues: IDs of the original run
+		resumed.do_transition('refute')
+		self.assertEqual(resumed.archive.working_models, set([]))
+		self.assertIs(resumed.archive.journal, resumed.journal)
+
+
+	def test_unfinished_transition_dropped(self):
+		overseer = self.new_run()
+		overseer.do_transition('start_development')
+		# crash during a transition: its events recorded, state not; last entry incomplete
+		self.refute()
+		with open(overseer.journal.journal_file, 'ab') as f:
+			f.write(b'\x00\x00\x00\x00\x00\x00\x01\x00incomplete')
+		resumed = self.new_run(resume=True)
+		self.assertEqual(resumed.current_state, 'result_recorded')
+		self.assertEqual(len(resumed.archive.working_models), 2)
+		self.assertNotIn(RefutedModels, [type(event) for event in resumed.archive.development_history])
+		# journal continues after the restored part
+		resumed.do_transition('refute')
+		resumed = self.new_run(resume=True)
+		self.assertEqual(resumed.current_state, 'checkpoint')
+		self.assertEqual(len(resumed.archive.working_models), 1)
+		self.assertEqual(list(resumed.archive.working_models)[0].quality, 5)
+
+
+	def test_snapshots(self):
+		overseer = self.new_run(snapshot_every=2)
+		overseer.do_transition('start_development')
+		overseer.do_transition('refute')
+		# second transition: snapshot written, journal empty
+		self.assertEqual(os.path.getsize(overseer.journal.journal_file), 0)
+		overseer.do_transition('do_check')
+		self.assertTrue(os.path.getsize(overseer.journal.journal_file) > 0)
+		resumed = self.new_run(snapshot_every=2, resume=True)
+		self.assertEqual(resumed.current_state, 'result_recorded')
+		self.assertEqual(len(resumed.archive.development_history), 5)
+		self.assertEqual(len(resumed.archive.working_models), 1)
+		self.assertEqual(list(resumed.archive.working_models)[0].quality, 5)
+
+
+	def test_new_run_discards_journal(self):
+		overseer = self.new_run()
+		overseer.do_transition('start_development')
+		restarted = self.new_run()
+		self.assertEqual(restarted.current_state, 'start')
+		restarted = self.new_run(resume=True)
+		self.assertEqual(restarted.current_state, 'start')
+		self.assertEqual(len(restarted.archive.development_history), 1)
+
+
+	def test_synced_once_per_transition(self):
+		overseer = self.new_run()
+		# two events and the state: one sync
+		overseer.do_transition('start_development')
+		self.assertEqual(overseer.journal.syncs, 1)
+		overseer.journal.sync_every = 2
+		overseer.do_transition('refute')
+		self.assertEqual(overseer.journal.syncs, 1)
+		overseer.do_transition('do_check')
+		self.assertEqual(overseer.journal.syncs, 2)
+		overseer.journal.sync_every = None
+		overseer.do_transition('refute')
+		self.assertEqual(overseer.journal.syncs, 2)
+		# flushed: read back without syncing
+		self.assertEqual(self.new_run(resume=True).current_state, 'checkpoint')
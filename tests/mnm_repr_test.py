@@ -4,6 +4,7 @@
 import unittest
 import mnm_repr
 from copy import copy
+import pickle
 
 class ModelTest(unittest.TestCase):
 	def setUp(self):
@@ -114,3 +115,50 @@ class ModelTest(unittest.TestCase):
 		copied_model = copy(model)
 		self.assertEqual(model, copied_model)
 		self.assertIsNot(model, copied_model)
+
+
+	def test_value_objects_shared(self):
+		met = mnm_repr.Metabolite('met1')
+		self.assertIs(mnm_repr.Medium(), mnm_repr.Medium())
+		self.assertIs(mnm_repr.PresentEntity(met, mnm_repr.Medium()), mnm_repr.PresentEntity(met, mnm_repr.Medium()))
+		self.assertIs(mnm_repr.Add(self.act1), mnm_repr.Add(self.act1))
+		self.assertIsNot(mnm_repr.Add(self.act1), mnm_repr.Remove(self.act1))
+		# equal, not the same entity: not shared
+		self.assertIsNot(mnm_repr.PresentEntity(met, mnm_repr.Medium()), mnm_repr.PresentEntity(mnm_repr.Metabolite('met1'), mnm_repr.Medium()))
+		self.assertEqual(mnm_repr.PresentEntity(met, mnm_repr.Medium()), mnm_repr.PresentEntity(mnm_repr.Metabolite('met1'), mnm_repr.Medium()))
+		self.assertRaises(TypeError, setattr, self.con1, 'entity', 'ent2')
+		self.assertRaises(TypeError, setattr, mnm_repr.Medium(), 'ID', 'c_02')
+		self.assertRaises(TypeError, mnm_repr.PresentEntity, met)
+		self.assertFalse(hasattr(met, '__dict__'))
+
+
+	def test_cached_hash_follows_id_change(self):
+		generation = mnm_repr.generation
+		met = mnm_repr.Metabolite('met1')
+		cond = mnm_repr.PresentEntity(met, mnm_repr.Cytosol())
+		act = mnm_repr.Reaction('r1', [cond], [])
+		# new elements: cached hashes of others still valid
+		self.assertEqual(mnm_repr.generation, generation)
+		hashes = (hash(met), hash(cond), hash(act))
+		met.ID = 'met2'
+		self.assertEqual(mnm_repr.generation, generation + 1)
+		self.assertNotEqual((hash(met), hash(cond), hash(act)), hashes)
+		self.assertEqual(hash(cond), hash((mnm_repr.Metabolite('met2'), mnm_repr.Cytosol())))
+
+
+	def test_pickle(self):
+		met = mnm_repr.Metabolite('met1')
+		cond = mnm_repr.PresentEntity(met, mnm_repr.Cytosol())
+		act = mnm_repr.Reaction('r1', [cond], [])
+		act.reversibility = False
+		(met_, cond_, act_) = pickle.loads(pickle.dumps((met, cond, act)))
+		self.assertIs(cond_, mnm_repr.PresentEntity(met_, mnm_repr.Cytosol()))
+		self.assertIs(cond_.compartment, mnm_repr.Cytosol())
+		self.assertEqual((act_.ID, act_.reversibility, act_.required_conditions), ('r1', False, frozenset([cond])))
+		# state pickled with __dict__ (archives pickled before slots)
+		old = mnm_repr.PresentEntity.__new__(mnm_repr.PresentEntity)
+		old.__setstate__({'entity': met, 'compartment': mnm_repr.Cytosol()})
+		self.assertEqual(old, cond)
+		old = mnm_repr.Metabolite.__new__(mnm_repr.Metabolite)
+		old.__setstate__({'ID': 'met1', 'name': None, 'version': 'none', 'properties': frozenset([]), 'add_cost': 1})
+		self.assertEqual(old, met)
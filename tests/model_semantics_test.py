@@ -0,0 +1,264 @@
+#! /usr/bin/env python3
+# I, Robert Rozanski, the copyright holder of this work, release this work into the public domain. This applies worldwide. In some countries this may not be legally possible; if so: I grant anyone the right to use this work for any purpose, without any conditions, unless such conditions are required by law.
+
+import unittest
+import random
+import shutil
+import re
+import exporter
+import mnm_repr
+import exp_repr
+import model_semantics
+from model_semantics import NetworkSemantics, ModelSemantics
+from solver_runner import SolverRunner
+
+class ModelSemanticsTest(unittest.TestCase):
+	def setUp(self):
+		self.c1 = mnm_repr.Medium()
+		self.c2 = mnm_repr.Cytosol()
+		self.m1 = mnm_repr.Metabolite('m1')
+		self.m2 = mnm_repr.Metabolite('m2')
+		self.m3 = mnm_repr.Metabolite('m3')
+
+
+	def present(self, ent, comp=None):
+		if comp == None:
+			comp = self.c1
+		return mnm_repr.PresentEntity(ent, comp)
+
+
+	def test_elimination_of_activities(self):
+		r1 = mnm_repr.Reaction('r1', [self.present(self.m1)], [self.present(self.m2)])
+		r2 = mnm_repr.Reaction('r2', [self.present(self.m3)], [self.present(self.m1)])
+		r1.reversibility = False
+		r2.reversibility = False
+		network = NetworkSemantics([self.m1, self.m2, self.m3], [self.c1], [r1, r2])
+		model = mnm_repr.Model('m_0', [self.present(self.m1)], [r1, r2], [])
+		semantics = ModelSemantics(network, model, 4)
+		self.assertEqual(semantics.active, set(['r1']))
+		self.assertEqual(semantics.synthesizable, set([('m2', 'none', 'c_01')]))
+		self.assertEqual(semantics.predicts(exp_repr.DetectionActivity('r2')), set(['false']))
+		self.assertEqual(semantics.predicts(exp_repr.DetectionEntity('m2')), set(['true']))
+		self.assertEqual(semantics.predicts(exp_repr.LocalisationEntity('m2', 'c_05')), set())
+		self.assertTrue(semantics.not_clean())
+
+
+	def test_reversible_activity(self):
+		r1 = mnm_repr.Reaction('r1', [self.present(self.m1)], [self.present(self.m2)])
+		r1.reversibility = True
+		network = NetworkSemantics([self.m1, self.m2], [self.c1], [r1])
+		model = mnm_repr.Model('m_0', [self.present(self.m2)], [r1], [])
+		semantics = ModelSemantics(network, model, 4)
+		# m1 produced by the reverse direction
+		self.assertEqual(semantics.active, set(['r1', 'r1_rev']))
+		self.assertEqual(semantics.predicts(exp_repr.DetectionActivity('r1_rev')), set(['true']))
+		# activity outside of the model: no prediction
+		model = mnm_repr.Model('m_1', [self.present(self.m1)], [], [])
+		semantics = ModelSemantics(network, model, 4)
+		self.assertEqual(semantics.predicts(exp_repr.DetectionActivity('r1')), set())
+
+
+	def test_enzymes_and_iteration_limit(self):
+		# r1 can't work (no enzyme for it): enzyme of r2 is not produced,
+		# so r2 is eliminated on the next iteration, then r3 on the one after
+		e1 = mnm_repr.Protein('e1')
+		x = mnm_repr.Metabolite('x')
+		r1 = mnm_repr.Reaction('r1', [self.present(x), mnm_repr.PresentCatalyst(self.c1)], [self.present(self.m1)])
+		r2 = mnm_repr.Reaction('r2', [self.present(x), mnm_repr.PresentCatalyst(self.c1)], [self.present(self.m2)])
+		r3 = mnm_repr.Reaction('r3', [self.present(x), mnm_repr.PresentCatalyst(self.c1)], [self.present(self.m3)])
+		for act in [r1, r2, r3]:
+			act.reversibility = False
+		p1 = mnm_repr.Protein('m1', properties=[mnm_repr.Catalyses(r2)])
+		p2 = mnm_repr.Protein('m2', properties=[mnm_repr.Catalyses(r3)])
+		network = NetworkSemantics([e1, x, p1, p2, self.m3], [self.c1], [r1, r2, r3])
+		model = mnm_repr.Model('m_0', [self.present(x)], [r1, r2, r3], [])
+		self.assertEqual(ModelSemantics(network, model, 4).active, set())
+		# iterations 0 and 1 only
+		self.assertEqual(ModelSemantics(network, model, 0).active, set(['r3']))
+		# catalyst in the setup
+		model = mnm_repr.Model('m_0', [self.present(x), self.present(p1)], [r1, r2, r3], [])
+		semantics = ModelSemantics(network, model, 4)
+		self.assertEqual(semantics.active, set(['r2', 'r3']))
+		self.assertEqual(semantics.predicts(exp_repr.ReconstructionEnzReaction('r2', 'm1')), set(['true']))
+		self.assertEqual(semantics.predicts(exp_repr.ReconstructionEnzReaction('r2', 'm2')), set())
+
+
+	def test_adam_two_factor(self):
+		g1 = mnm_repr.Gene('g1')
+		r1 = mnm_repr.Reaction('r1', [self.present(self.m1), mnm_repr.PresentCatalyst(self.c1)], [self.present(self.m2)])
+		r1.reversibility = False
+		p1 = mnm_repr.Protein('p1', properties=[mnm_repr.Catalyses(r1)])
+		ex1 = mnm_repr.Expression('ex1', [self.present(g1)], [self.present(p1)])
+		ex1.reversibility = False
+		r2 = mnm_repr.Reaction('r2', [self.present(self.m3)], [self.present(self.m3, self.c2)])
+		r2.reversibility = False
+		network = NetworkSemantics([g1, p1, self.m1, self.m2, self.m3], [self.c1, self.c2], [r1, ex1, r2])
+		model = mnm_repr.Model('m_0', [self.present(g1), self.present(self.m1)], [ex1, r1, r2], [])
+		semantics = ModelSemantics(network, model, 4)
+		self.assertEqual(semantics.predicts(exp_repr.AdamTwoFactorExperiment('g1', 'm2')), set(['true']))
+		self.assertEqual(semantics.predicts(exp_repr.AdamTwoFactorExperiment('g1', 'm3')), set(['false']))
+
+
+	def test_growth_gate(self):
+		r1 = mnm_repr.Reaction('r1', [self.present(self.m1)], [self.present(self.m2)])
+		r1.reversibility = False
+		gr = mnm_repr.Growth('gr', [self.present(self.m3)])
+		gr.reversibility = False
+		network = NetworkSemantics([self.m1, self.m2, self.m3], [self.c1], [r1, gr])
+		model = mnm_repr.Model('m_0', [self.present(self.m1)], [r1, gr], [])
+		semantics = ModelSemantics(network, model, 4)
+		# growth(dummy) satisfies the gate
+		self.assertFalse(semantics.growth_failed)
+		self.assertEqual(semantics.predicts(exp_repr.DetectionActivity('gr')), set(['false']))
+		self.assertEqual(semantics.predicts(exp_repr.DetectionEntity('m2')), set(['true']))
+		# the only growth activities (dummy included) inactive: no predictions but growth and setup
+		dummy = mnm_repr.Growth('dummy', [self.present(self.m3, self.c2)])
+		dummy.reversibility = False
+		network = NetworkSemantics([self.m1, self.m2, self.m3], [self.c1, self.c2], [r1, gr, dummy])
+		model = mnm_repr.Model('m_0', [self.present(self.m1)], [r1, gr, dummy], [])
+		semantics = ModelSemantics(network, model, 4)
+		self.assertTrue(semantics.growth_failed)
+		self.assertEqual(semantics.predicts(exp_repr.DetectionActivity('dummy')), set(['false']))
+		self.assertEqual(semantics.predicts(exp_repr.DetectionActivity('gr')), set(['false']))
+		self.assertEqual(semantics.predicts(exp_repr.DetectionActivity('r1')), set())
+		self.assertEqual(semantics.predicts(exp_repr.DetectionEntity('m1')), set(['true']))
+		self.assertEqual(semantics.predicts(exp_repr.DetectionEntity('m2')), set())
+		self.assertEqual(semantics.predicts(exp_repr.LocalisationEntity('m3', 'c_01')), set())
+		self.assertEqual(semantics.predicts(exp_repr.AdamTwoFactorExperiment('m1', 'm2')), set())
+		res = exp_repr.Result('res_0', exp_repr.ExperimentDescription(exp_repr.DetectionEntity('m2'), []), 'false')
+		self.assertFalse(semantics.inconsistent(res))
+		# one growth activity active: gate satisfied
+		model = mnm_repr.Model('m_1', [self.present(self.m1), self.present(self.m3, self.c2)], [r1, gr, dummy], [])
+		semantics = ModelSemantics(network, model, 4)
+		self.assertFalse(semantics.growth_failed)
+		self.assertEqual(semantics.predicts(exp_repr.DetectionActivity('r1')), set(['true']))
+		# dummy that isn't a growth activity: solver needed
+		other = mnm_repr.Reaction('dummy', [self.present(self.m2)], [self.present(self.m3)])
+		other.reversibility = False
+		self.assertRaises(model_semantics.UndecidedError, NetworkSemantics, [self.m1, self.m2, self.m3], [self.c1], [r1, other])
+
+
+	def test_check_consistency(self):
+		r1 = mnm_repr.Reaction('r1', [self.present(self.m1)], [self.present(self.m2)])
+		r1.reversibility = False
+		network = NetworkSemantics([self.m1, self.m2], [self.c1], [r1])
+		model = mnm_repr.Model('m_0', [self.present(self.m1)], [r1], [self.present(self.m2)])
+		derived = mnm_repr.Model('deriv_m_0_0', [], [r1], [])
+		res1 = exp_repr.Result('res_0', exp_repr.ExperimentDescription(exp_repr.DetectionEntity('m2'), []), 'true')
+		res2 = exp_repr.Result('res_1', exp_repr.ExperimentDescription(exp_repr.DetectionEntity('m2'), [mnm_repr.Remove(self.present(self.m1))]), 'true')
+		self.assertEqual(model_semantics.check_consistency(network, model, {model:[res1]}, 4), True)
+		self.assertEqual(model_semantics.check_consistency(network, model, {model:[res1], derived:[res2]}, 4), False)
+		model.ignored_results = frozenset([res2])
+		self.assertEqual(model_semantics.check_consistency(network, model, {model:[res1], derived:[res2]}, 4), True)
+		# activity unknown to the network: solver needed
+		r2 = mnm_repr.Reaction('r2', [self.present(self.m2)], [self.present(self.m1)])
+		model = mnm_repr.Model('m_0', [], [r2], [])
+		self.assertEqual(model_semantics.check_consistency(network, model, {model:[res1]}, 4), None)
+
+
+class ModelSemanticsDifferentialTest(unittest.TestCase):
+	# random networks and models: native predictions compared
+	# with the answer set of models_rules and predictions_rules
+	def make_case(self, rnd):
+		comps = [mnm_repr.Medium(), mnm_repr.Cytosol()]
+		undeclared = mnm_repr.Nucleus()
+		mets = [mnm_repr.Metabolite('m%s' % i) for i in range(5)] + [mnm_repr.Metabolite('m0', version='v2')]
+		genes = [mnm_repr.Gene('g%s' % i) for i in range(2)]
+		acts = []
+		def species(pool):
+			return mnm_repr.PresentEntity(rnd.choice(pool), rnd.choice(comps + [undeclared] * (rnd.random() < 0.1)))
+		for i in range(6):
+			reqs = [species(mets) for j in range(rnd.randint(0, 2))]
+			if rnd.random() < 0.5:
+				reqs.append(mnm_repr.PresentCatalyst(rnd.choice(comps)))
+			if rnd.random() < 0.2:
+				reqs.append(mnm_repr.PresentTransporter(rnd.choice(comps)))
+			act = mnm_repr.Reaction('r%s' % i, reqs, [species(mets) for j in range(rnd.randint(1, 2))])
+			act.reversibility = (rnd.random() < 0.3)
+			acts.append(act)
+		proteins = []
+		for i in range(3):
+			props = [mnm_repr.Catalyses(a) for a in rnd.sample(acts, 2)]
+			if rnd.random() < 0.3:
+				props.append(mnm_repr.Transports(rnd.choice(acts)))
+			proteins.append(mnm_repr.Protein('p%s' % i, version=rnd.choice(['none', 'v2']), properties=props))
+		for i in range(2):
+			act = mnm_repr.Expression('ex%s' % i, [species(genes)], [species(proteins)])
+			act.reversibility = False
+			acts.append(act)
+		# growth(dummy) closes the gate of predictions if dummy is inactive
+		growth = mnm_repr.Growth(rnd.choice(['gr', 'dummy']), [species(mets)])
+		growth.reversibility = False
+		acts.append(growth)
+		entities = mets + genes + proteins
+
+		models = []
+		for i in range(3):
+			setup = [species(entities) for j in range(rnd.randint(1, 4))]
+			models.append(mnm_repr.Model('m_%s' % i, setup, rnd.sample(acts, rnd.randint(1, len(acts))), []))
+		return (entities, comps, acts, models)
+
+
+	def native_atoms(self, network, semantics, entities, comps, acts):
+		ent_IDs = sorted(set([e.ID for e in entities]))
+		act_IDs = sorted(network.activities.keys())
+		experiments = []
+		for e in ent_IDs:
+			experiments.append((exp_repr.DetectionEntity(e), 'experiment(detection_entity_exp,%s)' % e))
+			for c in comps:
+				experiments.append((exp_repr.LocalisationEntity(e, c.ID), 'experiment(localisation_entity_exp,%s,%s)' % (e, c.ID)))
+			for e2 in ent_IDs:
+				experiments.append((exp_repr.AdamTwoFactorExperiment(e, e2), 'experiment(adam_two_factor_exp,%s,%s)' % (e, e2)))
+		for a in act_IDs:
+			experiments.append((exp_repr.DetectionActivity(a), 'experiment(detection_activity_exp,%s)' % a))
+			experiments.append((exp_repr.ReconstructionActivity(a), 'experiment(basic_reconstruction_exp,%s)' % a))
+			for e in ent_IDs:
+				experiments.append((exp_repr.ReconstructionEnzReaction(a, e), 'experiment(enz_reconstruction_exp,%s,%s)' % (a, e)))
+				experiments.append((exp_repr.ReconstructionTransporterRequired(a, e), 'experiment(transp_reconstruction_exp,%s,%s)' % (a, e)))
+		atoms = set()
+		for (tp, term) in experiments:
+			for outcome in semantics.predicts(tp):
+				atoms.add('predicts(%s,%s,%s)' % (semantics.model.ID, term, outcome))
+		for act_ID in semantics.active:
+			atoms.add('active(%s,%s)' % (act_ID, semantics.model.ID))
+		return atoms
+
+
+	def test_start_from_eliminated(self):
+		# models with removals, started from eliminations in the full model
+		rnd = random.Random(1)
+		for case in range(100):
+			(entities, comps, acts, models) = self.make_case(rnd)
+			network = NetworkSemantics(entities, comps, acts)
+			for model in models:
+				full = ModelSemantics(network, model, len(model.intermediate_activities))
+				setup = rnd.sample(list(model.setup_conditions), rnd.randint(0, len(model.setup_conditions)))
+				activities = rnd.sample(list(model.intermediate_activities), rnd.randint(0, len(model.intermediate_activities)))
+				reduced = mnm_repr.Model('m_r', setup, activities, [])
+				for K in [0, 1, len(activities)]:
+					expected = ModelSemantics(network, reduced, K)
+					started = ModelSemantics(network, reduced, K, full.eliminated)
+					self.assertEqual(expected.eliminated, started.eliminated, 'case %s' % case)
+
+
+	@unittest.skipUnless(shutil.which('gringo') and shutil.which('clasp'), 'gringo and clasp required')
+	def test_random_networks(self):
+		rnd = random.Random(0)
+		runner = SolverRunner()
+		for case in range(30):
+			(entities, comps, acts, models) = self.make_case(rnd)
+			max_number_activities = len(acts)
+			network = NetworkSemantics(entities, comps, acts)
+			native = set()
+			for model in models:
+				semantics = ModelSemantics(network, model, max_number_activities)
+				native.update(self.native_atoms(network, semantics, entities, comps, acts))
+
+			program = [exporter.export_entities(entities), exporter.export_compartments(comps),
+				exporter.export_activities(acts), exporter.export_models_exp_design(models),
+				exporter.models_rules(), exporter.predictions_rules(),
+				[exporter.max_number_activities_constant(max_number_activities), '\n#hide.', '\n#show predicts/3.', '\n#show active/2.']]
+			output = runner.gringo_clasp([val for sublist in program for val in sublist], [], ['-n', '1']).check()
+			answer = re.search('Answer: 1\n(.*)', output).group(1)
+			solved = set(answer.split())
+			self.assertEqual(native, solved, 'case %s' % case)
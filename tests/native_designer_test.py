@@ -0,0 +1,297 @@
+#! /usr/bin/env python3
+# I, Robert Rozanski, the copyright holder of this work, release this work into the public domain. This applies worldwide. In some countries this may not be legally possible; if so: I grant anyone the right to use this work for any purpose, without any conditions, unless such conditions are required by law.
+
+import unittest
+import random
+import shutil
+from time import time
+import native_designer
+from model_semantics import ModelSemantics, UndecidedError
+from native_designer import NativeDesigner
+from experiment_module import ExperimentModule, BasicExpModuleWithCosts
+from solver_runner import SolverRun
+from archive import Archive, AllModelsEmpiricallyEquivalent, ChosenExperiment
+from exp_cost_model import CostModel
+from mnm_repr import Metabolite, Growth, Reaction, Transport, PresentEntity, Cytosol, Medium, Model, Add
+from exp_repr import DetectionEntity, DetectionActivity, ExperimentDescription, Experiment, Result
+from tests.temp_rules import TempRulesTest
+
+
+class AnswerRunner:
+	# stands in for SolverRunner: one answer (None: no answer), solver not called
+	def __init__(self, answer, optimum_found=True):
+		self.answer = answer
+		self.optimum_found = optimum_found
+		self.clasp_options = None
+
+	def gringo_clasp(self, program, files=[], clasp_options=['-n', '0'], gringo='gringo', clasp='clasp', collector=None):
+		self.clasp_options = clasp_options
+		if self.answer == None:
+			return SolverRun([], 'INTERRUPTED\n')
+		output = ['Answer: 1', self.answer, 'Optimization: 0']
+		if self.optimum_found:
+			output.append('OPTIMUM FOUND')
+		output.extend(['Optimization : 0', ''])
+		return SolverRun([], '\n'.join(output))
+
+
+class CountingSemantics(ModelSemantics):
+	created = 0
+
+	def __init__(self, *args, **kwargs):
+		CountingSemantics.created += 1
+		ModelSemantics.__init__(self, *args, **kwargs)
+
+
+class NativeDesignerTest(TempRulesTest):
+	def setUp(self):
+		TempRulesTest.setUp(self)
+		self.met1 = Metabolite('met1')
+		self.met2 = Metabolite('met2')
+		self.cytosol = Cytosol()
+		self.medium = Medium()
+		self.cond1 = PresentEntity(self.met1, self.cytosol)
+		self.cond1_med = PresentEntity(self.met1, self.medium)
+		self.cond2 = PresentEntity(self.met2, self.cytosol)
+
+		self.growth = Growth('growth', [self.cond2])
+		self.growth.reversibility = False
+		self.r1 = Reaction('r1', [self.cond1], [self.cond2])
+		self.r1.reversibility = False
+		self.t1 = Transport('t1', [self.cond1_med], [self.cond1])
+		self.t1.reversibility = False
+
+		# met1 only in medium; in m0 growth possible once met1 imported
+		self.mod1 = Model('m0', [], [self.r1, self.growth], [])
+		self.mod2 = Model('m1', [], [self.growth], [])
+
+		self.cost_model = CostModel([self.met1, self.met2], [self.cytosol, self.medium], [self.growth, self.r1, self.t1], [], [self.t1])
+		self.cost_model.set_all_basic_costs_to_1()
+		self.cost_model.calculate_derived_costs([self.growth, self.r1, self.t1])
+		self.cost_model.remove_None_valued_elements()
+
+		self.arch = Archive()
+		self.arch.working_models = [self.mod1, self.mod2]
+		self.arch.mnm_compartments = [self.cytosol, self.medium]
+		self.arch.mnm_entities = [self.met1, self.met2]
+		self.arch.mnm_activities = [self.growth, self.r1]
+		self.arch.import_activities = [self.t1]
+		self.designer = NativeDesigner(self.arch, self.cost_model, True)
+
+
+	def test_score_rows(self):
+		rows = [[1, -1], [1, 1], [1, 0]]
+		expected = [0.0, None, None]
+		self.assertEqual(native_designer.score_rows(rows, [1, 1], 10), expected)
+		module_numpy = native_designer.numpy
+		native_designer.numpy = None
+		try:
+			self.assertEqual(native_designer.score_rows(rows, [1, 1], 10), expected)
+			self.assertEqual(native_designer.score_rows([[1, -1, 0]], [1, 1, 2], 20), [40.0])
+		finally:
+			native_designer.numpy = module_numpy
+
+
+	def test_import_added_with_substrate(self):
+		answers = self.designer.design(10)
+		self.assertNotEqual(answers, [])
+		for components in answers:
+			self.assertIn('add(t1)', components)
+			self.assertIn('add(setup_present(met1,none,c_01))', components)
+		self.assertIn(['design_type(detection_activity_exp)', 'design_activity_det(growth)', 'add(setup_present(met1,none,c_01))', 'add(t1)'], answers)
+
+
+	def test_interventions_limited(self):
+		self.designer.max_interventions = 0
+		# designs need interventions left out: undecided
+		self.assertRaises(UndecidedError, self.designer.design, 10)
+		self.designer.max_interventions = 1
+		self.assertNotEqual(self.designer.design(10), [])
+		self.assertFalse(self.designer.optimal)
+		self.designer.max_interventions = None
+		self.assertNotEqual(self.designer.design(10), [])
+		self.assertTrue(self.designer.optimal)
+
+
+	def test_bans(self):
+		banned = ExperimentDescription(DetectionActivity('growth'), [Add(self.cond1_med), Add(self.t1)])
+		self.arch.known_results = [Experiment(None, [Result(None, banned, 'true')])]
+		answers = self.designer.design(10)
+		self.assertNotEqual(answers, [])
+		self.assertNotIn('design_activity_det(growth)', [c for components in answers for c in components])
+		# ban without interventions doesn't ban other interventions
+		self.assertTrue(self.designer.is_banned(DetectionEntity('met2'), ('add(t1)',), {('design_type(detection_entity_exp)', 'design_entity_det(met2)'): [set()]}))
+		self.assertFalse(self.designer.is_banned(DetectionEntity('met2'), (), {('design_type(detection_entity_exp)', 'design_entity_det(met2)'): [set(['add(t1)'])]}))
+
+
+	def test_evaluate(self):
+		interventions = [Add(self.cond1_med), Add(self.t1)]
+		self.assertEqual(self.designer.evaluate(DetectionActivity('growth'), interventions, 10), (0.0, 4))
+		# both models: false
+		self.assertEqual(self.designer.evaluate(DetectionActivity('growth'), [], 10), None)
+
+
+	def test_growth_gate(self):
+		# the only growth activity (dummy of predictions_rules) inactive in both models
+		dummy = Growth('dummy', [self.cond2])
+		dummy.reversibility = False
+		self.arch.working_models = [Model('m0', [], [self.r1, dummy], []), Model('m1', [], [dummy], [])]
+		self.arch.mnm_activities = [dummy, self.r1]
+		network = self.designer.get_network()
+		models = sorted(self.arch.working_models, key=lambda m: str(m.ID))
+		candidates = [native_designer.get_candidate(DetectionActivity('r1')), native_designer.get_candidate(DetectionActivity('dummy'))]
+		rows = self.designer.get_prediction_rows(network, models, candidates, ())
+		# gate closed: r1 indifferent, growth still predicted not to be detected
+		self.assertEqual([row[1] for row in rows], [[0, 0], [-1, -1]])
+		rows = self.designer.get_prediction_rows(network, models, candidates, ('add(setup_present(met1,none,c_01))', 'add(t1)'))
+		self.assertEqual([row[1] for row in rows], [[1, 0], [1, -1]])
+
+
+	def test_predictions_cached_between_cycles(self):
+		native_designer.model_semantics.ModelSemantics = CountingSemantics
+		try:
+			CountingSemantics.created = 0
+			answers = self.designer.design(10)
+			created = CountingSemantics.created
+			self.assertTrue(created > 0)
+			# new qualities: scored again, no new predictions
+			self.mod1.quality = 3
+			self.assertEqual(self.designer.design(20), answers)
+			self.assertEqual(CountingSemantics.created, created)
+			# new model: predictions for it only
+			self.arch.working_models.append(Model('m2', [self.cond1], [self.growth], []))
+			self.designer.design(25)
+			self.assertTrue(CountingSemantics.created > created)
+			self.assertTrue(CountingSemantics.created <= created*3/2)
+			# network changed: cache cleared
+			created = CountingSemantics.created
+			self.arch.mnm_entities.append(Metabolite('met3'))
+			self.designer.design(25)
+			self.assertEqual(CountingSemantics.created - created, len(self.designer.prediction_cache))
+		finally:
+			native_designer.model_semantics.ModelSemantics = ModelSemantics
+
+
+	def test_experiment_module_native(self):
+		exp_module = ExperimentModule(self.arch, self.cost_model, True, directory=self.directory)
+		exp_module.design_mode = 'native'
+		exp_module.native_designer.max_interventions = None
+		exps = exp_module.design_experiments()
+		self.assertIn(ExperimentDescription(DetectionActivity('growth'), [Add(self.cond1_med), Add(self.t1)]), exps)
+		self.assertTrue(exp_module.optimal)
+		self.arch.working_models = [self.mod2]
+		self.assertIsInstance(exp_module.design_experiments(), AllModelsEmpiricallyEquivalent)
+
+
+	def test_experiment_module_verify(self):
+		exp_module = ExperimentModule(self.arch, self.cost_model, True, directory=self.directory)
+		exp_module.session = None
+		exp_module.design_mode = 'verify'
+		exp_module.runner = AnswerRunner('design_type(detection_activity_exp) design_activity_det(growth) add(setup_present(met1,none,c_01)) add(t1)')
+		self.assertEqual(len(exp_module.design_experiments()), 1)
+		# both models: false
+		exp_module.runner = AnswerRunner('design_type(detection_activity_exp) design_activity_det(growth)')
+		self.assertRaises(ValueError, exp_module.design_experiments)
+		exp_module.design_mode = 'other'
+		self.assertRaises(ValueError, exp_module.design_experiments)
+
+
+	def test_deadline(self):
+		self.designer.max_interventions = None
+		self.designer.design(10, time() - 1)
+		self.assertFalse(self.designer.optimal)
+		self.designer.design(10, time() + 100)
+		self.assertTrue(self.designer.optimal)
+
+
+	def test_time_budget_best_so_far(self):
+		exp_module = BasicExpModuleWithCosts(self.arch, self.cost_model, directory=self.directory)
+		exp_module.session = None
+		exp_module.design_mode = 'asp'
+		exp_module.time_budget = 0.5
+		exp_module.runner = AnswerRunner('design_type(detection_activity_exp) design_activity_det(growth) add(setup_present(met1,none,c_01)) add(t1)', optimum_found=False)
+		exp_module.get_experiment()
+		self.assertIn('--time-limit=1', exp_module.runner.clasp_options)
+		event = self.arch.development_history[-1]
+		self.assertIsInstance(event, ChosenExperiment)
+		self.assertFalse(event.optimal)
+		exp_module.runner = AnswerRunner('design_type(detection_activity_exp) design_activity_det(growth) add(setup_present(met1,none,c_01)) add(t1)')
+		exp_module.get_experiment()
+		self.assertTrue(self.arch.development_history[-1].optimal)
+
+
+	def test_time_budget_fallback(self):
+		exp_module = ExperimentModule(self.arch, self.cost_model, True, directory=self.directory)
+		exp_module.session = None
+		exp_module.design_mode = 'asp'
+		exp_module.runner = AnswerRunner(None)
+		exps = exp_module.design_experiments()
+		self.assertIn(ExperimentDescription(DetectionActivity('growth'), [Add(self.cond1_med), Add(self.t1)]), exps)
+		self.assertFalse(exp_module.optimal)
+		# nothing among native candidates: no design
+		exp_module.native_designer.max_interventions = 0
+		self.assertEqual(exp_module.design_experiments(), False)
+
+
+	def two_interventions_module(self):
+		# met3 detected only if met1 and met2 are both added (m0: true, m1: false)
+		mets = [Metabolite('met%s' % number) for number in range(1, 5)]
+		conds = [PresentEntity(met, self.medium) for met in mets]
+		r1 = Reaction('r1', conds[:2], conds[2:3])
+		r2 = Reaction('r2', conds[2:3], conds[3:])
+		r1.reversibility = False
+		r2.reversibility = False
+		cost_model = CostModel(mets, [self.medium], [r1, r2], [])
+		cost_model.set_all_basic_costs_to_1()
+		cost_model.calculate_derived_costs([r1, r2])
+		cost_model.remove_None_valued_elements()
+		arch = Archive()
+		arch.working_models = [Model('m0', [], [r1], []), Model('m1', [], [r2], [])]
+		arch.mnm_compartments = [self.medium]
+		arch.mnm_entities = mets
+		arch.mnm_activities = [r1, r2]
+		exp_module = ExperimentModule(arch, cost_model, False, directory=self.directory)
+		exp_module.session = None
+		expected = ExperimentDescription(DetectionEntity('met3'), [Add(conds[0]), Add(conds[1])])
+		return (exp_module, expected)
+
+
+	def test_two_interventions(self):
+		(exp_module, expected) = self.two_interventions_module()
+		self.assertRaises(UndecidedError, exp_module.native_designer.design, 10)
+		# native mode: solver used instead
+		exp_module.design_mode = 'native'
+		exp_module.runner = AnswerRunner('design_type(detection_entity_exp) design_entity_det(met3) add(setup_present(met1,none,c_01)) add(setup_present(met2,none,c_01))')
+		self.assertEqual(exp_module.design_experiments(), [expected])
+		self.assertTrue(exp_module.optimal)
+		exp_module.native_designer.max_interventions = 2
+		self.assertEqual(exp_module.design_experiments_native(), [expected])
+		self.assertFalse(exp_module.optimal)
+		exp_module.native_designer.max_interventions = None
+		self.assertEqual(exp_module.design_experiments_native(), [expected])
+		self.assertTrue(exp_module.optimal)
+
+
+	@unittest.skipUnless(shutil.which('gringo') and shutil.which('clasp'), 'gringo and clasp required')
+	def test_two_interventions_asp(self):
+		(exp_module, expected) = self.two_interventions_module()
+		exp_module.native_designer.max_interventions = None
+		self.assertEqual(exp_module.design_experiments_asp(), exp_module.design_experiments_native())
+
+
+	def test_max_answers(self):
+		exp_module = ExperimentModule(self.arch, self.cost_model, False, directory=self.directory)
+		exp_module.design_mode = 'native'
+		self.assertTrue(len(exp_module.design_experiments()) > 1)
+		exp_module.max_answers = 1
+		self.assertEqual(len(exp_module.design_experiments()), 1)
+		exp_module.design_mode = 'asp'
+		exp_module.session = None
+		exp_module.runner = AnswerRunner('design_type(detection_activity_exp) design_activity_det(growth) add(setup_present(met1,none,c_01)) add(t1)')
+		state = random.getstate()
+		exp_module.design_experiments()
+		# seed not drawn from the random module
+		self.assertEqual(random.getstate(), state)
+		options = exp_module.runner.clasp_options
+		self.assertEqual(options[:3], ['-n', '1', '--opt-mode=optN'])
+		self.assertTrue(options[3].startswith('--seed='))
@@ -0,0 +1,84 @@
+#! /usr/bin/env python3
+# I, Robert Rozanski, the copyright holder of this work, release this work into the public domain. This applies worldwide. In some countries this may not be legally possible; if so: I grant anyone the right to use this work for any purpose, without any conditions, unless such conditions are required by law.
+
+import unittest
+import os
+import oracle_store
+from oracle_store import OracleStore
+from oracle import Oracle, SloppyOracle
+from archive import Archive
+from exp_repr import DetectionEntity, DetectionActivity, ExperimentDescription
+from mnm_repr import Metabolite, Cytosol, PresentEntity, Reaction, Model, Add, Remove
+from tests.temp_rules import TempRulesTest
+
+class OracleStoreTest(TempRulesTest):
+	def setUp(self):
+		TempRulesTest.setUp(self)
+		self.path = os.path.join(self.directory, 'store')
+		self.store = OracleStore(self.path)
+
+		self.met1 = Metabolite('met1')
+		self.met2 = Metabolite('met2')
+		self.cytosol = Cytosol()
+		self.cond1 = PresentEntity(self.met1, self.cytosol)
+		self.cond2 = PresentEntity(self.met2, self.cytosol)
+		self.r1 = Reaction('r1', [self.cond1], [self.cond2])
+		self.r1.reversibility = False
+		self.model = Model('m0', [self.cond1], [self.r1], [])
+
+
+	def test_put_and_get(self):
+		self.assertEqual(self.store.get('case', 'exp'), None)
+		self.store.put('case', 'exp', 'true')
+		self.assertEqual(self.store.get('case', 'exp'), 'true')
+		self.assertEqual(self.store.get_statistics(), {'hits':1, 'misses':1})
+
+
+	def test_outcomes_shared_between_stores(self):
+		other = OracleStore(self.path)
+		self.assertEqual(other.get('case', 'exp1'), None)
+		self.store.put('case', 'exp1', 'true')
+		self.store.put('case', 'exp2', 'false')
+		self.assertEqual(other.get('case', 'exp2'), 'false')
+		self.assertEqual(other.get('case', 'exp1'), 'true')
+		# incomplete last line ignored until completed
+		with open(self.path, 'a') as f:
+			f.write('case\texp3\ttr')
+		self.assertEqual(other.get('case', 'exp3'), None)
+		with open(self.path, 'a') as f:
+			f.write('ue\n')
+		self.assertEqual(other.get('case', 'exp3'), 'true')
+
+
+	def test_case_fingerprint(self):
+		key1 = oracle_store.case_fingerprint([], [self.r1], self.model, [self.met1, self.met2], [self.cytosol], [self.r1])
+		key2 = oracle_store.case_fingerprint([], [self.r1], self.model, [self.met2, self.met1], [self.cytosol], [self.r1])
+		self.assertEqual(key1, key2)
+		model = Model('m0', [self.cond1, self.cond2], [self.r1], [])
+		key3 = oracle_store.case_fingerprint([], [self.r1], model, [self.met1, self.met2], [self.cytosol], [self.r1])
+		self.assertNotEqual(key1, key3)
+
+
+	def test_experiment_key(self):
+		key1 = oracle_store.experiment_key(ExperimentDescription(DetectionEntity('met2'), [Remove(self.cond1), Add(self.cond2)]))
+		key2 = oracle_store.experiment_key(ExperimentDescription(DetectionEntity('met2'), [Add(self.cond2), Remove(self.cond1)]))
+		key3 = oracle_store.experiment_key(ExperimentDescription(DetectionEntity('met2'), [Add(self.cond1), Remove(self.cond2)]))
+		key4 = oracle_store.experiment_key(ExperimentDescription(DetectionEntity('met1'), [Remove(self.cond1), Add(self.cond2)]))
+		self.assertEqual(key1, key2)
+		self.assertNotEqual(key1, key3)
+		self.assertNotEqual(key1, key4)
+
+
+	def test_oracle_uses_store(self):
+		archive = Archive()
+		oracle = Oracle(archive, [], [self.r1], self.model, [self.met1, self.met2], [self.cytosol], [self.r1], directory=self.directory)
+		oracle.store = self.store
+		oracle.in_vivo_mode = 'native'
+		expD = ExperimentDescription(DetectionActivity('r1'), [])
+		self.assertEqual(oracle.execute_exp(expD).outcome, 'true')
+		self.assertEqual(self.store.misses, 1)
+		# another run of the same case: outcome from the store, errors simulated after
+		sloppy = SloppyOracle(archive, [], [self.r1], self.model, [self.met1, self.met2], [self.cytosol], [self.r1], error_parameter=1.00, directory=self.directory)
+		sloppy.store = OracleStore(self.path)
+		self.assertEqual(sloppy.execute_exp(expD).outcome, 'false')
+		self.assertEqual(sloppy.store.get_statistics(), {'hits':1, 'misses':0})
@@ -2,13 +2,16 @@
 # I, Robert Rozanski, the copyright holder of this work, release this work into the public domain. This applies worldwide. In some countries this may not be legally possible; if so: I grant anyone the right to use this work for any purpose, without any conditions, unless such conditions are required by law.
 
 import unittest
+import shutil
 from oracle import Oracle
 from exp_repr import DetectionEntity, LocalisationEntity, DetectionActivity, AdamTwoFactorExperiment, ReconstructionActivity, ReconstructionEnzReaction, ReconstructionTransporterRequired, ExperimentDescription, Result
-from mnm_repr import Gene, Metabolite, Protein, Complex, Growth, Reaction, PresentEntity, Cytosol, Add, Remove, Medium, CellMembrane, Model, PresentCatalyst, PresentTransporter, Catalyses, Transports
+from mnm_repr import Gene, Metabolite, Protein, Complex, Growth, Expression, Reaction, PresentEntity, Cytosol, Add, Remove, Medium, CellMembrane, Model, PresentCatalyst, PresentTransporter, Catalyses, Transports
 from archive import Archive
+from tests.temp_rules import TempRulesTest
 
-class OracleTest(unittest.TestCase):
+class OracleTest(TempRulesTest):
 	def setUp(self):
+		TempRulesTest.setUp(self)
 		self.g1 = Gene('g1')
 		self.p1 = Protein('p1')
 		self.met1 = Metabolite('met1')
@@ -42,11 +45,12 @@ class OracleTest(unittest.TestCase):
 		self.archive.mnm_entities = list(self.entities)
 		self.archive.mnm_activities = list(self.activities)
 
-		self.oracle = Oracle(self.archive, [], [], self.mod1, self.entities, self.compartments, self.activities)
+		self.oracle = Oracle(self.archive, [], [], self.mod1, self.entities, self.compartments, self.activities, directory=self.directory)
 
 
 	def tearDown(self):
 		self.oracle = None
+		TempRulesTest.tearDown(self)
 
 
 	def test_in_vitro_basic(self):
@@ -56,7 +60,7 @@ class OracleTest(unittest.TestCase):
 		cond1 = PresentEntity(met1, cytosol)
 		cond2 = PresentEntity(met2, cytosol)
 		r1 = Reaction('r1', [cond1], [cond2])
-		self.oracle = Oracle(None, [], [r1], None, [], [], [])
+		self.oracle = Oracle(None, [], [r1], None, [], [], [], directory=self.directory)
 		expD = ExperimentDescription(ReconstructionActivity('r1'), [])
 		out = self.oracle.execute_in_vitro_exp(expD)
 		self.assertEqual(out.outcome, 'true')
@@ -71,7 +75,7 @@ class OracleTest(unittest.TestCase):
 		cond_enz = PresentCatalyst(cytosol)
 		r1 = Reaction('r1', [cond1, cond_enz], [cond2])
 		enz = Protein('p1', properties=[Catalyses(r1)])
-		self.oracle = Oracle(None, [enz], [r1], None, [], [], [])
+		self.oracle = Oracle(None, [enz], [r1], None, [], [], [], directory=self.directory)
 		expD = ExperimentDescription(ReconstructionEnzReaction('r1', 'p1'), [])
 		out = self.oracle.execute_in_vitro_exp(expD)
 		self.assertEqual(out.outcome, 'true')
@@ -86,7 +90,7 @@ class OracleTest(unittest.TestCase):
 		cond_trp = PresentTransporter(cytosol)
 		r1 = Reaction('r1', [cond1, cond_trp], [cond2])
 		transp = Protein('p1', properties=[Transports(r1)])
-		self.oracle = Oracle(None, [transp], [r1], None, [], [], [])
+		self.oracle = Oracle(None, [transp], [r1], None, [], [], [], directory=self.directory)
 		expD = ExperimentDescription(ReconstructionTransporterRequired('r1', 'p1'), [])
 		out = self.oracle.execute_in_vitro_exp(expD)
 		self.assertEqual(out.outcome, 'true')
@@ -99,6 +103,142 @@ class OracleTest(unittest.TestCase):
 		self.assertEqual(res.outcome, 'true')
 
 
+	def in_vivo_cases(self):
+		return [(DetectionActivity('r1'), [], 'true'),
+			(DetectionActivity('r1'), [Remove(self.cond1)], 'false'),
+			(DetectionActivity('r2'), [], 'false'),
+			(DetectionActivity('r2'), [Add(self.r2)], 'true'),
+			(DetectionEntity('met2'), [], 'true'),
+			(DetectionEntity('cplx1'), [], 'false'),
+			(LocalisationEntity('met1', 'c_05'), [], 'true'),
+			(LocalisationEntity('met1', 'c_01'), [], 'false'),
+			(AdamTwoFactorExperiment('g1', 'met1'), [], 'false')]
+
+
+	def test_in_vivo_native(self):
+		self.oracle.in_vivo_mode = 'native'
+		for (tp, interventions, outcome) in self.in_vivo_cases():
+			res = self.oracle.execute_in_vivo(ExperimentDescription(tp, interventions))
+			self.assertEqual(res.outcome, outcome)
+		# reference model not changed by interventions
+		self.assertEqual(self.mod1.intermediate_activities, frozenset([self.growth, self.r1]))
+
+
+	@unittest.skipUnless(shutil.which('gringo') and shutil.which('clasp'), 'gringo and clasp required')
+	def test_in_vivo_asp(self):
+		# same outcomes from the solver
+		self.assertEqual(self.oracle.in_vivo_mode, 'asp')
+		for (tp, interventions, outcome) in self.in_vivo_cases():
+			res = self.oracle.execute_in_vivo(ExperimentDescription(tp, interventions))
+			self.assertEqual(res.outcome, outcome)
+
+
+	def growth_knockout_oracle(self, growth_ID):
+		# g1 expresses the enzyme of r3 (met1 -> met3), growth needs met2
+		met3 = Metabolite('met3')
+		r3 = Reaction('r3', [self.cond1, PresentCatalyst(self.cytosol)], [PresentEntity(met3, self.cytosol)])
+		r3.reversibility = False
+		p2 = Protein('p2', properties=[Catalyses(r3)])
+		ex1 = Expression('ex1', [PresentEntity(self.g1, self.cytosol)], [PresentEntity(p2, self.cytosol)])
+		ex1.reversibility = False
+		growth = Growth(growth_ID, [self.cond2])
+		growth.reversibility = False
+		entities = [self.g1, p2, self.met1, self.met2, met3]
+		activities = [ex1, r3, growth]
+		setup = [PresentEntity(self.g1, self.cytosol), self.cond1, self.cond2]
+		model = Model('m0', setup, activities, [])
+		self.archive.mnm_entities = list(entities)
+		self.archive.mnm_activities = list(activities)
+		oracle = Oracle(self.archive, [], [], model, entities, self.compartments, activities, directory=self.directory)
+		oracle.in_vivo_mode = 'native'
+		return oracle
+
+
+	def test_in_vivo_native_growth_knockout(self):
+		expDs = [ExperimentDescription(AdamTwoFactorExperiment('g1', 'met3'), []),
+			ExperimentDescription(AdamTwoFactorExperiment('g1', 'met3'), [Remove(self.cond2)]),
+			ExperimentDescription(DetectionEntity('met3'), [Remove(self.cond2)])]
+		# growth(dummy) of the prediction rules: growth knockout doesn't matter
+		oracle = self.growth_knockout_oracle('growth')
+		self.assertEqual([oracle.execute_in_vivo(expD).outcome for expD in expDs], ['true', 'true', 'true'])
+		# the only growth activities knocked out: no Adam predictions
+		oracle = self.growth_knockout_oracle('dummy')
+		self.assertEqual([oracle.execute_in_vivo(expD).outcome for expD in expDs], ['true', 'false', 'true'])
+
+
+	@unittest.skipUnless(shutil.which('gringo') and shutil.which('clasp'), 'gringo and clasp required')
+	def test_in_vivo_verify_growth_knockout(self):
+		expD = ExperimentDescription(AdamTwoFactorExperiment('g1', 'met3'), [Remove(self.cond2)])
+		for (growth_ID, outcome) in [('growth', 'true'), ('dummy', 'false')]:
+			oracle = self.growth_knockout_oracle(growth_ID)
+			oracle.in_vivo_mode = 'verify'
+			self.assertEqual(oracle.execute_in_vivo(expD).outcome, outcome)
+
+
+	def test_in_vivo_cached_semantics(self):
+		network = self.oracle.get_network_semantics()
+		reference = self.oracle.get_reference_semantics(network)
+		semantics1 = self.oracle.get_model_semantics(network, [Remove(self.cond1)])
+		semantics2 = self.oracle.get_model_semantics(network, [Remove(self.cond1), Add(self.cond1), Remove(self.cond1)])
+		self.assertIs(semantics1, semantics2)
+		self.assertEqual(semantics1.active, set())
+		self.assertEqual(reference.active, set(['growth', 'r1']))
+		self.assertIs(self.oracle.get_model_semantics(network, []), self.oracle.get_model_semantics(network, []))
+
+
+	def test_in_vivo_mode_not_recognised(self):
+		self.oracle.in_vivo_mode = 'other'
+		expD = ExperimentDescription(DetectionActivity('r1'), [])
+		self.assertRaises(ValueError, self.oracle.execute_in_vivo, expD)
+
+
+	def test_process_output_localisation_other_atom(self):
+		expD = ExperimentDescription(LocalisationEntity('met1', 'c_05'), [])
+		out = 'Answer: 1\nsynthesizable(met1,ver,c_01,m0) synthesizable(met2,ver,c_05,m0)'
+		res = self.oracle.process_output(out, expD)
+		self.assertEqual(res.outcome, 'false')
+
+
+	def test_process_atoms(self):
+		out = 'Answer: 1\nsynthesizable(met2,none,c_05,oracle_exp_0) initially_present(met1,none,c_05,oracle_exp_1) active(r1,oracle_exp_0) predicts(oracle_exp_1,experiment(adam_two_factor_exp,g1,met1),true)\nSATISFIABLE'
+		atoms = self.oracle.index_answer(out)
+		cases = [(DetectionEntity('met2'), 'oracle_exp_0', 'true'),
+			(DetectionEntity('met2'), 'oracle_exp_1', 'false'),
+			(LocalisationEntity('met1', 'c_05'), 'oracle_exp_1', 'true'),
+			(LocalisationEntity('met1', 'c_01'), 'oracle_exp_1', 'false'),
+			(DetectionActivity('r1'), 'oracle_exp_0', 'true'),
+			(DetectionActivity('r1'), 'oracle_exp_1', 'false'),
+			(AdamTwoFactorExperiment('g1', 'met1'), 'oracle_exp_1', 'true'),
+			(AdamTwoFactorExperiment('g1', 'met1'), 'oracle_exp_0', 'false')]
+		for (tp, model_ID, outcome) in cases:
+			res = self.oracle.process_atoms(atoms, model_ID, ExperimentDescription(tp, []))
+			self.assertEqual(res.outcome, outcome)
+
+
+	def test_execute_exps_batch(self):
+		enz = Protein('p1', properties=[Catalyses(self.r1)])
+		self.oracle = Oracle(self.archive, [enz], [self.r1], self.mod1, self.entities, self.compartments, self.activities, directory=self.directory)
+		self.oracle.in_vivo_mode = 'native'
+		expDs = [ExperimentDescription(DetectionActivity('r1'), [Remove(self.cond1)]),
+			ExperimentDescription(ReconstructionEnzReaction('r1', 'p1'), []),
+			ExperimentDescription(ReconstructionActivity('r2'), []),
+			ExperimentDescription(DetectionEntity('met2'), [])]
+		ress = self.oracle.execute_exps_batch(expDs)
+		self.assertEqual([res.outcome for res in ress], ['false', 'true', 'false', 'true'])
+		self.assertEqual([res.exp_description for res in ress], expDs)
+
+
+	@unittest.skipUnless(shutil.which('gringo') and shutil.which('clasp'), 'gringo and clasp required')
+	def test_execute_exps_batch_verify(self):
+		self.oracle.in_vivo_mode = 'verify'
+		expDs = [ExperimentDescription(DetectionActivity('r1'), [Remove(self.cond1)]),
+			ExperimentDescription(DetectionActivity('r2'), [Add(self.r2)]),
+			ExperimentDescription(LocalisationEntity('met2', 'c_05'), []),
+			ExperimentDescription(AdamTwoFactorExperiment('g1', 'met2'), [])]
+		ress = self.oracle.execute_exps_batch(expDs)
+		self.assertEqual([res.outcome for res in ress], ['false', 'true', 'true', 'false'])
+
+
 	def test_process_output_ent_detection_1(self):
 		expD = ExperimentDescription(DetectionEntity('met1'), [])
 		out = 'Answer: 1\nsynthesizable(met1,ver,c_05,m0)'
@@ -148,7 +288,7 @@ class OracleTest(unittest.TestCase):
 		cond1 = PresentEntity(met1, cytosol)
 		cond2 = PresentEntity(met2, cytosol)
 		r1 = Reaction('r1', [cond1], [cond2])
-		self.oracle = SloppyOracle(None, [], [r1], None, [], [], [], error_parameter=0.00)
+		self.oracle = SloppyOracle(None, [], [r1], None, [], [], [], error_parameter=0.00, directory=self.directory)
 		expD = ExperimentDescription(ReconstructionActivity('r1'), [])
 		out = self.oracle.execute_in_vitro_exp(expD)
 		self.assertEqual(out.outcome, 'true')
@@ -161,7 +301,7 @@ class OracleTest(unittest.TestCase):
 		cond1 = PresentEntity(met1, cytosol)
 		cond2 = PresentEntity(met2, cytosol)
 		r1 = Reaction('r1', [cond1], [cond2])
-		self.oracle = SloppyOracle(None, [], [r1], None, [], [], [],  error_parameter=1.00)
+		self.oracle = SloppyOracle(None, [], [r1], None, [], [], [],  error_parameter=1.00, directory=self.directory)
 		expD = ExperimentDescription(ReconstructionActivity('r1'), [])
 		out = self.oracle.execute_in_vitro_exp(expD)
 		self.assertEqual(out.outcome, 'false')
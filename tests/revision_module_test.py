@@ -2,13 +2,35 @@
 # I, Robert Rozanski, the copyright holder of this work, release this work into the public domain. This applies worldwide. In some countries this may not be legally possible; if so: I grant anyone the right to use this work for any purpose, without any conditions, unless such conditions are required by law.
 
 import unittest
+import random
 from revision_module import RevisionModule, RevCAddB, RevCIAddB
 import mnm_repr
 import exp_repr
 from archive import Archive, AdditionalModels, AcceptedResults
+from solver_runner import SolverRun
+from tests.temp_rules import TempRulesTest
 
 
-class RevisionModuleTest(unittest.TestCase):
+class OptionsRunner:
+	# stands in for SolverRunner: records XHAIL options, no answers
+	def __init__(self):
+		self.options = []
+
+	def xhail(self, program, files, xhail, gringo, clasp, options=None):
+		self.options.append(options)
+		return SolverRun([], '')
+
+
+class OwnRevision(RevisionModule):
+	# revises its own way: models revised recorded, the second one fails
+	def revise(self, base_model, force_new_model=False):
+		self.revised.append(base_model)
+		if len(self.revised) == 2:
+			return False
+		return ([], True)
+
+
+class RevisionModuleTest(TempRulesTest):
 #	def test_check_consistency(self): # just gathers info from other methods
 #	def test_prepare_input_results_models(self): # just gathers info from other methods
 
@@ -96,6 +118,81 @@ class RevisionModuleTest(unittest.TestCase):
 		self.assertEqual(False, out)
 
 
+	def test_prepare_input_consistency_batch(self):
+		met1 = mnm_repr.Metabolite('met1')
+		comp1 = mnm_repr.Medium()
+		cond_subst_1 = mnm_repr.PresentEntity(met1, comp1)
+		mod1 = mnm_repr.Model('m1', [cond_subst_1], [], [cond_subst_1])
+		mod2 = mnm_repr.Model('m2', [], [], [])
+		exd = exp_repr.ExperimentDescription(exp_repr.DetectionEntity('met1'), [])
+		res = exp_repr.Result('r1', exd, 'true')
+		exp = exp_repr.Experiment('exp1', [res])
+		mod2.ignored_results = frozenset([res])
+
+		arch = Archive()
+		arch.mnm_entities = [met1]
+		arch.mnm_compartments = [comp1]
+		arch.record(AdditionalModels([mod1, mod2]))
+		arch.record(AcceptedResults(exp))
+
+		rev = RevisionModule(arch)
+		inpt = rev.prepare_input_consistency_batch([mod1, mod2])
+		self.assertEqual(1, inpt.count('\nresult(r1, experiment(detection_entity_exp, met1), true).'))
+		self.assertIn('\ninconsistent_model(%s) :- not synthesizable(met1, none, c_01, %s).' % (mod1.ID, mod1.ID), inpt)
+		self.assertIn('\ninconsistent_model(%s) :- inconsistent(%s, r1).' % (mod1.ID, mod1.ID), inpt)
+		self.assertIn('\ninconsistent_model(%s) :- not_clean_model(%s).' % (mod2.ID, mod2.ID), inpt)
+		# ignored by mod2
+		self.assertNotIn('\ninconsistent_model(%s) :- inconsistent(%s, r1).' % (mod2.ID, mod2.ID), inpt)
+
+
+	def test_process_output_consistency_batch(self):
+		rev = RevisionModule(Archive())
+		output = 'clasp version 2.1.0\nReading from stdin\nSolving...\nAnswer: 1\ninconsistent_model(m_1) inconsistent_model(m_3)\nSATISFIABLE\n'
+		self.assertEqual(rev.process_output_consistency_batch(output), set(['m_1', 'm_3']))
+		output = 'clasp version 2.1.0\nReading from stdin\nSolving...\nAnswer: 1\n\nSATISFIABLE\n'
+		self.assertEqual(rev.process_output_consistency_batch(output), set())
+		self.assertEqual(rev.process_output_consistency_batch('UNSATISFIABLE\n'), None)
+
+
+	def test_bounded_answers(self):
+		met1 = mnm_repr.Metabolite('met1')
+		arch = Archive()
+		arch.mnm_entities = [met1]
+		arch.mnm_compartments = [mnm_repr.Medium()]
+		mod1 = mnm_repr.Model('m1', [], [], [])
+		rev = RevisionModule(arch)
+		rev.runner = OptionsRunner()
+		self.assertFalse(rev.prepare_input_execute_and_process(mod1, False, False))
+		rev.max_answers = 1
+		self.assertFalse(rev.prepare_input_execute_and_process(mod1, False, False))
+		# all answers enumerated, then sampled
+		self.assertEqual(rev.runner.options, [['-a'], ['-a']])
+		answers = [([], [], [], ['res_%s' % number]) for number in range(5)]
+		rev.process_output_revision = lambda output: answers
+		chosen = []
+		rev.update_base_model = lambda base_model, solution: chosen.append(solution[3][0])
+		for number in range(20):
+			rev.process_revision(mod1, mod1, '')
+		self.assertTrue(len(set(chosen)) > 1)
+		# seeded: same answers sampled again
+		sampled = list(chosen)
+		rev.sample_random = random.Random(0)
+		chosen[:] = []
+		for number in range(20):
+			rev.process_revision(mod1, mod1, '')
+		self.assertEqual(chosen, sampled)
+
+
+	def test_revise_all_subclass_hook(self):
+		rev = OwnRevision(Archive())
+		rev.revised = []
+		models = [mnm_repr.Model('m%s' % number, [], [], []) for number in range(3)]
+		self.assertEqual(rev.revise_all(models), [([], True), False])
+		self.assertEqual(rev.revised, models[:2])
+		self.assertFalse(RevCAddB(Archive()).ignoring)
+		self.assertTrue(RevCIAddB(Archive()).ignoring)
+
+
 	def test_calculate_max_number_activities(self):
 		# model with activities, archive with results that have add activity in interventions
 		a1 = mnm_repr.Activity('act1', None, ['a'], [])
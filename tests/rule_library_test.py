@@ -0,0 +1,38 @@
+#! /usr/bin/env python3
+# I, Robert Rozanski, the copyright holder of this work, release this work into the public domain. This applies worldwide. In some countries this may not be legally possible; if so: I grant anyone the right to use this work for any purpose, without any conditions, unless such conditions are required by law.
+
+import unittest
+import os
+import shutil
+from tempfile import mkdtemp
+import exporter
+from rule_library import RuleLibrary
+
+class RuleLibraryTest(unittest.TestCase):
+	def setUp(self):
+		self.directory = mkdtemp()
+		self.library = RuleLibrary(self.directory)
+
+	def tearDown(self):
+		shutil.rmtree(self.directory)
+
+
+	def test_get_file_content(self):
+		path = self.library.get_file('inconsistency_rules')
+		with open(path, 'r') as f:
+			self.assertEqual(f.read(), ''.join(exporter.inconsistency_rules()))
+
+
+	def test_get_file_written_once(self):
+		path1 = self.library.get_file('predictions_rules')
+		os.utime(path1, (0, 0))
+		path2 = RuleLibrary(self.directory).get_file('predictions_rules')
+		self.assertEqual(path1, path2)
+		self.assertEqual(os.path.getmtime(path2), 0)
+
+
+	def test_models_rules_constant(self):
+		path = self.library.get_file('models_rules')
+		with open(path, 'r') as f:
+			self.assertIn('Int < max_number_activities,', f.read())
+		self.assertEqual(exporter.max_number_activities_constant(5), '\n#const max_number_activities = 5.')
@@ -0,0 +1,62 @@
+#! /usr/bin/env python3
+# I, Robert Rozanski, the copyright holder of this work, release this work into the public domain. This applies worldwide. In some countries this may not be legally possible; if so: I grant anyone the right to use this work for any purpose, without any conditions, unless such conditions are required by law.
+
+import unittest
+import os
+import shutil
+from tempfile import mkdtemp
+from solver_cache import SolverCache
+
+class SolverCacheTest(unittest.TestCase):
+	def setUp(self):
+		self.directory = mkdtemp()
+		self.cache = SolverCache(self.directory)
+
+	def tearDown(self):
+		shutil.rmtree(self.directory)
+
+
+	def test_make_key_same_program(self):
+		key1 = self.cache.make_key(['\na(1).', '\nb(2).'], ['clasp', '-n', '0'])
+		key2 = self.cache.make_key(['\na(1).\nb(2).'], ['clasp', '-n', '0'])
+		self.assertEqual(key1, key2)
+
+
+	def test_make_key_different_command(self):
+		key1 = self.cache.make_key(['\na(1).'], ['clasp', '-n', '0'])
+		key2 = self.cache.make_key(['\na(1).'], ['clasp', '-n', '1'])
+		self.assertNotEqual(key1, key2)
+
+
+	def test_get_miss(self):
+		out = self.cache.get(self.cache.make_key(['\na(1).'], ['clasp']))
+		self.assertEqual(out, None)
+		self.assertEqual(self.cache.misses, 1)
+		self.assertEqual(self.cache.hits, 0)
+
+
+	def test_put_and_get_hit(self):
+		key = self.cache.make_key(['\na(1).'], ['clasp'])
+		self.cache.put(key, 'Answer: 1\na(1)')
+		out = self.cache.get(key)
+		self.assertEqual(out, 'Answer: 1\na(1)')
+		self.assertEqual(self.cache.hits, 1)
+
+
+	def test_evict_least_recently_used(self):
+		self.cache.max_size = 10
+		self.cache.put('old', '12345')
+		os.utime(self.cache.get_entry_path('old'), (0, 0))
+		self.cache.put('new', '123456')
+		self.assertEqual(self.cache.get('old'), None)
+		self.assertEqual(self.cache.get('new'), '123456')
+
+
+	def test_size_counted_incrementally(self):
+		self.cache.put('first', '12345')
+		self.assertEqual(self.cache.size, 5)
+		# replaced entry not counted twice
+		self.cache.put('first', '123')
+		self.cache.put('second', '1234')
+		self.assertEqual(self.cache.size, 7)
+		self.assertEqual(self.cache.size, self.cache.count_size())
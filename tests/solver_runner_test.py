@@ -0,0 +1,94 @@
+#! /usr/bin/env python3
+# I, Robert Rozanski, the copyright holder of this work, release this work into the public domain. This applies worldwide. In some countries this may not be legally possible; if so: I grant anyone the right to use this work for any purpose, without any conditions, unless such conditions are required by law.
+
+import unittest
+import os
+import sys
+import shutil
+import subprocess
+import time
+from tempfile import mkdtemp
+from solver_cache import SolverCache
+import solver_runner
+from solver_runner import SolverRunner, SolverRun
+
+class SolverRunnerTest(unittest.TestCase):
+	def setUp(self):
+		self.directory = mkdtemp()
+		self.runner = SolverRunner(temp_dir=self.directory)
+
+	def tearDown(self):
+		self.runner.shutdown()
+		shutil.rmtree(self.directory)
+
+
+	def test_program_streamed_through_pipeline(self):
+		run = self.runner.run([['cat'], ['cat']], ['\na(1).', '\nb(2).'], stdin_arg='-')
+		self.assertEqual(run.output, '\na(1).\nb(2).')
+		self.assertEqual(run.returncodes, [0, 0])
+		self.assertTrue(run.ok)
+
+
+	def test_temporary_file_removed(self):
+		self.runner.use_stdin = False
+		run = self.runner.run([['cat']], ['\na(1).'], stdin_arg='-')
+		self.assertEqual(run.output, '\na(1).')
+		self.assertEqual(os.listdir(self.directory), [])
+
+
+	def test_errors_and_exit_code(self):
+		command = [sys.executable, '-c', 'import sys; sys.stderr.write("wrong"); sys.exit(3)']
+		run = self.runner.run([command], [])
+		self.assertEqual(run.errors, 'wrong')
+		self.assertEqual(run.get_returncode(), 3)
+		self.assertFalse(run.ok)
+		self.assertRaises(subprocess.CalledProcessError, run.check)
+
+
+	def test_time_limit(self):
+		self.runner.time_limit = 0.2
+		run = self.runner.run([[sys.executable, '-c', 'import time; time.sleep(5)']], [])
+		self.assertTrue(run.timed_out)
+		self.assertRaises(subprocess.TimeoutExpired, run.check)
+
+
+	def test_cache(self):
+		self.runner.cache = SolverCache(os.path.join(self.directory, 'cache'))
+		self.runner.run([['cat']], ['\na(1).'], stdin_arg='-')
+		run = self.runner.run([['cat']], ['\na(1).'], stdin_arg='-')
+		self.assertTrue(run.cached)
+		self.assertEqual(run.output, '\na(1).')
+
+
+	def test_asynchronous_calls(self):
+		futures = [self.runner.get_executor().submit(self.runner.run, [['cat']], ['\na(%s).' % i], [], [0], '-') for i in range(4)]
+		self.assertEqual([f.result().output for f in futures], ['\na(%s).' % i for i in range(4)])
+
+
+	def test_portfolio_first_proven_wins(self):
+		slow = [[sys.executable, '-c', 'import time; time.sleep(30); print("slow")']]
+		failing = [[sys.executable, '-c', 'import sys; sys.exit(1)']]
+		fast = [[sys.executable, '-c', 'import time; time.sleep(0.2); print("fast")']]
+		members = [('slow', self.runner.run, (slow, [])), ('failing', self.runner.run, (failing, [])), ('fast', self.runner.run, (fast, []))]
+		start = time.monotonic()
+		run = self.runner.run_portfolio(members, lambda run: run.ok)
+		self.assertTrue(time.monotonic() - start < 10)
+		self.assertEqual(run.output, 'fast\n')
+		statistics = self.runner.portfolio_statistics
+		self.assertEqual(statistics['fast'], {'runs':1, 'wins':1, 'time':statistics['fast']['time']})
+		self.assertEqual(statistics['slow']['wins'], 0)
+		self.assertEqual(statistics['failing']['runs'], 1)
+
+
+	def test_portfolio_none_proven(self):
+		members = [('one', self.runner.run, ([['cat']], ['a'], [], [0], '-')), ('two', self.runner.run, ([['cat']], ['b'], [], [0], '-'))]
+		run = self.runner.run_portfolio(members, lambda run: False)
+		self.assertEqual(run.output, 'a')
+		self.assertEqual(self.runner.portfolio_statistics['one']['wins'], 1)
+
+
+	def test_clasp_proven(self):
+		self.assertTrue(solver_runner.clasp_proven(SolverRun([], 'UNSATISFIABLE\n', returncodes=[0, 20])))
+		self.assertTrue(solver_runner.clasp_proven(SolverRun([], 'Answer: 1\na\nOPTIMUM FOUND\n', cached=True)))
+		self.assertFalse(solver_runner.clasp_proven(SolverRun([], 'Answer: 1\na\n', returncodes=[0, 10])))
+		self.assertFalse(solver_runner.clasp_proven(SolverRun([], '', returncodes=[0, -9], ok=False)))
@@ -0,0 +1,20 @@
+#! /usr/bin/env python3
+# I, Robert Rozanski, the copyright holder of this work, release this work into the public domain. This applies worldwide. In some countries this may not be legally possible; if so: I grant anyone the right to use this work for any purpose, without any conditions, unless such conditions are required by law.
+
+import unittest
+import os
+import shutil
+from tempfile import mkdtemp
+import rule_library
+
+class TempRulesTest(unittest.TestCase):
+	# temporary directory per test; rule files compiled into it,
+	# not into the shared default directory
+	def setUp(self):
+		self.directory = mkdtemp()
+		self.default_rules_directory = rule_library.default_directory
+		rule_library.default_directory = os.path.join(self.directory, 'rules')
+
+	def tearDown(self):
+		rule_library.default_directory = self.default_rules_directory
+		shutil.rmtree(self.directory)